@@ -1,249 +1,476 @@
 # backend/app.py
 
+import io
 import os
+import csv
+import json
 import time
-import random
-import sqlite3
-import xgboost as xgb
-from flask import Flask, request, jsonify, render_template
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
+import numpy as np
+from flask import Flask, Response, request, jsonify, render_template, url_for
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
+from browser_pool import create_pool_from_env
+from http_extractor import HttpExtractor
+from monitor_jobs import JobManager
+from profile_cache import ProfileCache, normalize_username
+from storage import ProfileStore
+from count_parsing import parse_count
+from model_registry import ModelRegistry
+from scoring_scheduler import ScoringScheduler
+from explain import ProfileExplainer
+import feature_pipeline
 
 app = Flask(__name__)
 
-# Dynamic User-Agent list to randomize requests
-USER_AGENTS = [
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.164 Safari/537.36",
-    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.101 Safari/537.36",
-    "Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0.1 Mobile/15E148 Safari/604.1"
-]
-
-# Load the model from JSON
-model = xgb.Booster()
-model.load_model('xgboost_model.json')
-
-# Database setup
-def setup_database():
-    conn = sqlite3.connect('profiles.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS profiles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            followers_count INTEGER,
-            following_count INTEGER,
-            subscriptions_count INTEGER,
-            is_verified BOOLEAN,
-            status TEXT
-        )
-    ''')
-    conn.commit()
-    return conn
-
-# Insert profile data into the database
-def insert_profile_data(conn, profile_data):
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO profiles (username, followers_count, following_count, subscriptions_count, is_verified, status)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (profile_data['username'], profile_data['followers_count'], profile_data['following_count'], 
-          profile_data['subscriptions_count'], profile_data['is_verified'], profile_data['status']))
-    conn.commit()
-
-# Dynamic wait function with retries
-def find_element(driver, by, value, timeout=10):
-    attempts = 0
-    while attempts < 2:
-        try:
-            return WebDriverWait(driver, timeout).until(
-                EC.presence_of_element_located((by, value))
-            )
-        except (TimeoutException, NoSuchElementException) as e:
-            print(f"Attempt {attempts + 1}: Error finding element {value}: {e}")
-            attempts += 1
-            time.sleep(2)
-    return None
-
-# Close pop-up with dynamic XPath and force click
+# Set once shutdown() starts; /ready then fails and new jobs are refused
+draining = False
+
+# Long-lived browser sessions shared by every /monitor request
+browser_pool = create_pool_from_env(os.environ)
+
+# 'http' fetches pages without a browser and only falls back to Selenium when parsing fails
+SCRAPER_BACKEND = os.environ.get('SCRAPER_BACKEND', 'selenium')
+http_extractor = HttpExtractor(
+    url_template=os.environ.get('PROFILE_URL', 'https://x.com/{username}/'),
+    concurrency=int(os.environ.get('HTTP_CONCURRENCY', 100)),
+)
+
+# Versioned models from the MODEL_REGISTRY directory (the bundled xgboost_model.json when it
+# has none), scored by the NumPy tree engine. The watcher swaps in newly activated versions.
+model_registry = ModelRegistry(
+    os.environ.get('MODEL_REGISTRY', 'models'),
+    default_threshold=float(os.environ.get('GENUINE_THRESHOLD', 0.68)),
+)
+model_registry.get()
+
+
+def watch_models():
+    # Started in each serving process (gunicorn's post_fork, the dev server, the watchlist
+    # scheduler), never at import: under preload_app that is the master, whose threads
+    # the forked workers do not inherit
+    return model_registry.watch(interval=float(os.environ.get('MODEL_WATCH_INTERVAL', 10)))
+
+
+# First name -> sex code memo, bounded so a server seeing ever new usernames does not grow without limit
+feature_pipeline.SEX_CODE_MEMO_LIMIT = int(os.environ.get('SEX_CODE_MEMO_SIZE', 100000))
+
+# Scraped fields accepted as positional feature rows
+FEATURE_COLUMNS = ['followers_count', 'following_count', 'subscriptions_count', 'is_verified']
+
+# Close pop-up if one is already showing; never waits for it to appear
 def close_pop_up(driver):
-    close_button_xpath = "//*[@id='layers']//button"
-    close_button = find_element(driver, By.XPATH, close_button_xpath)
-    
-    if close_button:
-        try:
-            driver.execute_script("arguments[0].scrollIntoView(true);", close_button)
-            time.sleep(1)
-            close_button.click()
-            print("Pop-up closed.")
-        except Exception as e:
-            print(f"Element click intercepted, forcing click with JavaScript: {e}")
-            driver.execute_script("arguments[0].click();", close_button)
-    else:
-        print("No close button found. Skipping pop-up closing.")
+    closed = driver.execute_script("""
+        const button = document.querySelector('#layers button');
+        if (button) { button.click(); }
+        return !!button;
+    """)
+    if closed:
+        print("Pop-up closed.")
 
-def parse_count(count_string):
-    try:
-        count_string = count_string.strip()
-        if 'M' in count_string:
-            return int(float(count_string.replace('M', '').split('.')[0])) * 1_000_000
-        elif ',' in count_string:
-            return int(float(count_string.replace(',', '')))
-        elif 'K' in count_string:
-            return int(float(count_string.replace('K', '').split('.')[0])) * 1_000
-        else:
-            return int(float(count_string.split('.')[0]))
-    except ValueError:
-        return 0 
+def feature_records(rows):
+    records = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            if len(row) != len(FEATURE_COLUMNS):
+                raise ValueError(f"Row {i} has {len(row)} values, expected {len(FEATURE_COLUMNS)}")
+            row = dict(zip(FEATURE_COLUMNS, row))
+        records.append(row)
+    return records
+
+def predict_profiles(records):
+    # One model version scores the whole batch, even if a swap happens meanwhile
+    current = model_registry.get()
+    if not records:
+        return np.empty(0, dtype=np.float32), [], current.version
+    probabilities = current.predict(records)
+    labels = ["Genuine" if p >= current.threshold else "Fake" for p in probabilities]
+    return probabilities, labels, current.version
+
+# Single profiles scored from many scrape threads are coalesced into one predict per batch
+scoring_scheduler = ScoringScheduler(
+    predict_profiles,
+    max_batch_size=int(os.environ.get('SCORING_MAX_BATCH', 256)),
+    max_latency_ms=float(os.environ.get('SCORING_MAX_LATENCY_MS', 2)),
+)
+
+def score_profiles(rows):
+    records = feature_records(rows)
+    if not records or len(records) >= scoring_scheduler.max_batch_size:
+        # Already a full batch; queueing it would only add latency
+        return predict_profiles(records)
+    return scoring_scheduler.score(records)
 
 def analyze_profile_data(profile_data):
-    features = [[
-        profile_data['followers_count'],
-        profile_data['following_count'],
-        profile_data['subscriptions_count'],
-        int(profile_data['is_verified']) 
-    ]]
-    
-    dmatrix = xgb.DMatrix(features)
-    prediction = model.predict(dmatrix)
-    
-    # Adjust threshold
-    return "Genuine" if prediction[0] >= 0.68 else "Fake"
-
-
-def extract_profile_data(driver, username):
+    _, labels, _ = score_profiles([profile_data])
+    return labels[0]
+
+def score_profile_data(profile_data):
+    probabilities, labels, version = score_profiles([profile_data])
+    profile_data['score'] = float(probabilities[0])
+    profile_data['status'] = labels[0]
+    profile_data['model_version'] = version
+    return profile_data
+
+
+# XPaths for each field, tried in order
+PROFILE_XPATHS = {
+    'header': [
+        "//div[contains(@data-testid, 'UserName')]",
+        "//span[contains(@class, 'css-901oao') and contains(text(), '@')]"
+    ],
+    'followers': [
+        "//a[contains(@href,'followers')]//span[1]",
+        "//span[contains(@data-testid, 'followers')]"
+    ],
+    'following': [
+        "//a[contains(@href,'following')]//span[1]",
+        "//span[contains(@data-testid, 'following')]"
+    ],
+    'subscriptions': [
+        "//a[contains(@href,'subscriptions')]//span",
+        "//span[contains(text(), 'Subscriptions')]"
+    ],
+    'verified': [
+        "//div[@id='react-root']//main//div[contains(@class, 'css-175oi2r')]//span[contains(@class, 'r-')]//div[1]",
+        "//svg[@aria-label='Verified']"
+    ],
+    # Suspended or missing accounts render this instead of a profile header
+    'empty_state': ["//div[@data-testid='emptyState']"],
+}
+
+# Reads every field in one round-trip; null means the node is not on the page (yet)
+PROFILE_SNAPSHOT_JS = """
+const xpaths = arguments[0];
+const first = (paths) => {
+    for (const path of paths) {
+        const node = document.evaluate(path, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        if (node) { return node; }
+    }
+    return null;
+};
+const text = (node) => node ? node.textContent.trim() : null;
+const header = first(xpaths.header);
+return {
+    header: !!header,
+    followers: text(first(xpaths.followers)),
+    following: text(first(xpaths.following)),
+    subscriptions: text(first(xpaths.subscriptions)),
+    verified: !!first(xpaths.verified),
+    empty_state: !!first(xpaths.empty_state),
+    ready_state: document.readyState
+};
+"""
+
+def profile_snapshot_ready(driver):
+    snapshot = driver.execute_script(PROFILE_SNAPSHOT_JS, PROFILE_XPATHS)
+    if snapshot['empty_state']:
+        return snapshot
+    if snapshot['header'] and snapshot['followers'] is not None and snapshot['following'] is not None:
+        return snapshot
+    return False
+
+def extract_profile_data(driver, username, timeout=15):
+    started = time.perf_counter()
+    timings = {}
     try:
         driver.get(f"https://x.com/{username}/")
-        WebDriverWait(driver, 15).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
+        timings['load_ms'] = (time.perf_counter() - started) * 1000
         close_pop_up(driver)
-        time.sleep(2)
 
-        # Try multiple XPaths for user header
-        user_header_xpaths = [
-            "//div[contains(@data-testid, 'UserName')]",
-            "//span[contains(@class, 'css-901oao') and contains(text(), '@')]"
-        ]
-        user_header = find_element_with_retry(driver, user_header_xpaths)
+        # Returns as soon as the header and both counts are present, or the page says there is no profile
+        try:
+            snapshot = WebDriverWait(driver, timeout, poll_frequency=0.1).until(profile_snapshot_ready)
+        except TimeoutException:
+            snapshot = driver.execute_script(PROFILE_SNAPSHOT_JS, PROFILE_XPATHS)
+        timings['ready_ms'] = (time.perf_counter() - started) * 1000 - timings['load_ms']
 
-        if not user_header:
+        if not snapshot['header']:
             print(f"User header not found for {username}.")
             return None
 
-        # Multiple XPaths for followers count
-        followers_count_xpaths = [
-            "//a[contains(@href,'followers')]//span[1]",
-            "//span[contains(@data-testid, 'followers')]"
-            ]
-        followers_count_elem = find_element_with_retry(driver, followers_count_xpaths)
-        followers_count = parse_count(followers_count_elem.text) if followers_count_elem else 0
-
-        # Multiple XPaths for following count
-        following_count_xpaths = [
-            "//a[contains(@href,'following')]//span[1]",
-            "//span[contains(@data-testid, 'following')]"
-        ]
-        following_count_elem = find_element_with_retry(driver, following_count_xpaths)
-        following_count = parse_count(following_count_elem.text) if following_count_elem else 0
-
-        # Multiple XPaths for subscriptions count
-        subscriptions_count_xpaths = [
-            "//a[contains(@href,'subscriptions')]//span",
-            "//span[contains(text(), 'Subscriptions')]"
-        ]
-        subscriptions_count_elem = find_element_with_retry(driver, subscriptions_count_xpaths)
-        subscriptions_count = parse_count(subscriptions_count_elem.text) if subscriptions_count_elem else 0
-
-        # Multiple XPaths for verified status
-        verified_xpaths = [
-            "//div[@id='react-root']//main//div[contains(@class, 'css-175oi2r')]//span[contains(@class, 'r-')]//div[1]",
-            "//svg[@aria-label='Verified']"
-        ]
-        is_verified = bool(find_element_with_retry(driver, verified_xpaths))
-
         profile_data = {
             'username': username,
-            'followers_count': followers_count,
-            'following_count': following_count,
-            'subscriptions_count': subscriptions_count,
-            'is_verified': is_verified,
-            'status': analyze_profile_data({
-                'followers_count': followers_count,
-                'following_count': following_count,
-                'subscriptions_count': subscriptions_count,
-                'is_verified': is_verified
-            })
+            'followers_count': parse_count(snapshot['followers']) if snapshot['followers'] else 0,
+            'following_count': parse_count(snapshot['following']) if snapshot['following'] else 0,
+            'subscriptions_count': parse_count(snapshot['subscriptions']) if snapshot['subscriptions'] else 0,
+            'is_verified': snapshot['verified'],
         }
+        score_profile_data(profile_data)
+        timings['total_ms'] = (time.perf_counter() - started) * 1000
+        profile_data['timings'] = {name: round(value, 1) for name, value in timings.items()}
         return profile_data
 
     except Exception as e:
         print(f"Error extracting profile data for {username}: {e}")
         return None
 
-# Helper function to try multiple XPaths with retries
-def find_element_with_retry(driver, xpaths, retries=1):
-    for xpath in xpaths:
-        try:
-            element = driver.find_element(By.XPATH, xpath)
-            if element:
-                return element
-        except Exception as e:
-            print(f"XPath not found: {xpath}, retrying... Error: {e}")
-            time.sleep(1)  # Optional: add a short delay before retrying
-            continue
-    return None
+def scrape_profiles(usernames):
+    if SCRAPER_BACKEND == 'http':
+        needs_browser = []
+        for username, profile_data in http_extractor.scrape(usernames):
+            if profile_data is None:
+                needs_browser.append(username)
+                continue
+            yield username, score_profile_data(profile_data)
+        if needs_browser:
+            print(f"Falling back to the browser for {len(needs_browser)} profiles.")
+        usernames = needs_browser
+    if usernames:
+        yield from browser_pool.scrape(usernames, extract_profile_data)
 
 
 @app.route('/')
 def home():
     return render_template('index.html')  # Serve the HTML file
 
-@app.route('/monitor', methods=['POST'])
+def monitor_results(usernames, force_refresh=False):
+    # Scrapes and scores each profile, yielding (username, result or None) as they finish.
+    # Profiles seen within the cache TTL are answered from the cache unless force_refresh is set.
+    to_scrape = []
+    for username in usernames:
+        cached = None if force_refresh else profile_cache.get(username)
+        if cached is None:
+            to_scrape.append(username)
+        else:
+            yield username, {'username': username, 'status': cached['status'],
+                             'model_version': cached.get('model_version'), 'cached': True}
+
+    # Snapshots are written in small batches as they arrive, so the history and other
+    # workers see a long job's profiles before it ends. Explanations are not computed
+    # here: /profiles/<username>/explain builds them on first request.
+    unsaved = []
+    saved_at = time.time()
+    try:
+        for username, profile_data in scrape_profiles(to_scrape):
+            if not profile_data:
+                print(f"Failed to extract data for {username}.")
+                yield username, None
+                continue
+            print(f"Profile data for {username}: {profile_data['status']} ({profile_data['timings']['total_ms']} ms)")
+            snapshot = {field: profile_data[field] for field in
+                        ['followers_count', 'following_count', 'subscriptions_count', 'is_verified', 'score', 'status',
+                         'model_version']}
+            snapshot['username'] = normalize_username(username)
+            snapshot['scraped_at'] = time.time()
+            unsaved.append(snapshot)
+            if len(unsaved) >= STORE_BATCH_SIZE or snapshot['scraped_at'] - saved_at >= STORE_BATCH_SECONDS:
+                profile_store.insert_profiles(unsaved)
+                unsaved, saved_at = [], snapshot['scraped_at']
+            profile_cache.put(username, snapshot)
+            # Only return the status to the client (Fake or Genuine)
+            yield username, {
+                'username': profile_data['username'],
+                'status': profile_data['status'],
+                'model_version': profile_data['model_version'],
+                'timings': profile_data['timings'],
+                'cached': False
+            }
+    finally:
+        profile_store.insert_profiles(unsaved)
+
+profile_store = ProfileStore('profiles.db')
+# A monitoring job commits its snapshots every STORE_BATCH_SIZE profiles, or sooner when
+# STORE_BATCH_SECONDS have passed since its last commit (slow browser scrapes)
+STORE_BATCH_SIZE = int(os.environ.get('STORE_BATCH_SIZE', 20))
+STORE_BATCH_SECONDS = float(os.environ.get('STORE_BATCH_SECONDS', 1.0))
+profile_cache = ProfileCache(
+    profile_store,
+    ttl=float(os.environ.get('PROFILE_CACHE_TTL', 3600)),
+    max_entries=int(os.environ.get('PROFILE_CACHE_SIZE', 10000)),
+)
+profile_explainer = ProfileExplainer(
+    model_registry.get, max_entries=int(os.environ.get('PROFILE_CACHE_SIZE', 10000)))
+monitor_jobs = JobManager(monitor_results, max_workers=int(os.environ.get('MONITOR_JOB_WORKERS', 4)))
+# First re-check interval for newly watched accounts; the scheduler adapts it afterwards
+WATCH_INITIAL_INTERVAL = float(os.environ.get('WATCH_INITIAL_INTERVAL', 6 * 3600))
 
 
 @app.route('/monitor', methods=['POST'])
 def monitor_profiles():
     profiles = request.json.get('profiles', [])
+    force_refresh = bool(request.json.get('force_refresh', False))
+    print(f"Monitoring {len(profiles)} Twitter profiles with the {SCRAPER_BACKEND} scraper...")
+    results = dict(monitor_results(profiles, force_refresh=force_refresh))
+    return jsonify([results[username] for username in profiles if results.get(username)])
+
+
+@app.route('/monitor/jobs', methods=['POST'])
+def submit_monitor_job():
+    payload = request.get_json(silent=True) or {}
+    profiles = payload.get('profiles', [])
+    if not profiles:
+        return jsonify({'error': 'No profiles given'}), 400
+    if draining:
+        return jsonify({'error': 'Server is shutting down'}), 503
+    job = monitor_jobs.submit(profiles, force_refresh=bool(payload.get('force_refresh', False)))
+    print(f"Queued monitoring job {job.id} for {len(profiles)} Twitter profiles.")
+    return jsonify({
+        'job_id': job.id,
+        'status_url': url_for('monitor_job_status', job_id=job.id),
+        'stream_url': url_for('stream_monitor_job', job_id=job.id),
+    }), 202
+
+
+@app.route('/monitor/jobs/<job_id>', methods=['GET'])
+def monitor_job_status(job_id):
+    job = monitor_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/monitor/jobs/<job_id>', methods=['DELETE'])
+def cancel_monitor_job(job_id):
+    job = monitor_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict(include_results=False))
+
+
+@app.route('/monitor/jobs/<job_id>/stream', methods=['GET'])
+def stream_monitor_job(job_id):
+    job = monitor_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    # One JSON object per line; blank lines are keep-alives for proxies
+    def generate():
+        for result in job.iter_results():
+            yield '\n' if result is None else json.dumps(result) + '\n'
+        yield json.dumps({'event': 'end', **job.to_dict(include_results=False)}) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+
+@app.route('/profiles/<username>', methods=['GET'])
+def profile_history(username):
+    limit = request.args.get('limit', 100, type=int)
+    history = profile_store.history(normalize_username(username), limit=limit)
+    if not history:
+        return jsonify({'error': 'Unknown profile'}), 404
+    return jsonify({'latest': history[0], 'history': history})
+
+
+@app.route('/profiles/<username>/explain', methods=['GET'])
+def explain_profile(username):
+    # Top feature contributions (log-odds) behind the latest verdict for a profile
+    key = normalize_username(username)
+    snapshot = profile_store.latest_snapshot(key)
+    if snapshot is None:
+        return jsonify({'error': 'Unknown profile'}), 404
+    explanation = profile_explainer.get(key, snapshot['scraped_at'])
+    if explanation is None:
+        # Explained on first request, so scraping never waits for (or loads) xgboost;
+        # the stored snapshot only has the normalised username, which is what its sex
+        # code is derived from here
+        explanation = profile_explainer.explain_batch([key], [snapshot], [snapshot['scraped_at']])[0]
+    top = request.args.get('top', profile_explainer.top_k, type=int)
+    return jsonify({
+        'username': key,
+        'score': snapshot['score'],
+        'status': snapshot['status'],
+        'scored_by': snapshot.get('model_version'),
+        **explanation,
+        'top_features': explanation['top_features'][:top],
+    })
+
+
+@app.route('/profiles/<username>/label', methods=['POST'])
+def label_profile(username):
+    # Confirmed verdicts feed incremental training (python incremental_training.py update)
+    label = str((request.get_json(silent=True) or {}).get('label', '')).strip().capitalize()
+    if label not in ('Fake', 'Genuine'):
+        return jsonify({'error': 'Label must be Fake or Genuine'}), 400
+    key = normalize_username(username)
+    if not profile_store.set_labels([(key, label)]):
+        return jsonify({'error': 'Unknown profile'}), 404
+    return jsonify({'username': key, 'label': label})
+
+
+@app.route('/watchlist', methods=['POST'])
+def add_to_watchlist():
+    # Accounts are re-checked by the scheduler service (python watchlist.py run)
+    profiles = (request.get_json(silent=True) or {}).get('profiles', [])
+    if not profiles:
+        return jsonify({'error': 'No profiles given'}), 400
+    usernames = sorted({normalize_username(u) for u in profiles})
+    added = profile_store.add_to_watchlist(usernames, WATCH_INITIAL_INTERVAL)
+    return jsonify({'added': added, 'already_watched': len(usernames) - added})
+
+
+@app.route('/watchlist', methods=['GET'])
+def list_watchlist():
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify(profile_store.watchlist(limit=limit))
+
+
+@app.route('/watchlist/<username>', methods=['DELETE'])
+def remove_from_watchlist(username):
+    if not profile_store.remove_from_watchlist([normalize_username(username)]):
+        return jsonify({'error': 'Not watched'}), 404
+    return jsonify({'removed': normalize_username(username)})
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # Green only once a model has been loaded and warmed, and until shutdown starts
+    current = model_registry.current
+    if current is None or draining:
+        return jsonify({'ready': False, 'draining': draining}), 503
+    return jsonify({'ready': True, 'model_version': current.version})
+
+
+@app.route('/model', methods=['GET'])
+def model_status():
+    return jsonify(model_registry.status())
+
+
+@app.route('/monitor/score/stats', methods=['GET'])
+def scoring_stats():
+    return jsonify(scoring_scheduler.stats())
+
+
+@app.route('/monitor/cache/stats', methods=['GET'])
+def profile_cache_stats():
+    return jsonify(profile_cache.stats())
+
+
+@app.route('/monitor/score', methods=['POST'])
+def score_feature_rows():
+    if 'file' in request.files:
+        upload = request.files['file']
+        rows = list(csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8')))
+    else:
+        rows = (request.get_json(silent=True) or {}).get('rows', [])
+
+    try:
+        probabilities, labels, version = score_profiles(rows)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
     results = []
-    
-    options = Options()
-    options.add_argument(f"user-agent={random.choice(USER_AGENTS)}")
-    options.add_argument("--disable-notifications")
-    options.add_argument("--disable-web-security")
-    options.add_argument("--allow-running-insecure-content")
-
-    driver = webdriver.Chrome(service=ChromeService(ChromeDriverManager().install()), options=options)
-
-    # Setup database connection
-    conn = setup_database()
-
-    for username in profiles:
-        print(f"Monitoring Twitter profile: {username}...")
-        profile_data = extract_profile_data(driver, username)
-        
-        if profile_data:
-            # Only append the status to the result (Fake or Genuine)
-            results.append({
-                'username': profile_data['username'],
-                'status': profile_data['status']
-            })
-            print(f"Profile data for {username}: {profile_data['status']}")
-        else:
-            print(f"Failed to extract data for {username}.")
-        
-        time.sleep(random.uniform(5, 10))
-    
-    driver.quit()
-    conn.close()
+    for row, probability, label in zip(rows, probabilities, labels):
+        result = {'probability': float(probability), 'status': label, 'model_version': version}
+        if isinstance(row, dict) and 'username' in row:
+            result['username'] = row['username']
+        results.append(result)
     return jsonify(results)
 
 
+def shutdown(timeout=None):
+    # Graceful stop for a server worker: refuse new jobs, let in-flight scrapes finish
+    # (cancelling whatever is left after `timeout`), then release threads and browsers
+    global draining
+    draining = True
+    print(f"Draining {len(monitor_jobs.active_jobs())} monitoring jobs...")
+    monitor_jobs.shutdown(wait=True, timeout=timeout)
+    scoring_scheduler.stop()
+    model_registry.stop()
+    browser_pool.close()
+
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py).
+    # The reloader is off so the module, and the model, are loaded once.
+    watch_models()
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', use_reloader=False, threaded=True)
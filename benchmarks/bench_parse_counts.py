@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from count_parsing import parse_counts, parse_count
+from feature_pipeline import FeaturePipeline
+from count_cases import COUNT_CASES
+
+def parse_count_per_string(count_string):
+    # The original parser, one string at a time
+    try:
+        count_string = count_string.strip()
+        if 'M' in count_string:
+            return int(float(count_string.replace('M', '').split('.')[0])) * 1_000_000
+        elif ',' in count_string:
+            return int(float(count_string.replace(',', '')))
+        elif 'K' in count_string:
+            return int(float(count_string.replace('K', '').split('.')[0])) * 1_000
+        else:
+            return int(float(count_string.split('.')[0]))
+    except (ValueError, AttributeError):
+        return 0
+
+
+def compare_cases():
+    # The expected values are asserted by tests/test_count_parsing.py; this shows where
+    # the original parser went wrong
+    print(f"{'text':<24} {'expected':>14} {'old':>14} {'new':>14}")
+    got = parse_counts([text for text, _ in COUNT_CASES])
+    for (text, expected), new in zip(COUNT_CASES, got):
+        old = parse_count_per_string(text)
+        flag = '' if new == expected else '  <-- wrong'
+        print(f"{text!r:<24} {expected:>14,} {old:>14,} {int(new):>14,}{' ' if old == expected else ' *'}{flag}")
+    old_wrong = sum(parse_count_per_string(text) != expected for text, expected in COUNT_CASES)
+    new_wrong = sum(new != expected for (_, expected), new in zip(COUNT_CASES, got))
+    print(f"{len(COUNT_CASES)} cases, old parser wrong on {old_wrong} (*), new parser wrong on {new_wrong}")
+
+
+def display_count(count, locale):
+    # How a profile page shows a count: exact below 10,000, then one decimal and a suffix
+    decimal, group = {'en': ('.', ','), 'de': (',', '.'), 'fr': (',', '\u202f')}[locale]
+    suffixes = {'en': ('K', 'M'), 'de': ('\xa0Tsd.', '\xa0Mio.'), 'fr': ('\xa0k', '\xa0M')}[locale]
+    if count < 10_000:
+        return f"{count:,}".replace(',', group)
+    for size, suffix in zip((1_000_000, 1_000), suffixes[::-1]):
+        if count >= size:
+            text = f"{count // (size // 10) / 10:.1f}".rstrip('0').rstrip('.')
+            return text.replace('.', decimal) + suffix
+
+
+def synthetic_counts(n, seed=0, distinct=False):
+    # Heavy-tailed counts as scraped from mixed-locale pages, or (distinct=True) exact
+    # counts with grouping, where hardly any string repeats
+    rng = np.random.default_rng(seed)
+    counts = np.minimum(rng.lognormal(5, 2.5, n).astype(np.int64), 2_000_000_000)
+    if distinct:
+        return [f"{count:,}" for count in rng.integers(0, 10 ** 9, n)]
+    locales = rng.choice(['en', 'de', 'fr'], n, p=[0.7, 0.2, 0.1])
+    return [display_count(int(count), locale) for count, locale in zip(counts, locales)]
+
+
+def timed(label, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+def bench_parsing(n, distinct=False):
+    texts = synthetic_counts(n, distinct=distinct)
+    print(f"{len(set(texts))} distinct strings")
+    _, old_time = timed(f"per-string parse_count ({n} rows)", lambda: [parse_count_per_string(t) for t in texts])
+    _, new_time = timed(f"parse_counts ({n} rows)", parse_counts, texts)
+    print(f"speedup: {old_time / new_time:.1f}x, {n / new_time / 1e6:.2f}M counts/s")
+
+
+def bench_assembly(n, pipeline_path):
+    pipeline = FeaturePipeline.load(pipeline_path)
+    rng = random.Random(1)
+    names = ['Anna Smith', 'John', 'maria_k', 'Li Wei', 'bot12345']
+    texts = synthetic_counts(3 * n, seed=2)
+    scraped = {
+        'username': [rng.choice(names) for _ in range(n)],
+        'followers_count': texts[:n],
+        'following_count': texts[n:2 * n],
+        'subscriptions_count': texts[2 * n:],
+        'is_verified': [rng.random() < 0.1 for _ in range(n)],
+    }
+
+    def per_row():
+        # What the scrapers did: parse each field, build a dict per profile, then a frame
+        records = [
+            {'username': scraped['username'][i],
+             'followers_count': parse_count_per_string(scraped['followers_count'][i]),
+             'following_count': parse_count_per_string(scraped['following_count'][i]),
+             'subscriptions_count': parse_count_per_string(scraped['subscriptions_count'][i]),
+             'is_verified': scraped['is_verified'][i]}
+            for i in range(n)
+        ]
+        return pipeline.features(records).to_numpy()
+
+    old, old_time = timed(f"per-row records -> features ({n} rows)", per_row)
+    new, new_time = timed(f"columns -> feature_matrix ({n} rows)", pipeline.feature_matrix, scraped)
+    print(f"speedup: {old_time / new_time:.1f}x")
+    # Only the counts the old parser got wrong may differ
+    assert np.array_equal(old[:, 3:], new[:, 3:]), "non-count features differ"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time vectorised count parsing and feature assembly")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--pipeline', default='feature_pipeline.json')
+    args = parser.parse_args()
+
+    compare_cases()
+    print()
+    bench_parsing(args.rows)
+    print()
+    bench_parsing(args.rows, distinct=True)
+    print()
+    bench_assembly(min(args.rows, 200_000), args.pipeline)
+
+
+if __name__ == '__main__':
+    main()
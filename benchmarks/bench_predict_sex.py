@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import feature_pipeline
+from feature_pipeline import SEX_CODES, predict_sex
+
+
+def predict_sex_per_row(names):
+    # The original implementation: one detector call per row through Series.apply
+    import gender_guesser.detector as gender
+
+    detector = gender.Detector()
+    first_names = names.str.split(' ').str.get(0)
+    sex = first_names.apply(lambda x: detector.get_gender(x).split()[0])
+    return sex.map(SEX_CODES).fillna(0).astype(int)
+
+
+def timed(label, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and deduplicated predict_sex")
+    parser.add_argument('--repeat', type=int, default=1, help="Stack the training usernames this many times")
+    parser.add_argument('--n-jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    names = pd.concat([pd.read_csv("data/gusers.csv")['username'], pd.read_csv("data/fusers.csv")['username']])
+    names = pd.concat([names] * args.repeat, ignore_index=True).fillna('').astype(str)
+    print(f"{len(names)} rows, {names.str.split(' ').str.get(0).nunique()} distinct first names")
+
+    baseline, baseline_time = timed("per-row apply", predict_sex_per_row, names)
+    feature_pipeline.clear_sex_code_memo()
+    fast, fast_time = timed("unique names, cold", predict_sex, names, n_jobs=args.n_jobs)
+    _, warm_time = timed("unique names, warm memo", predict_sex, names)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table = os.path.join(tmp, 'sex_codes.json')
+        feature_pipeline.clear_sex_code_memo()
+        predict_sex(names, table_path=table)
+        feature_pipeline.clear_sex_code_memo()
+        _, table_time = timed("unique names, lookup table", predict_sex, names, table_path=table)
+
+    assert (baseline.to_numpy() == fast.to_numpy()).all(), "sex codes differ from the per-row implementation"
+    print(f"speedup cold: {baseline_time / fast_time:.1f}x, warm: {baseline_time / warm_time:.1f}x, "
+          f"table: {baseline_time / table_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import argparse
+import resource
+import numpy as np
+from scipy import sparse
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.svm import SVC, LinearSVC
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from feature_pipeline import FeaturePipeline, BASE_COLUMNS
+from calibration import calibrate
+from svmcode import load_features, sparse_scaler
+
+
+def fit_svc(X, y):
+    # What train_svm fits per grid point: the internal 5-fold Platt calibration included
+    return SVC(kernel='linear', C=1, probability=True, random_state=42).fit(X, y)
+
+
+def fit_calibrated(svm, X, y):
+    X_fit, X_calibration, y_fit, y_calibration = train_test_split(X, y, test_size=0.20, random_state=42, stratify=y)
+    return calibrate(svm.fit(X_fit, y_fit), X_calibration, y_calibration)
+
+
+def fit_linear_svc(X, y):
+    return fit_calibrated(LinearSVC(C=1, random_state=42), X, y)
+
+
+def fit_sgd(X, y):
+    return fit_calibrated(SGDClassifier(loss='hinge', alpha=1e-4, random_state=42), X, y)
+
+
+def fit_sgd_minibatch(X, y, batch_size=5000, epochs=5):
+    X_fit, X_calibration, y_fit, y_calibration = train_test_split(X, y, test_size=0.20, random_state=42, stratify=y)
+    svm = SGDClassifier(loss='hinge', alpha=1e-4, random_state=42)
+    for _ in range(epochs):
+        for start in range(0, X_fit.shape[0], batch_size):
+            svm.partial_fit(X_fit[start:start + batch_size], y_fit[start:start + batch_size], classes=[0, 1])
+    return calibrate(svm, X_calibration, y_calibration)
+
+
+def measure(fit, X_train, y_train, X_test, y_test):
+    # Runs in a fresh process so the peak RSS belongs to this fit alone
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    model = fit(X_train, y_train)
+    elapsed = time.perf_counter() - started
+    peak_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    return elapsed, peak_mb, roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SVC(probability=True) with the linear SVM paths")
+    parser.add_argument('--max-rows', type=int, default=None, help="Subsample the training rows")
+    parser.add_argument('--skip-svc', action='store_true', help="Skip the slow SVC baseline")
+    args = parser.parse_args()
+
+    pipeline = FeaturePipeline(max_features=50, sex_code_table='data/sex_codes.json')
+    X, y = load_features(pipeline)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.20, random_state=42, stratify=y)
+    if args.max_rows and args.max_rows < len(X_train):
+        X_train, _, y_train, _ = train_test_split(X_train, y_train, train_size=args.max_rows, random_state=42,
+                                                  stratify=y_train)
+
+    pipeline.fit_scaler(X_train)
+    dense = (pipeline.scale_features(X_train), pipeline.scale_features(X_test))
+    sparse_scaler(pipeline, X_train[:, :len(BASE_COLUMNS)])
+    csr = (sparse.csr_matrix(pipeline.scale_features(X_train)), sparse.csr_matrix(pipeline.scale_features(X_test)))
+    print(f"{len(y_train)} training rows, {len(y_test)} test rows, "
+          f"{csr[0].nnz / np.prod(csr[0].shape):.0%} non-zero")
+
+    runs = [
+        ("LinearSVC + Platt", fit_linear_svc, csr),
+        ("SGD hinge + Platt", fit_sgd, csr),
+        ("SGD partial_fit + Platt", fit_sgd_minibatch, csr),
+    ]
+    if not args.skip_svc:
+        runs.insert(0, ("SVC(probability=True)", fit_svc, dense))
+
+    print(f"{'model':<26} {'fit s':>8} {'peak MB':>8} {'AUC':>7}")
+    for label, fit, (train, test) in runs:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            elapsed, peak_mb, auc = executor.submit(measure, fit, train, y_train, test, y_test).result()
+        print(f"{label:<26} {elapsed:8.2f} {peak_mb:8.1f} {auc:7.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import argparse
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split, GridSearchCV
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from feature_pipeline import FeaturePipeline
+from profile_detection import load_features
+from tuning import Tuner
+
+# The search train_xgboost ran before tuning.py: 54 configs x 3 folds, serial
+GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [3, 5, 7],
+    'learning_rate': [0.01, 0.1, 0.2],
+    'subsample': [0.8, 1.0]
+}
+
+
+def grid_search(X, y):
+    search = GridSearchCV(xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss', random_state=42),
+                          GRID, cv=3, scoring='accuracy')
+    search.fit(X, y)
+    return search.best_params_
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    params = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    return params, elapsed
+
+
+def test_auc(params, X_train, y_train, X_test, y_test):
+    model = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss', tree_method='hist',
+                              random_state=42, **params)
+    model.fit(X_train, y_train)
+    return roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the old GridSearchCV with tuning.Tuner")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--threads-per-trial', type=int, default=None)
+    parser.add_argument('--random-configs', type=int, default=8)
+    parser.add_argument('--skip-grid', action='store_true', help="Skip the slow GridSearchCV baseline")
+    args = parser.parse_args()
+
+    pipeline = FeaturePipeline(max_features=100, sex_code_table='data/sex_codes.json')
+    X, y = load_features(pipeline)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.20, random_state=42, stratify=y)
+    pipeline.fit_scaler(X_train)
+    X_train, X_test = pipeline.scale_features(X_train), pipeline.scale_features(X_test)
+
+    tuner = Tuner(n_jobs=args.n_jobs, threads_per_trial=args.threads_per_trial)
+    print(f"{len(X_train)} training rows, {tuner.workers} workers x {tuner.threads_per_trial} threads")
+    runs = [
+        ("successive halving", tuner.successive_halving, (X_train, y_train), {}),
+        ("random search", tuner.random_search, (X_train, y_train), {'n_configs': args.random_configs}),
+    ]
+    if not args.skip_grid:
+        runs.append(("GridSearchCV (old)", grid_search, (X_train, y_train), {}))
+
+    timings = {}
+    for label, fn, fn_args, fn_kwargs in runs:
+        params, elapsed = timed(fn, *fn_args, **fn_kwargs)
+        timings[label] = elapsed
+        auc = test_auc(params, X_train, y_train, X_test, y_test)
+        print(f"{label:<22} {elapsed:8.1f} s  test AUC {auc:.4f}  {params}")
+
+    if "GridSearchCV (old)" in timings:
+        grid_time = timings["GridSearchCV (old)"]
+        print(f"speedup halving: {grid_time / timings['successive halving']:.1f}x, "
+              f"random: {grid_time / timings['random search']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+import os
+import io
+import sys
+import json
+import time
+import zlib
+import shutil
+import pickle
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_DIR)
+
+# Stages run at every size unless capped below; each runs in its own fresh process
+STAGES = ['predict_sex', 'tfidf', 'extract_features', 'train_xgboost', 'train_svm', 'train_linear_svm',
+          'predict_single', 'predict_batch']
+
+FIRST_NAMES = ['Anna', 'John', 'Maria', 'Wei', 'Priya', 'Ahmed', 'Olga', 'Carlos', 'Yuki', 'Fatima', 'James',
+               'Sofia', 'Kwame', 'Lena', 'Mohammed', 'Emma', 'Raj', 'Chloe', 'Ivan', 'Aisha', 'bot', 'crypto',
+               'deals', 'xx', 'official']
+LAST_NAMES = ['Smith', 'Kim', 'Garcia', 'Li', 'Patel', 'Hassan', 'Ivanova', 'Silva', 'Tanaka', 'Okafor', 'Mueller',
+              'Rossi', 'Nguyen', 'Brown', 'Khan']
+WORDS = ('love life music travel food photography dad mom wife husband student engineer developer designer writer '
+         'artist coffee books football fan official news updates crypto bitcoin nft giveaway follow back free money '
+         'deals promo click link dm business marketing entrepreneur ceo founder tech science nature yoga fitness '
+         'gamer streamer youtube podcast host proud father mother teacher nurse doctor lawyer christian peace '
+         'dreamer explorer world city london paris tokyo new york california').split()
+
+
+def synthetic_accounts(n, seed=0):
+    # Accounts in the training CSVs' schema and a label (1 Genuine, 0 Fake). Fakes follow
+    # many and are followed by few, are newer and more often have no description.
+    rng = np.random.default_rng(seed)
+    genuine = rng.random(n) < 0.53
+    followers = np.where(genuine, rng.lognormal(6, 2, n), rng.lognormal(3, 1.5, n)).astype(np.int64)
+    following = np.where(genuine, rng.lognormal(5.5, 1.2, n), rng.lognormal(6.5, 1.3, n)).astype(np.int64)
+    years = np.where(genuine, rng.integers(2007, 2024, n), rng.integers(2016, 2025, n))
+    created_at = pd.to_datetime(pd.DataFrame({
+        'year': years, 'month': rng.integers(1, 13, n), 'day': rng.integers(1, 29, n),
+        'hour': rng.integers(0, 24, n), 'minute': rng.integers(0, 60, n),
+    })).dt.strftime('%d-%m-%Y %H:%M')
+
+    first = np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), n)]
+    last = np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), n)]
+    usernames = [f"{a} {b}{i % 1000}" for i, (a, b) in enumerate(zip(first, last))]
+    lengths = np.where(rng.random(n) < np.where(genuine, 0.2, 0.4), 0, rng.integers(1, 13, n))
+    words = np.array(WORDS)[rng.integers(0, len(WORDS), lengths.sum())]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    descriptions = [' '.join(words[bounds[i]:bounds[i + 1]]) for i in range(n)]
+
+    df = pd.DataFrame({
+        'created_at': created_at,
+        'description': descriptions,
+        'following_count': following,
+        'subscription_count': rng.poisson(np.where(genuine, 3.0, 0.5)),
+        'username': usernames,
+        'followers_count': followers,
+        'is_verified': genuine & (rng.random(n) < 0.08),
+    })
+    return df, genuine.astype(int)
+
+
+def stub_profile_html(username):
+    # A page parse_embedded_json can read, with counts derived from the username
+    h = zlib.crc32(username.encode())
+    user = {'screen_name': username, 'followers_count': h % 100_000, 'friends_count': (h >> 8) % 5000,
+            'subscriptions_count': (h >> 4) % 7, 'verified': h % 13 == 0}
+    return f"<html><body><script>window.__STATE__={json.dumps({'users': {username: user}})}</script></body></html>"
+
+
+class StubProfileHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = stub_profile_html(self.path.strip('/').split('/')[0]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stub_profiles(port, ready=None):
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubProfileHandler)
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+class PeakMemory:
+    # Peak resident memory while the block runs, sampled from /proc (Linux), so memory
+    # held before the block (data, imports) and earlier peaks are not counted
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self._stop = threading.Event()
+
+    def rss(self):
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * self.page_size
+
+    def __enter__(self):
+        self.start = self.peak = self.rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+    def result(self):
+        return {'peak_rss_mb': round(self.peak / 2 ** 20, 1), 'peak_delta_mb': round((self.peak - self.start) / 2 ** 20, 1)}
+
+
+def fitted_pipeline(df, max_features=100):
+    from feature_pipeline import FeaturePipeline
+
+    pipeline = FeaturePipeline(max_features=max_features)
+    X = pipeline.fit_features(df).to_numpy()
+    return pipeline, X
+
+
+def setup_stage(stage, df, y, options):
+    # Everything a stage needs but should not be timed; returns the call to time
+    if stage == 'predict_sex':
+        from feature_pipeline import predict_sex
+
+        return lambda: predict_sex(df['username'])
+    if stage == 'tfidf':
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from feature_pipeline import FeaturePipeline
+
+        pipeline = FeaturePipeline(max_features=100)
+
+        def tfidf():
+            vectorizer = TfidfVectorizer(max_features=pipeline.max_features)
+            vectorizer.fit(pipeline.descriptions(df))
+            pipeline.set_vocabulary(vectorizer.get_feature_names_out().tolist(), vectorizer.idf_)
+            return pipeline.text_features(df)
+        return tfidf
+    if stage == 'extract_features':
+        from feature_pipeline import FeaturePipeline
+        from profile_detection import extract_features
+
+        return lambda: extract_features(df, FeaturePipeline(max_features=100))
+    if stage in ('train_xgboost', 'train_svm', 'train_linear_svm'):
+        import profile_detection
+        import svmcode
+
+        pipeline, X = fitted_pipeline(df, 100 if stage == 'train_xgboost' else 50)
+        train = {'train_xgboost': profile_detection.train_xgboost, 'train_svm': svmcode.train_svm,
+                 'train_linear_svm': svmcode.train_linear_svm}[stage]
+        return lambda: train(X, y, pipeline)
+    if stage in ('predict_single', 'predict_batch'):
+        from model_registry import ModelRegistry
+
+        model = ModelRegistry(options['registry_dir']).get()
+        if stage == 'predict_batch':
+            return lambda: model.predict(df)
+        records = df.iloc[:options['single_rows']].to_dict('records')
+        return lambda: [model.predict([record]) for record in records]
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_stage(stage, data_path, rows, options):
+    # Runs in a fresh process: loads the data, sets the stage up, then times it
+    with open(data_path, 'rb') as f:
+        df, y = pickle.load(f)
+    df, y = df.iloc[:rows].reset_index(drop=True), y[:rows]
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output if not options['verbose'] else sys.stdout):
+        fn = setup_stage(stage, df, y, options)
+        with PeakMemory() as memory:
+            started = time.perf_counter()
+            fn()
+            seconds = time.perf_counter() - started
+    timed_rows = min(rows, options['single_rows']) if stage == 'predict_single' else rows
+    return dict(
+        seconds=round(seconds, 4),
+        rows=timed_rows,
+        us_per_row=round(seconds / timed_rows * 1e6, 3),
+        # Worker pools (training searches, parallel sex detection) report their own peak
+        children_peak_rss_mb=round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        **memory.result(),
+    )
+
+
+def run_monitor(port, n_profiles, batch_size, registry_dir, verbose):
+    # End to end through Flask's test client: /monitor scrapes the stub server over HTTP,
+    # scores, stores and explains. The second pass is answered from the profile cache.
+    workdir = tempfile.mkdtemp(prefix='bench-monitor-')
+    for name in ('xgboost_model.json', 'feature_pipeline.json'):
+        shutil.copyfile(os.path.join(REPO_DIR, name), os.path.join(workdir, name))
+    os.chdir(workdir)
+    os.environ.update({
+        'SCRAPER_BACKEND': 'http',
+        'PROFILE_URL': f'http://127.0.0.1:{port}/{{username}}/',
+        'MODEL_REGISTRY': os.path.join(REPO_DIR, registry_dir),
+    })
+    usernames = [f'bench_user_{i}' for i in range(n_profiles)]
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output if not verbose else sys.stdout):
+            import app
+
+            client = app.app.test_client()
+            results = {}
+            for label in ('cold', 'cached'):
+                with PeakMemory() as memory:
+                    started = time.perf_counter()
+                    answered = 0
+                    for start in range(0, n_profiles, batch_size):
+                        response = client.post('/monitor', json={'profiles': usernames[start:start + batch_size]})
+                        answered += len(response.get_json())
+                    seconds = time.perf_counter() - started
+                results[label] = dict(seconds=round(seconds, 4), rows=n_profiles, answered=answered,
+                                      profiles_per_second=round(n_profiles / seconds, 1), **memory.result())
+            app.shutdown()
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def in_fresh_process(fn, *args):
+    # spawn, not fork, so every measurement starts from the same clean interpreter
+    # (and, unlike multiprocessing.Pool's daemon workers, may start pools of its own)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(fn, *args).result()
+
+
+def environment():
+    import sklearn
+    import xgboost
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+    }
+
+
+def stage_limit(stage, args):
+    if stage == 'train_svm':
+        return args.max_svm_rows
+    if stage.startswith('train_'):
+        return args.max_train_rows
+    return None
+
+
+def compare(results, baseline_path, tolerance):
+    # Prints seconds against a previous run; returns the regressions beyond tolerance
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r['stage'], r['rows']): r for r in baseline['results']}
+    regressions = []
+    print(f"\nAgainst {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    for result in results:
+        previous = before.get((result['stage'], result['rows']))
+        if previous is None:
+            continue
+        ratio = result['seconds'] / max(previous['seconds'], 1e-9)
+        flag = '  <-- slower' if ratio > 1 + tolerance else ''
+        print(f"{result['stage']:<18} {result['rows']:>9} {previous['seconds']:>10.3f} s -> {result['seconds']:>10.3f} s "
+              f"({ratio:.2f}x){flag}")
+        if flag:
+            regressions.append((result['stage'], result['rows']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and measure peak memory of every pipeline stage on "
+                                                 "synthetic accounts, and /monitor end to end")
+    parser.add_argument('--sizes', default='10000,100000,1000000', help="Comma-separated row counts")
+    parser.add_argument('--stages', default=','.join(STAGES + ['monitor']))
+    parser.add_argument('--max-train-rows', type=int, default=100_000,
+                        help="Largest size the training stages run at")
+    parser.add_argument('--max-svm-rows', type=int, default=5000, help="Largest size train_svm (kernel SVC) runs at")
+    parser.add_argument('--single-rows', type=int, default=1000, help="Rows scored one call at a time")
+    parser.add_argument('--monitor-profiles', type=int, default=1000)
+    parser.add_argument('--monitor-batch', type=int, default=100, help="Profiles per /monitor request")
+    parser.add_argument('--registry-dir', default=os.environ.get('MODEL_REGISTRY', 'models'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Results JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="Earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Slowdown counted as a regression")
+    parser.add_argument('--verbose', action='store_true', help="Show the stages' own output")
+    args = parser.parse_args()
+
+    os.chdir(REPO_DIR)
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    stages = args.stages.split(',')
+    options = {'registry_dir': args.registry_dir, 'single_rows': args.single_rows, 'verbose': args.verbose}
+    env = environment()
+    print(f"Benchmarking commit {env['commit']} on {env['cpu_count']} CPUs, sizes {sizes}")
+
+    results = []
+    scratch = tempfile.mkdtemp(prefix='bench-data-')
+    try:
+        # Generated once at the largest size; every stage reads a prefix of it
+        started = time.perf_counter()
+        data_path = os.path.join(scratch, 'accounts.pkl')
+        with open(data_path, 'wb') as f:
+            pickle.dump(synthetic_accounts(max(sizes), args.seed), f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"Generated {max(sizes)} synthetic accounts in {time.perf_counter() - started:.1f} s")
+
+        print(f"{'stage':<18} {'rows':>9} {'seconds':>10} {'us/row':>10} {'peak MB':>9} {'+MB':>8}")
+        for stage in (s for s in stages if s != 'monitor'):
+            # Single-row scoring always times the same --single-rows calls, so it runs once
+            for rows in sizes[:1] if stage == 'predict_single' else sizes:
+                limit = stage_limit(stage, args)
+                if limit is not None and rows > limit:
+                    continue
+                result = dict(stage=stage, **in_fresh_process(run_stage, stage, data_path, rows, options))
+                results.append(result)
+                print(f"{stage:<18} {result['rows']:>9} {result['seconds']:>10.3f} {result['us_per_row']:>10.2f} "
+                      f"{result['peak_rss_mb']:>9.1f} {result['peak_delta_mb']:>8.1f}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if 'monitor' in stages:
+        context = multiprocessing.get_context('spawn')
+        ready = context.Queue()
+        server = context.Process(target=serve_stub_profiles, args=(0, ready), daemon=True)
+        server.start()
+        try:
+            port = ready.get(timeout=30)
+            monitor = in_fresh_process(run_monitor, port, args.monitor_profiles, args.monitor_batch,
+                                       args.registry_dir, args.verbose)
+        finally:
+            server.terminate()
+        for label, result in monitor.items():
+            results.append(dict(stage=f'monitor_{label}', us_per_row=round(result['seconds'] / result['rows'] * 1e6, 3),
+                                **result))
+            print(f"{'monitor_' + label:<18} {result['rows']:>9} {result['seconds']:>10.3f} "
+                  f"{result['seconds'] / result['rows'] * 1e6:>10.2f} {result['peak_rss_mb']:>9.1f} "
+                  f"{result['peak_delta_mb']:>8.1f}  ({result['profiles_per_second']} profiles/s, "
+                  f"{result['answered']} answered)")
+
+    output = args.output or os.path.join(REPO_DIR, 'benchmarks', 'results', f"{env['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': env, 'options': vars(args), 'results': results}, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
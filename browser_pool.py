@@ -0,0 +1,211 @@
+import time
+import queue
+import random
+import atexit
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+
+# Dynamic User-Agent list to randomize requests
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.164 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.101 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 14_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0.1 Mobile/15E148 Safari/604.1"
+]
+
+
+@lru_cache(maxsize=None)
+def chromedriver_path():
+    # Resolve (and download if needed) the driver binary once per process
+    return ChromeDriverManager().install()
+
+
+def create_chrome_driver(headless=True):
+    options = Options()
+    options.add_argument(f"user-agent={random.choice(USER_AGENTS)}")
+    options.add_argument("--disable-notifications")
+    options.add_argument("--disable-web-security")
+    options.add_argument("--allow-running-insecure-content")
+    if headless:
+        options.add_argument("--headless=new")
+    return webdriver.Chrome(service=ChromeService(chromedriver_path()), options=options)
+
+
+class RateLimiter:
+    # Spaces out calls made through one session by min_interval plus random jitter
+
+    def __init__(self, min_interval, jitter=0.0):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self.next_allowed = 0.0
+
+    def wait(self):
+        delay = self.next_allowed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_allowed = time.monotonic() + self.min_interval + random.uniform(0, self.jitter)
+
+
+class BrowserSession:
+    def __init__(self, driver, limiter):
+        self.driver = driver
+        self.limiter = limiter
+        self.pages_loaded = 0
+
+
+class BrowserPool:
+    # Long-lived WebDriver sessions shared by all scrape jobs. Sessions are started on
+    # demand up to `size` and leased to one worker at a time.
+
+    def __init__(self, size=2, driver_factory=create_chrome_driver, min_interval=5.0, jitter=5.0):
+        self.size = size
+        self.driver_factory = driver_factory
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._idle = queue.Queue()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+                if len(self._sessions) < self.size:
+                    session = BrowserSession(self.driver_factory(), RateLimiter(self.min_interval, self.jitter))
+                    self._sessions.append(session)
+                    return session
+            # A session dropped by _release frees a slot without going back to the queue
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                pass
+
+    def _healthy(self, session):
+        # Any round trip to the browser will do. A crashed Chrome raises WebDriverException,
+        # a dead chromedriver process a connection error from urllib3.
+        try:
+            session.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _replace_driver(self, session):
+        print("Browser session is not responding, starting a new one")
+        try:
+            session.driver.quit()
+        except Exception as e:
+            print(f"Error closing browser session: {e}")
+        session.driver = self.driver_factory()
+        session.pages_loaded = 0
+
+    def _release(self, session):
+        # Only working sessions go back to the idle queue; a broken one is replaced, or
+        # dropped from the pool if a new browser cannot be started either
+        if not self._closed and not self._healthy(session):
+            try:
+                self._replace_driver(session)
+            except Exception as e:
+                print(f"Could not start a replacement browser session: {e}")
+                with self._lock:
+                    if session in self._sessions:
+                        self._sessions.remove(session)
+                return
+        self._idle.put(session)
+
+    @contextmanager
+    def lease(self):
+        session = self._acquire()
+        try:
+            yield session
+        finally:
+            self._release(session)
+
+    def scrape(self, usernames, extract):
+        # Yields (username, result) pairs as soon as each profile is done
+        usernames = list(usernames)
+        pending = queue.Queue()
+        for username in usernames:
+            pending.put(username)
+        done = queue.Queue()
+
+        live_workers = [min(self.size, len(usernames))]
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                with self.lease() as session:
+                    while True:
+                        try:
+                            username = pending.get_nowait()
+                        except queue.Empty:
+                            return
+                        session.limiter.wait()
+                        try:
+                            result = extract(session.driver, username)
+                        except Exception as e:
+                            print(f"Error scraping {username}: {e}")
+                            result = None
+                        session.pages_loaded += 1
+                        done.put((username, result))
+                        # extract_profile_data swallows errors, so a failed profile is the only
+                        # sign of a crashed browser: check before it fails the rest of the batch
+                        if result is None and not self._healthy(session):
+                            self._replace_driver(session)
+            except Exception as e:
+                print(f"Browser session failed: {e}")
+            finally:
+                with lock:
+                    live_workers[0] -= 1
+                    last_worker = live_workers[0] == 0
+                # Nobody is left to take the remaining usernames, report them as failed
+                if last_worker:
+                    while not pending.empty():
+                        done.put((pending.get_nowait(), None))
+
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(live_workers[0])]
+        for thread in workers:
+            thread.start()
+        try:
+            for _ in range(len(usernames)):
+                yield done.get()
+        finally:
+            # A caller that stops early (e.g. a cancelled job) leaves nothing for the workers to pick up
+            while not pending.empty():
+                try:
+                    pending.get_nowait()
+                except queue.Empty:
+                    break
+        for thread in workers:
+            thread.join()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            try:
+                session.driver.quit()
+            except Exception as e:
+                print(f"Error closing browser session: {e}")
+
+
+def create_pool_from_env(environ):
+    pool = BrowserPool(
+        size=int(environ.get('BROWSER_POOL_SIZE', 2)),
+        driver_factory=lambda: create_chrome_driver(environ.get('BROWSER_HEADLESS', '1') != '0'),
+        min_interval=float(environ.get('SCRAPE_MIN_INTERVAL', 5)),
+        jitter=float(environ.get('SCRAPE_JITTER', 5)),
+    )
+    atexit.register(pool.close)
+    return pool
@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from model_registry import ModelRegistry, LoadedModel, read_current
+
+# Columns the feature pipeline reads; anything else in the input is left on disk
+FEATURE_INPUTS = ['username', 'followers_count', 'following_count', 'subscription_count', 'subscriptions_count',
+                  'is_verified', 'created_at', 'description']
+
+# Raw Twitter dumps such as testing/data/users.csv name some fields differently. Used only
+# when the input lacks the pipeline's own name. The handle (screen_name), not the display
+# name, is the username: sex_code was trained on handles.
+INPUT_ALIASES = {'friends_count': 'following_count', 'verified': 'is_verified', 'screen_name': 'username'}
+
+# First of these found in the input identifies each row in the output
+ID_COLUMNS = ['id', 'screen_name', 'username']
+
+# Per-process model, set once by the pool initializer instead of pickled per chunk
+_MODEL = {}
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet input and output need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def input_format(path):
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return 'sqlite'
+    if path.endswith('.parquet'):
+        return 'parquet'
+    return 'csv'
+
+
+def available_columns(path, fmt, table):
+    if fmt == 'csv':
+        return list(pd.read_csv(path, nrows=0).columns)
+    if fmt == 'parquet':
+        return import_pyarrow().parquet.ParquetFile(path).schema_arrow.names
+    with sqlite3.connect(path) as conn:
+        return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def plan_columns(columns, id_column=None):
+    # (columns to read, renames to apply, id column)
+    id_column = id_column or next((c for c in ID_COLUMNS if c in columns), None)
+    renames = {source: target for source, target in INPUT_ALIASES.items()
+               if source in columns and target not in columns}
+    wanted = [c for c in columns if c in FEATURE_INPUTS or c in renames or c == id_column]
+    return wanted, renames, id_column
+
+
+def iter_input_chunks(path, fmt, columns, chunksize, table='profiles'):
+    # Streams the input so it never has to fit in memory
+    if fmt == 'csv':
+        # Counts are read as text: parse_counts handles "1.5K" and also plain numbers,
+        # and no chunk's dtypes depend on what happened to be in it
+        dtypes = {c: str for c in columns}
+        yield from pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize, keep_default_na=False,
+                               na_values=['', 'NULL'])
+    elif fmt == 'parquet':
+        for batch in import_pyarrow().parquet.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        conn = sqlite3.connect(path)
+        try:
+            query = 'SELECT %s FROM "%s"' % (', '.join(f'"{c}"' for c in columns), table)
+            yield from pd.read_sql_query(query, conn, chunksize=chunksize)
+        finally:
+            conn.close()
+
+
+def load_model(registry_dir, version, threshold):
+    model = ModelRegistry(registry_dir).load_version(version)
+    if threshold is not None:
+        model = LoadedModel(model.version, model.engine, model.pipeline, threshold, model.model_path)
+    _MODEL['model'] = model
+
+
+def score_chunk(chunk, renames, id_column):
+    model = _MODEL['model']
+    started = time.perf_counter()
+    probabilities = model.predict(chunk.rename(columns=renames))
+    scored = pd.DataFrame({
+        'score': probabilities.astype(np.float64),
+        'status': np.where(probabilities >= model.threshold, 'Genuine', 'Fake'),
+        'model_version': model.version,
+    })
+    if id_column is not None:
+        scored.insert(0, id_column, chunk[id_column].to_numpy())
+    return scored, time.perf_counter() - started
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, scored):
+        scored.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def write(self, scored):
+        pa = import_pyarrow()
+        table = pa.Table.from_pandas(scored, preserve_index=False)
+        if self.writer is None:
+            self.writer = pa.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class SqliteUpdater:
+    # Writes score, status and model_version back onto the scored rows, one transaction per chunk
+
+    def __init__(self, path, table, id_column):
+        from storage import migrate
+
+        if id_column is None:
+            raise ValueError(f"Table {table} has no id column to write scores back to")
+        self.conn = sqlite3.connect(path, timeout=30)
+        # Lets the chunk reader keep its snapshot open while scores are committed
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        if table == 'profiles':
+            # The server's migrations add score and model_version to older databases
+            migrate(self.conn)
+        self.statement = f'UPDATE "{table}" SET score = ?, status = ?, model_version = ? WHERE "{id_column}" = ?'
+        self.id_column = id_column
+
+    def write(self, scored):
+        with self.conn:
+            self.conn.executemany(self.statement, zip(scored['score'].tolist(), scored['status'].tolist(),
+                                                      scored['model_version'].tolist(),
+                                                      scored[self.id_column].tolist()))
+
+    def close(self):
+        self.conn.close()
+
+
+def open_writer(output, fmt, path, table, id_column):
+    if output is None:
+        if fmt != 'sqlite':
+            raise ValueError("--output is required unless scoring a SQLite table in place")
+        return SqliteUpdater(path, table, id_column)
+    if output.endswith('.parquet'):
+        return ParquetWriter(output)
+    return CsvWriter(output)
+
+
+def score_file(path, output=None, table='profiles', registry_dir='models', version=None, threshold=None,
+               chunksize=50_000, n_jobs=-1, id_column=None):
+    fmt = input_format(path)
+    columns, renames, id_column = plan_columns(available_columns(path, fmt, table), id_column)
+    version = version or read_current(registry_dir)
+    workers = max(1, os.cpu_count() or 1) if n_jobs < 0 else max(1, n_jobs)
+    writer = open_writer(output, fmt, path, table, id_column)
+    print(f"Scoring {path} ({fmt}) with model {version or 'bundled'} on {workers} processes, "
+          f"{chunksize} rows per chunk; reading {columns}" + (f", renamed {renames}" if renames else ""))
+
+    rows = 0
+    busy_seconds = 0.0
+    started = time.perf_counter()
+    # Chunks are submitted in order and collected oldest first, so the output keeps the
+    # input order and at most `workers * 2` chunks are in memory at once
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_model,
+                             initargs=(registry_dir, version, threshold)) as executor:
+        def collect():
+            nonlocal rows, busy_seconds
+            scored, seconds = pending.popleft().result()
+            writer.write(scored)
+            rows += len(scored)
+            busy_seconds += seconds
+            elapsed = time.perf_counter() - started
+            print(f"{rows} rows scored, {rows / elapsed:,.0f} rows/s")
+
+        try:
+            for chunk in iter_input_chunks(path, fmt, columns, chunksize, table):
+                pending.append(executor.submit(score_chunk, chunk, renames, id_column))
+                if len(pending) >= workers * 2:
+                    collect()
+            while pending:
+                collect()
+        finally:
+            writer.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed else 0.0,
+        'workers': workers,
+        # Share of the wall time the workers spent scoring; low means reading or writing bound
+        'worker_utilisation': round(busy_seconds / (elapsed * workers), 3) if elapsed else 0.0,
+        'model_version': version or 'bundled',
+    }
+    print(f"Scored {rows} rows in {elapsed:.1f} s ({summary['rows_per_second']:,.0f} rows/s, "
+          f"worker utilisation {summary['worker_utilisation']:.0%})")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score already-collected profiles from CSV, Parquet or SQLite")
+    parser.add_argument('input', help="CSV, .parquet, or SQLite database (.db)")
+    parser.add_argument('-o', '--output', help="CSV or .parquet file for the scores; "
+                                                "omit to write them back into the SQLite table")
+    parser.add_argument('--table', default='profiles', help="SQLite table to score")
+    parser.add_argument('--registry-dir', default=os.environ.get('MODEL_REGISTRY', 'models'))
+    parser.add_argument('--version', help="Model version to use instead of the registry's current one")
+    parser.add_argument('--threshold', type=float, help="Override the model's Genuine threshold")
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--id-column', help="Input column copied to the output to identify rows")
+    args = parser.parse_args()
+
+    try:
+        score_file(args.input, args.output, args.table, args.registry_dir, args.version, args.threshold,
+                   args.chunksize, args.n_jobs, args.id_column)
+    except ValueError as e:
+        sys.exit(str(e))
+
+
+if __name__ == '__main__':
+    main()
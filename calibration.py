@@ -0,0 +1,34 @@
+from sklearn.linear_model import LogisticRegression
+
+# Kept out of svmcode.py, which runs as __main__: pickled models refer to their class
+# by module, and __main__.PlattCalibratedSVM cannot be found by any other process
+
+
+class PlattCalibratedSVM:
+    # A linear SVM plus a logistic fit of its decision values on held-out rows, in place
+    # of SVC(probability=True)'s internal 5-fold calibration
+
+    def __init__(self, svm, calibrator):
+        self.svm = svm
+        self.calibrator = calibrator
+        self.classes_ = svm.classes_
+
+    def decision_function(self, X):
+        return self.svm.decision_function(X)
+
+    def predict_proba(self, X):
+        return self.calibrator.predict_proba(self.decision_function(X).reshape(-1, 1))
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+
+def calibrate(svm, X_calibration, y_calibration):
+    return calibrate_scores(svm, svm.decision_function(X_calibration), y_calibration)
+
+
+def calibrate_scores(svm, scores, labels):
+    # calibrate() for decision values already computed chunk by chunk
+    calibrator = LogisticRegression()
+    calibrator.fit(scores.reshape(-1, 1), labels)
+    return PlattCalibratedSVM(svm, calibrator)
@@ -0,0 +1,31 @@
+# Shared by tests/test_count_parsing.py and benchmarks/bench_parse_counts.py
+
+# (text as scraped, expected count). Abbreviated counts are rounded down, like the site does.
+COUNT_CASES = [
+    # plain
+    ('0', 0), ('7', 7), ('42', 42), ('999', 999), ('  42  ', 42), ('+5', 5),
+    # thousands grouping: en, de/es/it, fr (nbsp and narrow nbsp), sv (space), de-CH
+    ('1,234', 1234), ('12,345', 12345), ('1,234,567', 1234567),
+    ('1.234', 1234), ('1.234.567', 1234567),
+    ('1 234', 1234), ('1 234 567', 1234567), ('12 345', 12345), ("1'234", 1234), ('1’234', 1234),
+    # thousands: K, Tsd., mil (es/pt)
+    ('1K', 1000), ('1k', 1000), ('12.3K', 12300), ('12,3K', 12300), ('1.5K', 1500), ('999.9K', 999900),
+    ('10K+', 10000), ('1.234K', 1234), ('5 Tsd.', 5000), ('12,5 Tsd.', 12500), ('3 mil', 3000), ('3,4 mil', 3400),
+    # millions: M, Mn, Mio., millones, million
+    ('1M', 1_000_000), ('1.5M', 1_500_000), ('1,5M', 1_500_000), ('12.34M', 12_340_000), ('1.2 Mn', 1_200_000),
+    ('1,2 Mio.', 1_200_000), ('3,5 millones', 3_500_000), ('1.2 million', 1_200_000), ('100.1M', 100_100_000),
+    # billions: B, Bn, Md, Mrd., Milliarden, billion
+    ('1B', 1_000_000_000), ('1.2B', 1_200_000_000), ('2 Bn', 2_000_000_000), ('1,1 Md', 1_100_000_000),
+    ('2 Mrd.', 2_000_000_000), ('1,2 Milliarden', 1_200_000_000), ('3.1 billion', 3_100_000_000),
+    # separators in both roles
+    ('1,234.5K', 1_234_500), ('1.234,5K', 1_234_500), ('1,234,567.0', 1234567),
+    # stray label text after the count
+    ('1.2K Followers', 1200), ('350 Following', 350), ('1,234 Followers', 1234),
+    # decimals without a suffix keep the integer part
+    ('12.5', 12), ('12,5', 12), ('1.5', 1),
+    # not counts
+    ('', 0), ('abc', 0), ('-5', 0), ('1e5', 0), ('1.5X', 0), ('N/A', 0), (None, 0), (float('nan'), 0),
+    ('12345678901234567890', 0),
+    # already numbers
+    (1234, 1234), (12.0, 12),
+]
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+# Power of ten for each abbreviation X renders after a count, across its locales
+# (1.5K, 12,3 Tsd., 1,2 Mio., 3 mil, 1.2B, 2 Mrd.). Words are matched on their first
+# six letters, upper-cased, which is enough to tell Million from Milliarde.
+SUFFIX_EXPONENTS = {
+    '': 0,
+    'K': 3, 'TSD': 3, 'MIL': 3, 'THOUSA': 3,
+    'M': 6, 'MN': 6, 'MIO': 6, 'MILLIO': 6, 'MILLON': 6,
+    'B': 9, 'BN': 9, 'MD': 9, 'MRD': 9, 'MILLIA': 9, 'BILLIO': 9,
+}
+SUFFIX_LETTERS = 6
+
+# Each character's class, looked up by code point (anything past the table is OTHER)
+PAD, DIGIT, LETTER, COMMA, DOT, SPACE, GROUP, OTHER = range(8)
+LAST_CODE = 0x202f
+# One slot past LAST_CODE stands for every higher code point
+CHAR_CLASSES = np.full(LAST_CODE + 2, OTHER, dtype=np.uint8)
+# Digit values and letter numbers (A=1 .. Z=26, either case)
+CHAR_VALUES = np.zeros(LAST_CODE + 2, dtype=np.int8)
+CHAR_CLASSES[0] = PAD
+CHAR_CLASSES[ord('0'):ord('9') + 1] = DIGIT
+CHAR_VALUES[ord('0'):ord('9') + 1] = np.arange(10)
+for first in (ord('A'), ord('a')):
+    CHAR_CLASSES[first:first + 26] = LETTER
+    CHAR_VALUES[first:first + 26] = np.arange(1, 27)
+CHAR_CLASSES[ord(',')] = COMMA
+CHAR_CLASSES[ord('.')] = DOT
+# Spaces (plain, no-break, narrow no-break, thin) and apostrophes (de-CH) only ever
+# group digits; '+' is the one in "10K+"
+CHAR_CLASSES[[ord(' '), 0xa0, 0x202f, 0x2009]] = SPACE
+CHAR_CLASSES[[ord("'"), 0x2019, ord('+')]] = GROUP
+
+# int64 holds 18 digits; longer counts are rejected rather than wrapped
+MAX_DIGITS = 18
+POWERS_OF_TEN = 10 ** np.arange(MAX_DIGITS + 1, dtype=np.int64)
+# Longer text is not a count, and would widen the character matrix for every row
+MAX_WIDTH = 32
+# Rows looked at to decide whether deduplicating a column pays off
+DEDUPE_SAMPLE = 10000
+
+
+def suffix_key(word):
+    # Letters packed base 27, the same packing parse_count_codes applies to a column
+    key = 0
+    for letter in word[:SUFFIX_LETTERS].upper():
+        key = key * 27 + ord(letter) - 64
+    return key
+
+
+SUFFIX_KEYS, SUFFIX_KEY_EXPONENTS = (np.array(column, dtype=np.int64) for column in
+                                     zip(*sorted((suffix_key(word), e) for word, e in SUFFIX_EXPONENTS.items())))
+
+
+def parse_count_codes(codes):
+    # codes: (rows, width) uint32 code points, zero-padded. Returns (counts, valid).
+    # Each step below handles one kind of character for every row at once, over a
+    # (width, rows) matrix; only the digit and suffix accumulators loop over positions.
+    rows, width = codes.shape
+    points = np.ascontiguousarray(np.minimum(codes, LAST_CODE + 1).astype(np.uint16).T)
+    classes = CHAR_CLASSES[points]
+    values = CHAR_VALUES[points]
+    position = np.arange(width)[:, None]
+
+    # The number is everything before the first letter; the letters there are the suffix
+    # and whatever follows them ("Mio.", "K Followers") is ignored
+    letter = classes == LETTER
+    has_letter = letter.any(axis=0)
+    first_letter = np.where(has_letter, letter.argmax(axis=0), width)
+    in_number = position < first_letter
+    digits = (classes == DIGIT) & in_number
+    comma = (classes == COMMA) & in_number
+    dot = (classes == DOT) & in_number
+    invalid = ((classes == OTHER) & in_number).any(axis=0)
+
+    mantissa = np.zeros(rows, dtype=np.int64)
+    for is_digit, value in zip(digits, values):
+        np.copyto(mantissa, mantissa * 10 + value, where=is_digit)
+    n_digits = digits.sum(axis=0)
+
+    # Suffix words, packed like suffix_key(); only rows that have letters are visited
+    key = np.zeros(rows, dtype=np.int64)
+    spaced = np.zeros(rows, dtype=bool)
+    worded = np.flatnonzero(has_letter)
+    if len(worded):
+        start = first_letter[worded]
+        word_key = np.zeros(len(worded), dtype=np.int64)
+        in_word = np.ones(len(worded), dtype=bool)
+        for offset in range(SUFFIX_LETTERS):
+            at = np.minimum(start + offset, width - 1)
+            in_word &= (start + offset < width) & (classes[at, worded] == LETTER)
+            np.copyto(word_key, word_key * 27 + values[at, worded], where=in_word)
+        key[worded] = word_key
+        # An unknown word after a space is a label ("350 Following"); stuck to the digits
+        # ("1e5", "1.5X") it makes the text something other than a count
+        spaced[worded] = (start > 0) & (classes[np.maximum(start - 1, 0), worded] == SPACE)
+    slot = np.minimum(np.searchsorted(SUFFIX_KEYS, key), len(SUFFIX_KEYS) - 1)
+    known = SUFFIX_KEYS[slot] == key
+    exponent = np.where(known, SUFFIX_KEY_EXPONENTS[slot], 0)
+    valid = ~invalid & (known | spaced) & (n_digits > 0) & (n_digits + exponent <= MAX_DIGITS)
+
+    # Which separator, if any, is the decimal one:
+    #   both kinds present ("1,234.5", "1.234,5")     -> the last one
+    #   one separator, once ("1.5K", "12,3", "1,234") -> decimal unless it is followed by
+    #                                                   exactly three digits and no suffix
+    #   one kind, repeated ("1.234.567")              -> grouping only
+    separators = comma | dot
+    n_comma = comma.sum(axis=0)
+    n_dot = dot.sum(axis=0)
+    last_separator = np.where(separators.any(axis=0), width - 1 - separators[::-1].argmax(axis=0), -1)
+    fraction_digits = (digits & (position > last_separator)).sum(axis=0)
+    single = n_comma + n_dot == 1
+    decimal = ((n_comma > 0) & (n_dot > 0)) | (single & ((exponent > 0) | (fraction_digits != 3)))
+    shift = exponent - np.where(decimal, fraction_digits, 0)
+
+    # Abbreviated counts are rounded down by the site, so the result is too
+    counts = np.where(shift >= 0, mantissa * POWERS_OF_TEN[np.clip(shift, 0, MAX_DIGITS)],
+                      mantissa // POWERS_OF_TEN[np.clip(-shift, 0, MAX_DIGITS)])
+    return np.where(valid, counts, 0), valid
+
+
+def parse_unique_counts(strings):
+    # strings: 1-D str array -> (counts, valid)
+    too_long = np.zeros(len(strings), dtype=bool)
+    if strings.dtype.itemsize // 4 > MAX_WIDTH:
+        too_long = np.char.str_len(strings) > MAX_WIDTH
+        strings = strings.astype(f'U{MAX_WIDTH}')
+    if not len(strings):
+        return np.zeros(0, dtype=np.int64), too_long
+    counts, valid = parse_count_codes(strings.view(np.uint32).reshape(len(strings), strings.dtype.itemsize // 4))
+    valid &= ~too_long
+    return np.where(valid, counts, 0), valid
+
+
+def parse_counts(values, return_valid=False):
+    # Raw count strings (any sequence; numbers and None are fine too) -> int64 array.
+    # Anything that is not a count becomes 0, like the old per-string parser.
+    # Scraped counts repeat a lot ("1.2K", "3,456"), so each distinct string is parsed
+    # once and the results are scattered back with one index operation; when a sample
+    # shows mostly distinct strings the deduplication would cost more than it saves.
+    values = np.asarray(values, dtype=object).reshape(-1)
+    sample = values[:DEDUPE_SAMPLE]
+    if len(values) > DEDUPE_SAMPLE and len(pd.unique(sample)) > len(sample) // 2:
+        # NaN and None go through as 'nan' and 'None', which are not counts either
+        counts, valid = parse_unique_counts(np.asarray(values, dtype=str))
+    else:
+        row_codes, unique_values = pd.factorize(values)
+        unique_counts, unique_valid = parse_unique_counts(np.asarray(unique_values, dtype=str))
+        # factorize marks missing values (None, NaN) with -1, which picks the trailing 0
+        counts = np.append(unique_counts, 0)[row_codes]
+        valid = np.append(unique_valid, False)[row_codes]
+    return (counts, valid) if return_valid else counts
+
+
+def parse_count(count_string):
+    return int(parse_counts([count_string])[0])
@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def tree_contributions(booster, X):
+    # xgboost's exact TreeSHAP: one column per feature plus the bias in the last column,
+    # summing to the margin of each row
+    import xgboost as xgb
+
+    return booster.predict(xgb.DMatrix(X, feature_names=booster.feature_names), pred_contribs=True)
+
+
+def kernel_explainer(predict, X_background, n_clusters=50):
+    # KernelExplainer's cost grows with the background size, so the training set is
+    # summarised by weighted k-means centroids first
+    import shap
+
+    return shap.KernelExplainer(predict, shap.kmeans(X_background, n_clusters))
+
+
+def top_features(contributions, columns, values, k=5):
+    order = np.argsort(-np.abs(contributions))[:k]
+    return [
+        {'feature': columns[i], 'value': float(values[i]), 'contribution': float(contributions[i])}
+        for i in order
+    ]
+
+
+class ProfileExplainer:
+    # Per-profile explanations for the served tree model. Contributions are computed for a
+    # whole batch of scored profiles at once and kept in an LRU keyed by username, tagged
+    # with the snapshot and model version they explain so neither a newer scrape nor a
+    # newly swapped-in model is answered from a stale entry.
+
+    def __init__(self, current_model, max_entries=10000, top_k=10):
+        # Callable returning the served model_registry.LoadedModel
+        self.current_model = current_model
+        self.max_entries = max_entries
+        self.top_k = top_k
+        self._booster = (None, None)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def booster(self, model_path):
+        path, booster = self._booster
+        if path != model_path:
+            import xgboost as xgb
+
+            booster = xgb.Booster()
+            booster.load_model(model_path)
+            booster.set_param({'nthread': 1})
+            self._booster = (model_path, booster)
+        return booster
+
+    def explain_batch(self, keys, records, scraped_at):
+        # keys, records and scraped_at line up; returns the explanations in the same order
+        if not records:
+            return []
+        model = self.current_model()
+        pipeline = model.pipeline
+        raw = pipeline.feature_matrix(records)
+        contributions = tree_contributions(self.booster(model.model_path), pipeline.transform_features(raw))
+        explanations = []
+        with self._lock:
+            for key, row, values, stamp in zip(keys, contributions, raw, scraped_at):
+                explanation = {
+                    'base_value': float(row[-1]),
+                    'margin': float(row.sum()),
+                    'scraped_at': stamp,
+                    'model_version': model.version,
+                    'top_features': top_features(row[:-1], pipeline.columns, values, self.top_k),
+                }
+                self._entries[key] = explanation
+                self._entries.move_to_end(key)
+                explanations.append(explanation)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return explanations
+
+    def get(self, key, scraped_at):
+        version = self.current_model().version
+        with self._lock:
+            explanation = self._entries.get(key)
+            if explanation is None or explanation['scraped_at'] != scraped_at \
+                    or explanation['model_version'] != version:
+                return None
+            self._entries.move_to_end(key)
+            return explanation
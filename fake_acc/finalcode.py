@@ -1,3 +1,5 @@
+import os
+import sys
 import time
 import random
 import sqlite3
@@ -11,6 +13,10 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.options import Options
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from storage import migrate
+from profile_cache import normalize_username
+
 # Dynamic User-Agent list to randomize requests
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36",
@@ -26,30 +32,20 @@ model.load_model('xgboost_model.json')
 # Database setup
 def setup_database():
     conn = sqlite3.connect('profiles.db')  # Create or connect to database
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS profiles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            followers_count INTEGER,
-            following_count INTEGER,
-            subscriptions_count INTEGER,
-            is_verified BOOLEAN,
-            status TEXT
-        )
-    ''')
-    conn.commit()
+    conn.execute('PRAGMA journal_mode=WAL')
+    # Same schema as the server's ProfileStore, so history and the cache read these rows too
+    migrate(conn)
     return conn
 
 # Insert profile data into the database
 def insert_profile_data(conn, profile_data):
     cursor = conn.cursor()
     cursor.execute('''
-        INSERT INTO profiles (username, followers_count, following_count, subscriptions_count, is_verified, status)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (profile_data['username'], profile_data['followers_count'], profile_data['following_count'], 
-          profile_data['subscriptions_count'], profile_data['is_verified'], profile_data['status']))
-    conn.commit()
+        INSERT INTO profiles (username, followers_count, following_count, subscriptions_count, is_verified, status,
+                              scraped_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (normalize_username(profile_data['username']), profile_data['followers_count'], profile_data['following_count'], 
+          profile_data['subscriptions_count'], profile_data['is_verified'], profile_data['status'], time.time()))
 
 # Dynamic wait function with retries
 def find_element(driver, by, value, timeout=10):
@@ -207,10 +203,14 @@ def monitor_profiles(profiles):
         time.sleep(random.uniform(5, 10))  # Random sleep to avoid detection
     
     driver.quit()  # Close the browser after all profiles
+    conn.commit()  # Commit every inserted profile in one transaction
     conn.close()  # Close database connection
     return results
 
-profiles_to_monitor = ['iamsrk']  # Replace with actual usernames
+# Importing this module used to scrape straight away; continuous monitoring is the
+# watchlist scheduler's job (python watchlist.py run)
+if __name__ == '__main__':
+    profiles_to_monitor = ['iamsrk']  # Replace with actual usernames
 
-df_results = monitor_profiles(profiles_to_monitor)
-print(df_results)
+    df_results = monitor_profiles(profiles_to_monitor)
+    print(df_results)
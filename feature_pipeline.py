@@ -0,0 +1,363 @@
+import os
+import re
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from count_parsing import parse_counts
+
+PIPELINE_VERSION = 1
+
+BASE_COLUMNS = [
+    'followers_count', 'following_count', 'subscription_count',
+    'sex_code', 'created_month', 'created_year', 'is_verified', 'description_length'
+]
+BASE_INDEX = {column: i for i, column in enumerate(BASE_COLUMNS)}
+
+# Scraped records use the plural name, the training CSVs the singular one
+COLUMN_ALIASES = {'subscriptions_count': 'subscription_count'}
+
+SEX_CODES = {'female': -2, 'mostly_female': -1, 'unknown': 0, 'mostly_male': 1, 'male': 2}
+
+# Same tokenisation as TfidfVectorizer's defaults
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+# First name -> sex code, filled as names are seen so repeated lookups skip the detector
+SEX_CODE_MEMO = {}
+# Tables already merged into the memo
+LOADED_SEX_CODE_TABLES = set()
+# Most names the memo keeps; the server sets it (SEX_CODE_MEMO_SIZE), the trainers keep every name
+SEX_CODE_MEMO_LIMIT = None
+
+
+@lru_cache(maxsize=None)
+def sex_detector():
+    # Building the detector parses its name list, so each process does it once
+    import gender_guesser.detector as gender
+
+    return gender.Detector()
+
+
+def detect_sex_codes(first_names):
+    detector = sex_detector()
+    return {name: SEX_CODES.get(detector.get_gender(name).split()[0], 0) for name in first_names}
+
+
+def read_sex_code_table(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def load_sex_code_table(path):
+    SEX_CODE_MEMO.update(read_sex_code_table(path))
+    LOADED_SEX_CODE_TABLES.add(path)
+
+
+def save_sex_code_table(path):
+    # Merged with the file, which may hold names this process never loaded (another
+    # trainer's, or ones trimmed from a bounded memo), then renamed into place so a
+    # reader never sees a half-written table
+    table = read_sex_code_table(path)
+    table.update(SEX_CODE_MEMO)
+    scratch = f"{path}.{os.getpid()}.tmp"
+    with open(scratch, 'w') as f:
+        json.dump(table, f)
+    os.replace(scratch, path)
+
+
+def clear_sex_code_memo():
+    SEX_CODE_MEMO.clear()
+    LOADED_SEX_CODE_TABLES.clear()
+
+
+def trim_sex_code_memo():
+    # Oldest names go first, down to 90% of the limit so trimming is not done on every call
+    if SEX_CODE_MEMO_LIMIT is None or len(SEX_CODE_MEMO) <= SEX_CODE_MEMO_LIMIT:
+        return
+    for name in list(SEX_CODE_MEMO)[:len(SEX_CODE_MEMO) - int(SEX_CODE_MEMO_LIMIT * 0.9)]:
+        SEX_CODE_MEMO.pop(name, None)
+
+
+def predict_sex(names, table_path=None, n_jobs=1, min_chunk_size=50000):
+    # Work happens once per distinct username: its first name is looked up in the memo
+    # (gender detection runs only for names never seen, optionally across a process
+    # pool) and the codes are scattered back onto every row with one index operation
+    row_codes, unique_names = pd.factorize(names.fillna('').astype(str))
+    first_names = [name.split(' ', 1)[0] for name in unique_names]
+    if table_path and table_path not in LOADED_SEX_CODE_TABLES:
+        load_sex_code_table(table_path)
+
+    # Looked up into a local dict: other threads may trim the memo meanwhile
+    codes = {name: SEX_CODE_MEMO[name] for name in first_names if name in SEX_CODE_MEMO}
+    missing = list(dict.fromkeys(name for name in first_names if name not in codes))
+    if missing:
+        if n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
+        if n_jobs > 1 and len(missing) > 2 * min_chunk_size:
+            chunk_size = max(min_chunk_size, -(-len(missing) // n_jobs))
+            chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                for detected in executor.map(detect_sex_codes, chunks):
+                    codes.update(detected)
+        else:
+            codes.update(detect_sex_codes(missing))
+        SEX_CODE_MEMO.update((name, codes[name]) for name in missing)
+        if table_path:
+            save_sex_code_table(table_path)
+        trim_sex_code_memo()
+
+    unique_codes = np.array([codes[name] for name in first_names] + [0], dtype=int)
+    # factorize marks missing values with -1, which picks the trailing 0
+    return pd.Series(unique_codes[row_codes], index=names.index)
+
+
+def verified_flags(values):
+    if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)):
+        values = values.map(lambda v: str(v).strip().lower() in ('true', '1', '1.0') if isinstance(v, str) else v)
+    return pd.to_numeric(values, errors='coerce').fillna(0).astype(float)
+
+
+def count_values(values):
+    # Counts as stored in the CSVs are numbers; scraped or uploaded ones may still be
+    # text like "1.5M" or "1,234", which pd.to_numeric would turn into 0
+    values = np.asarray(values)
+    if values.dtype.kind == 'O':
+        try:
+            values = values.astype(np.float64)
+        except (TypeError, ValueError):
+            return parse_counts(values).astype(np.float64)
+    if values.dtype.kind in 'biuf':
+        return np.nan_to_num(values.astype(np.float64), nan=0.0)
+    return parse_counts(values).astype(np.float64)
+
+
+def hash_frame(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+
+
+def as_frame(records):
+    # A DataFrame, a dict of columns, or a list of records
+    if isinstance(records, pd.DataFrame):
+        df = records
+    elif isinstance(records, dict):
+        df = pd.DataFrame(records)
+    else:
+        df = pd.DataFrame(list(records))
+    return df.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if v not in df.columns})
+
+
+class FeaturePipeline:
+    # Everything needed to turn raw account records into the model's scaled feature
+    # matrix. Fit once by the trainers, saved next to the model and reused by serving.
+
+    def __init__(self, max_features=100, vocabulary=None, idf=None, mean=None, scale=None,
+                 data_hash=None, version=PIPELINE_VERSION, sex_code_table=None, n_jobs=1, sparse_text=False):
+        self.max_features = max_features
+        # Sparse pipelines leave TF-IDF columns uncentred so they stay sparse end to end
+        self.sparse_text = sparse_text
+        # Runtime options only, not part of the saved artifact
+        self.sex_code_table = sex_code_table
+        self.n_jobs = n_jobs
+        self.vocabulary = vocabulary or []
+        self.idf = None if idf is None else np.asarray(idf, dtype=np.float64)
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        self.data_hash = data_hash
+        self.version = version
+        self._term_index = {term: i for i, term in enumerate(self.vocabulary)}
+
+    @property
+    def columns(self):
+        return BASE_COLUMNS + self.vocabulary
+
+    def base_matrix(self, df):
+        # BASE_COLUMNS as one float array, filled column by column
+        X = np.zeros((len(df), len(BASE_COLUMNS)))
+        for column in ['followers_count', 'following_count', 'subscription_count']:
+            if column in df.columns:
+                X[:, BASE_INDEX[column]] = count_values(df[column].to_numpy())
+
+        if 'username' in df.columns:
+            X[:, BASE_INDEX['sex_code']] = predict_sex(df['username'], self.sex_code_table, self.n_jobs).to_numpy()
+
+        if 'created_at' in df.columns:
+            created_at = pd.to_datetime(df['created_at'], errors='coerce', dayfirst=True)
+            X[:, BASE_INDEX['created_month']] = created_at.dt.month.fillna(0).to_numpy()
+            X[:, BASE_INDEX['created_year']] = created_at.dt.year.fillna(0).to_numpy()
+
+        if 'is_verified' in df.columns:
+            X[:, BASE_INDEX['is_verified']] = verified_flags(df['is_verified']).to_numpy()
+        if 'description' in df.columns:
+            X[:, BASE_INDEX['description_length']] = self.descriptions(df).str.len().to_numpy()
+        return X
+
+    def base_features(self, df):
+        return pd.DataFrame(self.base_matrix(df), columns=BASE_COLUMNS, index=df.index)
+
+    def descriptions(self, df):
+        if 'description' not in df.columns:
+            return pd.Series('', index=df.index)
+        # A missing description is "0", as in the original trainer whose df.fillna(0) ran
+        # first: description_length is 1 and the text adds no TF-IDF terms
+        return df['description'].fillna("0").astype(str)
+
+    def text_entries(self, df):
+        # TF-IDF as (row, column, value) triplets, l2-normalised per row like TfidfVectorizer
+        rows, columns = [], []
+        texts = self.descriptions(df) if 'description' in df.columns else []
+        for row, text in enumerate(texts):
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                column = self._term_index.get(token)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        # Collapse repeated tokens into counts per (row, column)
+        cells, counts = np.unique(rows * len(self.vocabulary) + columns, return_counts=True)
+        rows, columns = np.divmod(cells, max(len(self.vocabulary), 1))
+        values = counts * self.idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(df)))
+        return rows, columns, values / norms[rows]
+
+    def text_features(self, df):
+        matrix = np.zeros((len(df), len(self.vocabulary)))
+        rows, columns, values = self.text_entries(df)
+        matrix[rows, columns] = values
+        return matrix
+
+    def fit_text(self, records):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        df = as_frame(records)
+        vectorizer = TfidfVectorizer(max_features=self.max_features)
+        vectorizer.fit(self.descriptions(df))
+        self.set_vocabulary(vectorizer.get_feature_names_out().tolist(), vectorizer.idf_)
+        self.data_hash = hash_frame(df)
+        return df
+
+    def fit_features(self, records):
+        return self.features(self.fit_text(records))
+
+    def set_vocabulary(self, vocabulary, idf):
+        self.vocabulary = list(vocabulary)
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self._term_index = {term: i for i, term in enumerate(self.vocabulary)}
+
+    def fit_scaler(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        self.mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        self.scale = np.where(scale == 0, 1.0, scale)
+        return self
+
+    def fit(self, records):
+        return self.fit_scaler(self.fit_features(records))
+
+    def features(self, records):
+        df = as_frame(records)
+        text = pd.DataFrame(self.text_features(df), columns=self.vocabulary, index=df.index)
+        return pd.concat([self.base_features(df), text], axis=1)
+
+    def feature_matrix(self, records):
+        # Same values as features(records).to_numpy(), written straight into one array.
+        # Given a dict of columns (e.g. scraped fields with counts still as text) no
+        # per-row dicts are built at all.
+        df = as_frame(records)
+        n_base = len(BASE_COLUMNS)
+        X = np.zeros((len(df), len(self.columns)))
+        X[:, :n_base] = self.base_matrix(df)
+        rows, columns, values = self.text_entries(df)
+        X[rows, n_base + columns] = values
+        return X
+
+    def scale_features(self, X):
+        if self.mean is None:
+            raise ValueError("Feature pipeline has no fitted scaler")
+        return ((np.asarray(X, dtype=np.float64) - self.mean) / self.scale).astype(np.float32)
+
+    def transform(self, records):
+        return self.transform_features(self.feature_matrix(records))
+
+    def transform_features(self, X):
+        # Unscaled feature matrix -> model input
+        X = self.scale_features(X)
+        if self.sparse_text:
+            # Trained on CSR input, where xgboost saw absent TF-IDF terms as missing
+            text = X[:, len(BASE_COLUMNS):]
+            text[text == 0] = np.nan
+        return X
+
+    def transform_sparse(self, records):
+        # CSR output for out-of-core training: the base columns are stored explicitly
+        # (so a scaled 0 stays a value) and only the TF-IDF terms present are stored
+        from scipy import sparse
+
+        n_base = len(BASE_COLUMNS)
+        if np.any(self.mean[n_base:]):
+            raise ValueError("transform_sparse needs a pipeline whose TF-IDF columns are left uncentred")
+        df = as_frame(records)
+        base = (self.base_features(df).to_numpy() - self.mean[:n_base]) / self.scale[:n_base]
+        rows, columns, values = self.text_entries(df)
+        values = values / self.scale[n_base + columns]
+        base_rows = np.repeat(np.arange(len(df)), n_base)
+        base_columns = np.tile(np.arange(n_base), len(df))
+        matrix = sparse.csr_matrix(
+            (np.concatenate([base.ravel(), values]),
+             (np.concatenate([base_rows, rows]), np.concatenate([base_columns, columns + n_base]))),
+            shape=(len(df), len(self.columns)), dtype=np.float32,
+        )
+        matrix.sort_indices()
+        return matrix
+
+    def check_schema(self, n_features):
+        if len(self.columns) != n_features:
+            raise ValueError(
+                f"Feature pipeline produces {len(self.columns)} columns but the model expects {n_features}"
+            )
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'max_features': self.max_features,
+            'columns': self.columns,
+            'vocabulary': self.vocabulary,
+            'idf': self.idf.tolist(),
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist(),
+            'sparse_text': self.sparse_text,
+            'data_hash': self.data_hash,
+        }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def from_dict(cls, state):
+        if state.get('version') != PIPELINE_VERSION:
+            raise ValueError(f"Unsupported feature pipeline version: {state.get('version')}")
+        pipeline = cls(
+            max_features=state['max_features'],
+            vocabulary=state['vocabulary'],
+            idf=state['idf'],
+            mean=state['mean'],
+            scale=state['scale'],
+            data_hash=state['data_hash'],
+            sparse_text=state.get('sparse_text', False),
+        )
+        if pipeline.columns != state['columns']:
+            raise ValueError("Feature pipeline column order does not match its vocabulary")
+        if not len(pipeline.idf) == len(pipeline.vocabulary) or not len(pipeline.mean) == len(pipeline.scale) == len(pipeline.columns):
+            raise ValueError("Feature pipeline arrays do not match its column count")
+        return pipeline
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
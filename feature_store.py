@@ -0,0 +1,75 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from feature_pipeline import PIPELINE_VERSION
+
+# Bump when the trainers change how X/y are assembled, so stale entries are not reused
+FEATURE_CONFIG_VERSION = 3
+
+STORE_DIR = 'data/feature_store'
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_key(paths, config):
+    # Content of every input file plus everything that changes the features built from it
+    key = {
+        'files': [file_digest(path) for path in paths],
+        'config': config,
+        'pipeline_version': PIPELINE_VERSION,
+        'feature_config_version': FEATURE_CONFIG_VERSION,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def load_features(entry_dir, pipeline):
+    # X and y are memory-mapped, so a load costs a few page faults instead of a parse
+    X = np.load(os.path.join(entry_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(entry_dir, 'y.npy'), mmap_mode='r')
+    with open(os.path.join(entry_dir, 'pipeline.json')) as f:
+        state = json.load(f)
+    pipeline.set_vocabulary(state['vocabulary'], state['idf'])
+    pipeline.data_hash = state['data_hash']
+    return X, y
+
+
+def save_features(entry_dir, X, y, pipeline):
+    # Written to a scratch directory and renamed, so a crashed run never leaves a half entry
+    scratch = entry_dir + '.tmp'
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+    np.save(os.path.join(scratch, 'X.npy'), np.ascontiguousarray(X, dtype=np.float64))
+    np.save(os.path.join(scratch, 'y.npy'), np.asarray(y))
+    with open(os.path.join(scratch, 'pipeline.json'), 'w') as f:
+        json.dump({
+            'columns': pipeline.columns,
+            'vocabulary': pipeline.vocabulary,
+            'idf': pipeline.idf.tolist(),
+            'data_hash': pipeline.data_hash,
+        }, f)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(scratch, entry_dir)
+
+
+def cached_features(paths, pipeline, build, store_dir=STORE_DIR):
+    # Returns the unscaled training matrix and labels for `paths`. On a miss `build()`
+    # produces them (fitting the pipeline's TF-IDF stage); on a hit the pipeline gets the
+    # stored vocabulary back so it matches the cached columns.
+    key = store_key(paths, {'max_features': pipeline.max_features, 'sparse_text': pipeline.sparse_text})
+    entry_dir = os.path.join(store_dir, key)
+    if os.path.exists(os.path.join(entry_dir, 'pipeline.json')):
+        print(f"Loading cached features from {entry_dir}")
+        return load_features(entry_dir, pipeline)
+
+    X, y = build()
+    os.makedirs(store_dir, exist_ok=True)
+    save_features(entry_dir, X, y, pipeline)
+    return load_features(entry_dir, pipeline)
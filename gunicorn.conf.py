@@ -0,0 +1,65 @@
+# Production server: gunicorn -c gunicorn.conf.py
+#
+# The app is imported once in the master (preload_app), so the model, feature pipeline
+# and gender detector are loaded and warmed before forking and shared copy-on-write by
+# the workers. Monitoring jobs, the profile cache and the scoring queue live in each
+# worker's memory, so job status and stream requests must reach the worker that took
+# the job: scale with threads, or put a sticky proxy in front before adding workers.
+import os
+import time
+import signal
+import threading
+
+wsgi_app = 'app:app'
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+preload_app = True
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_WORKERS', 1))
+threads = int(os.environ.get('WEB_THREADS', 16))
+# NDJSON job streams stay open for minutes; gthread workers are not killed for that
+timeout = int(os.environ.get('WORKER_TIMEOUT', 120))
+keepalive = 5
+# How long a stopping worker may spend draining its in-flight scrapes
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 120))
+# Part of graceful_timeout kept back for closing browsers before the master's SIGKILL
+SHUTDOWN_MARGIN = 10
+
+
+def post_fork(server, worker):
+    # Threads do not survive fork, so the model watcher starts here in every worker and
+    # never in the master
+    import app
+
+    app.watch_models()
+
+
+def post_worker_init(worker):
+    # The master SIGKILLs a worker graceful_timeout after sending SIGTERM. Draining starts
+    # on SIGTERM, alongside gunicorn's own wait for in-flight requests (the job streams
+    # among them end when their jobs do), so both share that one budget
+    handle_exit = worker.handle_exit
+
+    def start_drain(sig, frame):
+        handle_exit(sig, frame)
+        if getattr(worker, 'drain', None) is None:
+            import app
+
+            worker.drain_started = time.monotonic()
+            worker.drain = threading.Thread(target=app.shutdown, name='drain', daemon=True,
+                                            kwargs={'timeout': max(graceful_timeout - SHUTDOWN_MARGIN, 0)})
+            worker.drain.start()
+
+    signal.signal(signal.SIGTERM, start_drain)
+    signal.siginterrupt(signal.SIGTERM, False)
+
+
+def worker_exit(server, worker):
+    import app
+
+    drain = getattr(worker, 'drain', None)
+    if drain is None:
+        # Quick shutdown (SIGINT/SIGQUIT) or a worker that failed: nothing is waited for
+        app.shutdown(timeout=0)
+        return
+    # Only what is left of graceful_timeout since SIGTERM, less a second for exiting
+    drain.join(timeout=max(worker.drain_started + graceful_timeout - 1 - time.monotonic(), 0))
@@ -0,0 +1,110 @@
+import time
+import queue
+import random
+import asyncio
+import threading
+import aiohttp
+from browser_pool import USER_AGENTS
+from profile_parsing import parse_profile_html
+
+PROFILE_URL = "https://x.com/{username}/"
+
+
+class HttpExtractor:
+    # Browserless profile fetcher: one pooled aiohttp session per scrape, many profiles
+    # in flight at once, parsed straight from the HTML. Profiles the parsers cannot read
+    # come back as None so the caller can retry them in a browser.
+
+    def __init__(self, url_template=PROFILE_URL, concurrency=100, timeout=15):
+        self.url_template = url_template
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    async def fetch_profile(self, session, semaphore, username):
+        started = time.perf_counter()
+        async with semaphore:
+            try:
+                async with session.get(self.url_template.format(username=username)) as response:
+                    if response.status != 200:
+                        print(f"HTTP {response.status} fetching profile {username}.")
+                        return username, None
+                    html = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Error fetching profile {username}: {e}")
+                return username, None
+        load_ms = (time.perf_counter() - started) * 1000
+
+        fields = parse_profile_html(html, username)
+        if fields is None:
+            return username, None
+        profile_data = {'username': username, **fields}
+        profile_data['timings'] = {
+            'load_ms': round(load_ms, 1),
+            'total_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        return username, profile_data
+
+    async def fetch_profiles(self, usernames, on_result):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        headers = {'User-Agent': random.choice(USER_AGENTS)}
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, headers=headers, timeout=timeout) as session:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            tasks = [asyncio.ensure_future(self.fetch_profile(session, semaphore, username)) for username in usernames]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    on_result(await task)
+            finally:
+                # When cancelled, the fetches still queued or in flight end before the session closes
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def scrape(self, usernames):
+        # Same shape as BrowserPool.scrape: yields (username, profile_data or None) as they finish
+        usernames = list(usernames)
+        done = queue.Queue()
+        stopped = threading.Event()
+        running = {}
+
+        async def fetch():
+            running['loop'], running['task'] = asyncio.get_running_loop(), asyncio.current_task()
+            if not stopped.is_set():
+                await self.fetch_profiles(usernames, done.put)
+
+        def run():
+            try:
+                asyncio.run(fetch())
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                print(f"HTTP extraction failed: {e}")
+            finally:
+                done.put(None)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        reported = set()
+        finished = False
+        try:
+            while True:
+                item = done.get()
+                if item is None:
+                    finished = True
+                    break
+                reported.add(item[0])
+                yield item
+        finally:
+            # A caller that stops early (e.g. a cancelled job) stops the requests still in flight
+            if not finished:
+                stopped.set()
+                if 'task' in running:
+                    try:
+                        running['loop'].call_soon_threadsafe(running['task'].cancel)
+                    except RuntimeError:
+                        pass  # the loop already closed
+            thread.join()
+        # Anything lost to a crashed event loop is handed back as a failure
+        for username in usernames:
+            if username not in reported:
+                yield username, None
@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import roc_auc_score
+from feature_pipeline import FeaturePipeline, load_sex_code_table
+from model_registry import MODEL_FILE, PIPELINE_FILE, MANIFEST_FILE, read_current, version_paths, publish
+from profile_cache import normalize_username
+
+# Model output 1 means Genuine, as in app.py's status labels and ingest.TRAINING_SOURCES
+LABEL_VALUES = {'fake': 0, 'genuine': 1}
+
+# Small steps on top of the served trees. The model file does not keep the parameters it
+# was trained with, so these are the streaming trainer's shape with a lower learning rate.
+INCREMENTAL_PARAMS = {
+    'objective': 'binary:logistic',
+    'eval_metric': 'logloss',
+    'tree_method': 'hist',
+    'max_depth': 5,
+    'learning_rate': 0.05,
+    'subsample': 0.8,
+    'seed': 42,
+}
+
+
+def label_value(label):
+    value = LABEL_VALUES.get(str(label).strip().lower())
+    if value is None:
+        raise ValueError(f"Label must be Fake or Genuine, got {label!r}")
+    return value
+
+
+def current_artifacts(registry_dir, fallback_model=MODEL_FILE, fallback_pipeline=PIPELINE_FILE):
+    # (version, model path, pipeline path, manifest) of the model being served
+    version = read_current(registry_dir)
+    if version is None:
+        return None, fallback_model, fallback_pipeline, {}
+    with open(os.path.join(registry_dir, version, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    return (version, *version_paths(registry_dir, version, manifest), manifest)
+
+
+def reference_holdout(pipeline, sex_code_table='data/sex_codes.json'):
+    # The full trainer's own test split (same labels, seed and stratification), so the
+    # guard also sees the population the served model was fitted on
+    from ingest import read_datasets
+
+    load_sex_code_table(sex_code_table)
+    x, y = read_datasets()
+    _, test_index = train_test_split(np.arange(len(y)), test_size=0.20, random_state=42, stratify=y)
+    return pipeline.transform(x.iloc[test_index]), y[test_index]
+
+
+def split_new_rows(rows, y, holdout_size, seed=42):
+    # Stratified when both labels have a few rows; a handful of one class is all training
+    counts = np.bincount(y, minlength=2)
+    if counts.min() < 2 or len(y) * holdout_size < 2:
+        return rows, y, rows[:0], y[:0]
+    train, test = train_test_split(np.arange(len(y)), test_size=holdout_size, random_state=seed, stratify=y)
+    return rows[train], y[train], rows[test], y[test]
+
+
+def auc(booster, X, y):
+    # None when the holdout has a single class and AUC is undefined
+    if len(np.unique(y)) < 2:
+        return None
+    return float(roc_auc_score(y, booster.predict(xgb.DMatrix(X, missing=np.nan))))
+
+
+def format_auc(value):
+    return 'n/a' if value is None else f"{value:.4f}"
+
+
+def regressions(before, after, max_drop):
+    # Holdouts where the updated model's AUC fell by more than max_drop
+    return [name for name in before
+            if before[name] is not None and after[name] is not None and before[name] - after[name] > max_drop]
+
+
+def update_model(store, registry_dir='models', rounds=20, min_rows=50, holdout_size=0.2, max_auc_drop=0.005,
+                 threshold=None, dry_run=False):
+    # Continues boosting the served model on profiles labelled since it was trained and
+    # publishes the result, unless it scores worse on either holdout. Returns a summary.
+    started = time.perf_counter()
+    base_version, model_path, pipeline_path, manifest = current_artifacts(registry_dir)
+    base_metrics = manifest.get('metrics', {})
+    labels_through = base_metrics.get('labels_through')
+    profiles = store.labeled_profiles(since=labels_through)
+    summary = {'base_version': base_version or 'bundled', 'new_rows': len(profiles), 'published': None}
+    if len(profiles) < min_rows:
+        print(f"{len(profiles)} new labelled profiles since model {summary['base_version']}, "
+              f"need {min_rows}; nothing to do.")
+        return dict(summary, reason='too few new labels')
+
+    # The pipeline is reused as is: new trees must see the columns, vocabulary and
+    # scaling the served trees were built on
+    pipeline = FeaturePipeline.load(pipeline_path)
+    rows = np.array(profiles, dtype=object)
+    y = np.array([label_value(p['label']) for p in profiles])
+    train_rows, y_train, test_rows, y_test = split_new_rows(rows, y, holdout_size)
+    holdouts = {'reference': reference_holdout(pipeline)}
+    if len(test_rows):
+        holdouts['new'] = (pipeline.transform(list(test_rows)), y_test)
+
+    booster = xgb.Booster(model_file=model_path)
+    before = {name: auc(booster, X, y_holdout) for name, (X, y_holdout) in holdouts.items()}
+    # Boosting a model that ranks Fake above Genuine with these labels would pull it both
+    # ways at once, so the served model has to agree with LABEL_VALUES first
+    if before['reference'] < 0.5:
+        raise ValueError(f"Model {summary['base_version']} scores fake accounts higher than genuine ones on the "
+                         f"reference holdout (AUC {before['reference']:.4f}); its output is not P(genuine) "
+                         f"and cannot be updated with Genuine = 1 labels. Retrain it with profile_detection.py.")
+    fit_started = time.perf_counter()
+    dtrain = xgb.DMatrix(pipeline.transform(list(train_rows)), label=y_train, missing=np.nan)
+    # xgb_model= warm start: the served trees are kept and `rounds` trees are added
+    updated = xgb.train(INCREMENTAL_PARAMS, dtrain, num_boost_round=rounds, xgb_model=model_path)
+    fit_seconds = time.perf_counter() - fit_started
+    after = {name: auc(updated, X, y_holdout) for name, (X, y_holdout) in holdouts.items()}
+
+    summary.update({
+        'train_rows': len(y_train),
+        'holdout_rows': len(y_test),
+        'rounds': rounds,
+        'trees': booster.num_boosted_rounds() + rounds,
+        'auc_before': before,
+        'auc_after': after,
+        'fit_seconds': round(fit_seconds, 3),
+        'labels_through': profiles[-1]['labeled_at'],
+    })
+    changes = [f"{name} holdout AUC {format_auc(before[name])} -> {format_auc(after[name])}" for name in holdouts]
+    print(f"Trained {rounds} more rounds on {len(y_train)} labelled profiles in {fit_seconds:.2f} s; "
+          + ', '.join(changes))
+
+    failed = regressions(before, after, max_auc_drop)
+    if failed:
+        print(f"Not publishing: AUC dropped by more than {max_auc_drop} on the {' and '.join(failed)} holdout.")
+        return dict(summary, reason='holdout AUC regression', seconds=round(time.perf_counter() - started, 3))
+    if dry_run:
+        return dict(summary, reason='dry run', seconds=round(time.perf_counter() - started, 3))
+
+    threshold = manifest.get('threshold', 0.68) if threshold is None else threshold
+    scratch = tempfile.mkdtemp(prefix='incremental-')
+    try:
+        updated.save_model(os.path.join(scratch, MODEL_FILE))
+        shutil.copyfile(pipeline_path, os.path.join(scratch, PIPELINE_FILE))
+        metrics = {key: summary[key] for key in ('base_version', 'train_rows', 'holdout_rows', 'rounds',
+                                                 'auc_before', 'auc_after', 'labels_through')}
+        # The next update starts after labels_through, so no label is boosted on twice
+        version = publish(registry_dir, os.path.join(scratch, MODEL_FILE), os.path.join(scratch, PIPELINE_FILE),
+                          threshold, metrics={'incremental': metrics, 'labels_through': summary['labels_through']})
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    print(f"Published model version {version} to {registry_dir}")
+    return dict(summary, published=version, seconds=round(time.perf_counter() - started, 3))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Label monitored profiles and update the served model with them")
+    parser.add_argument('--db', default='profiles.db')
+    parser.add_argument('--registry-dir', default=os.environ.get('MODEL_REGISTRY', 'models'))
+    commands = parser.add_subparsers(dest='command', required=True)
+    label_parser = commands.add_parser('label', help="Record confirmed verdicts for monitored profiles")
+    label_parser.add_argument('label', help="Fake or Genuine")
+    label_parser.add_argument('usernames', nargs='+')
+    update_parser = commands.add_parser('update', help="Warm-start the current model on the new labels")
+    update_parser.add_argument('--rounds', type=int, default=20)
+    update_parser.add_argument('--min-rows', type=int, default=50)
+    update_parser.add_argument('--holdout-size', type=float, default=0.2)
+    update_parser.add_argument('--max-auc-drop', type=float, default=0.005)
+    update_parser.add_argument('--threshold', type=float, help="Genuine threshold for the new version "
+                                                                "(default: the current version's)")
+    update_parser.add_argument('--dry-run', action='store_true', help="Train and check but do not publish")
+    args = parser.parse_args()
+
+    from storage import ProfileStore
+
+    store = ProfileStore(args.db)
+    if args.command == 'label':
+        try:
+            label = ('Fake', 'Genuine')[label_value(args.label)]
+        except ValueError as e:
+            sys.exit(str(e))
+        labeled = store.set_labels([(normalize_username(u), label) for u in args.usernames])
+        print(f"Labelled {labeled} profiles {label}.")
+    else:
+        try:
+            summary = update_model(store, args.registry_dir, args.rounds, args.min_rows, args.holdout_size,
+                                   args.max_auc_drop, args.threshold, args.dry_run)
+        except ValueError as e:
+            sys.exit(str(e))
+        print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
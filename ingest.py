@@ -0,0 +1,215 @@
+import os
+import json
+import glob
+import hashlib
+import argparse
+from collections import Counter
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from scipy import sparse
+from feature_pipeline import FeaturePipeline, BASE_COLUMNS, TOKEN_PATTERN
+
+# The training CSVs and their labels, shared by every trainer: 1 is genuine, 0 is fake,
+# as the served model's output and the status labels read it (p >= threshold is Genuine)
+TRAINING_SOURCES = [("data/gusers.csv", 1), ("data/fusers.csv", 0)]
+DATASET_FILES = [path for path, _ in TRAINING_SOURCES]
+
+COUNT_COLUMNS = ['followers_count', 'following_count', 'subscription_count']
+
+# Declared up front so chunks never fall back to per-chunk type inference. Counts are
+# read as text and coerced afterwards: a float64 dtype makes read_csv fail on any stray
+# non-numeric cell.
+CSV_DTYPES = {
+    'username': str,
+    'created_at': str,
+    'description': str,
+    'followers_count': str,
+    'following_count': str,
+    'subscription_count': str,
+    'is_verified': str,
+}
+
+
+def coerce_counts(df):
+    # Non-numeric counts become NaN (0 as a feature), as in the original trainers
+    for column in COUNT_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+def read_datasets(sources=TRAINING_SOURCES):
+    # All sources in memory as one frame, with each row labelled by its source
+    frames = [pd.read_csv(path) for path, _ in sources]
+    x = coerce_counts(pd.concat(frames, ignore_index=True))
+    y = np.concatenate([np.full(len(frame), label, dtype=int) for frame, (_, label) in zip(frames, sources)])
+    return x, y
+
+
+def iter_chunks(sources, chunksize):
+    for path, label in sources:
+        for chunk in pd.read_csv(path, dtype=CSV_DTYPES, chunksize=chunksize):
+            yield coerce_counts(chunk.reset_index(drop=True)), np.full(len(chunk), label, dtype=np.float32)
+
+
+class TextStatistics:
+    # Streaming equivalent of TfidfVectorizer.fit: term and document counts per chunk
+
+    def __init__(self):
+        self.term_counts = Counter()
+        self.doc_counts = Counter()
+        self.n_docs = 0
+
+    def update(self, descriptions):
+        for text in descriptions:
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            self.term_counts.update(tokens)
+            self.doc_counts.update(set(tokens))
+        self.n_docs += len(descriptions)
+
+    def vocabulary(self, max_features):
+        # Most frequent terms (ties broken alphabetically), returned in alphabetical order
+        top = sorted(self.term_counts.items(), key=lambda item: (-item[1], item[0]))[:max_features]
+        vocabulary = sorted(term for term, _ in top)
+        df = np.array([self.doc_counts[term] for term in vocabulary], dtype=np.float64)
+        idf = np.log((1 + self.n_docs) / (1 + df)) + 1
+        return vocabulary, idf
+
+
+class MomentStatistics:
+    def __init__(self, n_columns):
+        self.n = 0
+        self.total = np.zeros(n_columns)
+        self.total_squares = np.zeros(n_columns)
+
+    def update(self, X):
+        self.n += len(X)
+        self.total += X.sum(axis=0)
+        self.total_squares += (X ** 2).sum(axis=0)
+
+    def mean_and_scale(self):
+        mean = self.total / self.n
+        std = np.sqrt(np.maximum(self.total_squares / self.n - mean ** 2, 0))
+        return mean, np.where(std == 0, 1.0, std)
+
+
+def split_mask(n_rows, test_fraction, rng):
+    return rng.random(n_rows) < test_fraction
+
+
+def fit_streaming_pipeline(sources, chunksize=100_000, max_features=100, test_fraction=0.2, seed=42,
+                           sex_code_table=None):
+    # One pass over the CSVs: TF-IDF vocabulary over every row and base-column moments over
+    # the training rows, as the in-memory trainer does. TF-IDF columns keep mean 0 and
+    # scale 1 so they stay sparse; scaling does not change a tree model's splits.
+    pipeline = FeaturePipeline(max_features=max_features, sex_code_table=sex_code_table, sparse_text=True)
+    text = TextStatistics()
+    moments = MomentStatistics(len(BASE_COLUMNS))
+    data_hash = hashlib.sha256()
+    rng = np.random.default_rng(seed)
+
+    for chunk, _ in iter_chunks(sources, chunksize):
+        data_hash.update(pd.util.hash_pandas_object(chunk, index=False).values.tobytes())
+        text.update(pipeline.descriptions(chunk))
+        train_rows = ~split_mask(len(chunk), test_fraction, rng)
+        moments.update(pipeline.base_features(chunk).to_numpy()[train_rows])
+
+    vocabulary, idf = text.vocabulary(max_features)
+    pipeline.set_vocabulary(vocabulary, idf)
+    base_mean, base_scale = moments.mean_and_scale()
+    pipeline.mean = np.concatenate([base_mean, np.zeros(len(vocabulary))])
+    pipeline.scale = np.concatenate([base_scale, np.ones(len(vocabulary))])
+    pipeline.data_hash = data_hash.hexdigest()
+    return pipeline
+
+
+def build_feature_cache(sources, cache_dir, pipeline, chunksize=100_000, test_fraction=0.2, seed=42):
+    # Second pass: every chunk is transformed straight to CSR and written as its own
+    # .npz file, so no step ever holds more than one chunk in memory
+    os.makedirs(cache_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(cache_dir, '*-*.np[yz]')):
+        os.remove(stale)
+
+    rng = np.random.default_rng(seed)
+    counts = {'train': 0, 'test': 0}
+    for index, (chunk, labels) in enumerate(iter_chunks(sources, chunksize)):
+        X = pipeline.transform_sparse(chunk)
+        test_rows = split_mask(len(chunk), test_fraction, rng)
+        for split, rows in (('train', ~test_rows), ('test', test_rows)):
+            if not rows.any():
+                continue
+            sparse.save_npz(os.path.join(cache_dir, f'{split}-{index:05d}.npz'), X[rows])
+            np.save(os.path.join(cache_dir, f'{split}-{index:05d}.npy'), labels[rows])
+            counts[split] += int(rows.sum())
+
+    pipeline.save(os.path.join(cache_dir, 'feature_pipeline.json'))
+    with open(os.path.join(cache_dir, 'manifest.json'), 'w') as f:
+        json.dump({'rows': counts, 'columns': pipeline.columns, 'data_hash': pipeline.data_hash}, f)
+    return counts
+
+
+class CachedChunkIter(xgb.DataIter):
+    # Feeds cached CSR chunks to xgboost one at a time
+
+    def __init__(self, cache_dir, split, cache_prefix=None):
+        self.files = sorted(glob.glob(os.path.join(cache_dir, f'{split}-*.npz')))
+        self.position = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self.position == len(self.files):
+            return False
+        path = self.files[self.position]
+        input_data(data=sparse.load_npz(path), label=np.load(path[:-len('.npz')] + '.npy'))
+        self.position += 1
+        return True
+
+    def reset(self):
+        self.position = 0
+
+
+def load_dmatrix(cache_dir, split='train', ref=None, external_memory=False):
+    if external_memory:
+        # Pages are spilled to disk next to the cache instead of being held in RAM
+        prefix = os.path.join(cache_dir, f'xgb-{split}')
+        return xgb.DMatrix(CachedChunkIter(cache_dir, split, cache_prefix=prefix))
+    return xgb.QuantileDMatrix(CachedChunkIter(cache_dir, split), ref=ref)
+
+
+def cached_chunk_paths(cache_dir, split):
+    return sorted(glob.glob(os.path.join(cache_dir, f'{split}-*.npz')))
+
+
+def load_cached_chunk(path):
+    return sparse.load_npz(path), np.load(path[:-len('.npz')] + '.npy')
+
+
+def iter_cached_chunks(cache_dir, split):
+    # Same chunks as CachedChunkIter, for estimators trained with partial_fit
+    for path in cached_chunk_paths(cache_dir, split):
+        yield load_cached_chunk(path)
+
+
+def load_labels(cache_dir, split):
+    files = sorted(glob.glob(os.path.join(cache_dir, f'{split}-*.npy')))
+    return np.concatenate([np.load(path) for path in files])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the training CSVs into an on-disk CSR feature cache")
+    parser.add_argument('--cache-dir', default='data/feature_cache')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--max-features', type=int, default=100)
+    args = parser.parse_args()
+
+    print("Fitting feature pipeline...")
+    pipeline = fit_streaming_pipeline(TRAINING_SOURCES, args.chunksize, args.max_features,
+                                      sex_code_table='data/sex_codes.json')
+    print("Writing feature cache...")
+    counts = build_feature_cache(TRAINING_SOURCES, args.cache_dir, pipeline, args.chunksize)
+    print(f"Cached {counts['train']} training and {counts['test']} test rows in {args.cache_dir}")
+
+
+if __name__ == '__main__':
+    main()
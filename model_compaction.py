@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import roc_auc_score, log_loss
+from tree_engine import TreeEnsemble
+from feature_pipeline import FeaturePipeline
+from model_registry import MODEL_FILE, PIPELINE_FILE, UBJ_MODEL_FILE, publish
+
+# Per-tree node arrays in xgboost's JSON model schema, rebuilt when splits are removed
+NODE_FIELDS = ['base_weights', 'default_left', 'loss_changes', 'split_conditions', 'split_indices', 'split_type',
+               'sum_hessian']
+ROOT_PARENT = 2147483647
+
+REPORT_FILE = 'compaction_report.json'
+
+
+def load_model_dict(path):
+    # The model in xgboost's JSON schema, whatever format it is stored in
+    return json.loads(xgb.Booster(model_file=path).save_raw('json'))
+
+
+def to_booster(model):
+    booster = xgb.Booster()
+    booster.load_model(bytearray(json.dumps(model).encode()))
+    return booster
+
+
+def gbtree(model):
+    return model['learner']['gradient_booster']['model']
+
+
+def gain_importance(model):
+    # Total split gain per feature index, xgboost's 'total_gain' importance
+    n_features = int(model['learner']['learner_model_param']['num_feature'])
+    gain = np.zeros(n_features)
+    for tree in gbtree(model)['trees']:
+        splits = np.asarray(tree['left_children']) != -1
+        np.add.at(gain, np.asarray(tree['split_indices'])[splits], np.asarray(tree['loss_changes'])[splits])
+    return gain
+
+
+def choose_columns(gain, keep_gain):
+    # Most important columns first until they hold keep_gain of the total; the rest are pruned
+    order = np.argsort(-gain, kind='stable')
+    covered = np.cumsum(gain[order]) / max(gain.sum(), 1e-12)
+    n_keep = int(np.searchsorted(covered, keep_gain - 1e-12) + 1)
+    keep = np.zeros(len(gain), dtype=bool)
+    keep[order[:n_keep]] = True
+    return keep & (gain > 0)
+
+
+def column_constants(X):
+    # The value a pruned column is frozen at: missing if it mostly is (sparse TF-IDF
+    # pipelines), otherwise its median, which for a TF-IDF column is "term absent"
+    mostly_missing = np.isnan(X).mean(axis=0) > 0.5
+    with np.errstate(all='ignore'):
+        medians = np.nanmedian(np.where(np.isnan(X).all(axis=0), 0, X), axis=0)
+    return np.where(mostly_missing, np.nan, medians)
+
+
+def prune_tree(tree, keep, constants):
+    # Splits on pruned columns are replaced by the branch the frozen value takes, and the
+    # remaining nodes are renumbered breadth first
+    left, right = tree['left_children'], tree['right_children']
+    split_indices, conditions, default_left = tree['split_indices'], tree['split_conditions'], tree['default_left']
+
+    def resolve(node):
+        while left[node] != -1 and not keep[split_indices[node]]:
+            value = constants[split_indices[node]]
+            go_left = default_left[node] if np.isnan(value) else value < conditions[node]
+            node = left[node] if go_left else right[node]
+        return node
+
+    order = [resolve(0)]
+    parents = [ROOT_PARENT]
+    new_left, new_right = [], []
+    for position, node in enumerate(order):
+        if left[node] == -1:
+            new_left.append(-1)
+            new_right.append(-1)
+            continue
+        for children, child in ((new_left, left[node]), (new_right, right[node])):
+            children.append(len(order))
+            order.append(resolve(child))
+            parents.append(position)
+
+    pruned = dict(tree)
+    for field in NODE_FIELDS:
+        pruned[field] = [tree[field][node] for node in order]
+    pruned.update(left_children=new_left, right_children=new_right, parents=parents)
+    pruned['tree_param'] = dict(tree['tree_param'], num_nodes=str(len(order)), num_deleted='0')
+    return pruned
+
+
+def prune_columns(model, keep, constants):
+    model = json.loads(json.dumps(model))
+    gbtree(model)['trees'] = [prune_tree(tree, keep, constants) for tree in gbtree(model)['trees']]
+    return model
+
+
+def truncate(model, n_trees):
+    # Boosted trees are additive, so the first n_trees are a complete, smaller model
+    model = json.loads(json.dumps(model))
+    trees = gbtree(model)
+    trees['trees'] = trees['trees'][:n_trees]
+    trees['tree_info'] = trees['tree_info'][:n_trees]
+    trees['iteration_indptr'] = list(range(n_trees + 1))
+    trees['gbtree_model_param']['num_trees'] = str(n_trees)
+    return model
+
+
+def count_nodes(model):
+    return sum(len(tree['left_children']) for tree in gbtree(model)['trees'])
+
+
+def used_columns(model):
+    return int((gain_importance(model) > 0).sum())
+
+
+def row_latency_us(engine, X, repeats=1000):
+    # Median time to score one row, as a single /monitor profile is scored
+    samples = []
+    for i in range(repeats):
+        row = X[i % len(X):i % len(X) + 1]
+        started = time.perf_counter()
+        engine.predict(row)
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples) * 1e6)
+
+
+def batch_latency_us(engine, X, repeats=3):
+    # Per-row time when scoring the whole matrix at once (bulk scoring)
+    best = min(timed(engine.predict, X) for _ in range(repeats))
+    return float(best / len(X) * 1e6)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def load_seconds(path, repeats=5):
+    return float(min(timed(TreeEnsemble.load, path) for _ in range(repeats)))
+
+
+def truncation_curve(model, X_valid, y_valid, points=20):
+    # (trees, validation logloss, AUC, latencies) at evenly spaced tree counts
+    booster = to_booster(model)
+    n_trees = len(gbtree(model)['trees'])
+    dvalid = xgb.DMatrix(X_valid, missing=np.nan)
+    counts = sorted(set(np.linspace(1, n_trees, min(points, n_trees)).round().astype(int)) | {n_trees})
+    curve = []
+    for n in counts:
+        probabilities = booster.predict(dvalid, iteration_range=(0, int(n)))
+        engine = TreeEnsemble.from_dict(truncate(model, int(n)))
+        curve.append({
+            'trees': int(n),
+            'logloss': float(log_loss(y_valid, probabilities, labels=[0, 1])),
+            'auc': float(roc_auc_score(y_valid, probabilities)),
+            'row_latency_us': row_latency_us(engine, X_valid, repeats=100),
+            'batch_row_latency_us': batch_latency_us(engine, X_valid, repeats=2),
+        })
+    return curve
+
+
+def choose_tree_count(curve, max_loss_increase):
+    # Fewest trees whose validation logloss is within max_loss_increase (relative) of the best
+    best = min(point['logloss'] for point in curve)
+    return min(point['trees'] for point in curve if point['logloss'] <= best * (1 + max_loss_increase))
+
+
+def describe(path, X_test, y_test):
+    engine = TreeEnsemble.load(path)
+    return {
+        'file': os.path.basename(path),
+        'size_bytes': os.path.getsize(path),
+        'load_ms': round(load_seconds(path) * 1000, 2),
+        'trees': engine.num_trees(),
+        'nodes': len(engine.left),
+        'depth': engine.depth,
+        'row_latency_us': round(row_latency_us(engine, X_test), 1),
+        'batch_row_latency_us': round(batch_latency_us(engine, X_test), 3),
+        'auc': round(float(roc_auc_score(y_test, engine.predict(X_test))), 5),
+    }
+
+
+def compact(model_path, pipeline_path, output_dir, keep_gain=0.99, max_loss_increase=0.01, holdout=None):
+    # Writes a pruned, truncated UBJSON model plus its (unchanged) pipeline and a report
+    # to output_dir. The trainer's test split is halved: one half picks the columns' frozen
+    # values and the tree count, the other measures AUC before and after.
+    pipeline = FeaturePipeline.load(pipeline_path)
+    if holdout is None:
+        from incremental_training import reference_holdout
+
+        holdout = reference_holdout(pipeline)
+    X, y = holdout
+    X_valid, X_test, y_valid, y_test = train_test_split(X, y, test_size=0.5, random_state=42, stratify=y)
+
+    model = load_model_dict(model_path)
+    gain = gain_importance(model)
+    keep = choose_columns(gain, keep_gain)
+    pruned = prune_columns(model, keep, column_constants(X_valid))
+    print(f"Kept {keep.sum()} of {len(keep)} columns ({keep_gain:.1%} of split gain); "
+          f"{count_nodes(model)} -> {count_nodes(pruned)} nodes")
+
+    curve = truncation_curve(pruned, X_valid, y_valid)
+    n_trees = choose_tree_count(curve, max_loss_increase)
+    print(f"{'trees':>6} {'logloss':>9} {'auc':>8} {'one row us':>11} {'batched us/row':>15}")
+    for point in curve:
+        marker = ' <' if point['trees'] == n_trees else ''
+        print(f"{point['trees']:>6} {point['logloss']:>9.5f} {point['auc']:>8.5f} {point['row_latency_us']:>11.1f} "
+              f"{point['batch_row_latency_us']:>15.2f}{marker}")
+    compacted = truncate(pruned, n_trees)
+
+    os.makedirs(output_dir, exist_ok=True)
+    compact_path = os.path.join(output_dir, UBJ_MODEL_FILE)
+    to_booster(compacted).save_model(compact_path)
+    shutil.copyfile(pipeline_path, os.path.join(output_dir, PIPELINE_FILE))
+    # The pipeline still produces every column: TF-IDF rows are normalised over the whole
+    # vocabulary, so the kept terms only keep their values if the pruned ones are computed too
+    pipeline.check_schema(TreeEnsemble.load(compact_path).num_features())
+
+    report = {
+        'source': model_path,
+        'keep_gain': keep_gain,
+        'max_loss_increase': max_loss_increase,
+        'validation_rows': len(y_valid),
+        'test_rows': len(y_test),
+        'kept_columns': [column for column, kept in zip(pipeline.columns, keep) if kept],
+        'pruned_columns': int((~keep).sum()),
+        'used_columns': {'before': used_columns(model), 'after': used_columns(compacted)},
+        'truncation_curve': curve,
+        'trees': n_trees,
+        'before': describe(model_path, X_test, y_test),
+        'after': describe(compact_path, X_test, y_test),
+    }
+    with open(os.path.join(output_dir, REPORT_FILE), 'w') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    return report
+
+
+def print_report(report):
+    before, after = report['before'], report['after']
+    print(f"\n{'':<24} {'before':>14} {'after':>14}")
+    for key, label in (('size_bytes', 'size (bytes)'), ('load_ms', 'load (ms)'), ('trees', 'trees'),
+                       ('nodes', 'nodes'), ('depth', 'depth'), ('row_latency_us', 'one row (us)'),
+                       ('batch_row_latency_us', 'batched (us/row)'), ('auc', 'test AUC')):
+        print(f"{label:<24} {before[key]:>14} {after[key]:>14}")
+    print(f"{'columns used':<24} {report['used_columns']['before']:>14} {report['used_columns']['after']:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune, truncate and export a compact binary model for serving")
+    parser.add_argument('--model', default=MODEL_FILE)
+    parser.add_argument('--pipeline', default=PIPELINE_FILE)
+    parser.add_argument('--output-dir', default='compact_model')
+    parser.add_argument('--keep-gain', type=float, default=0.99,
+                        help="Share of total split gain the kept columns must cover")
+    parser.add_argument('--max-loss-increase', type=float, default=0.01,
+                        help="Relative validation logloss increase allowed when dropping trees")
+    parser.add_argument('--publish', action='store_true', help="Publish the compact model to the registry")
+    parser.add_argument('--registry-dir', default=os.environ.get('MODEL_REGISTRY', 'models'))
+    parser.add_argument('--threshold', type=float, default=0.68)
+    args = parser.parse_args()
+
+    compact(args.model, args.pipeline, args.output_dir, args.keep_gain, args.max_loss_increase)
+    print(f"Wrote {args.output_dir}/{UBJ_MODEL_FILE} and {REPORT_FILE}")
+    if args.publish:
+        report_path = os.path.join(args.output_dir, REPORT_FILE)
+        with open(report_path) as f:
+            report = json.load(f)
+        version = publish(args.registry_dir, os.path.join(args.output_dir, UBJ_MODEL_FILE),
+                          os.path.join(args.output_dir, PIPELINE_FILE), args.threshold,
+                          metrics={'compaction': {key: report[key] for key in ('trees', 'before', 'after')}})
+        print(f"Published model version {version}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import itertools
+import threading
+from tree_engine import TreeEnsemble
+from feature_pipeline import FeaturePipeline
+
+MODEL_FILE = 'xgboost_model.json'
+# Compacted models are stored in xgboost's binary UBJSON format under this name
+UBJ_MODEL_FILE = 'xgboost_model.ubj'
+PIPELINE_FILE = 'feature_pipeline.json'
+MANIFEST_FILE = 'manifest.json'
+# Name of the active version, replaced atomically by publish/activate
+CURRENT_FILE = 'CURRENT'
+
+# Fed through every newly loaded model before it takes traffic
+WARM_UP_ROWS = [
+    {'username': 'Warm Up', 'followers_count': 120, 'following_count': 80, 'subscriptions_count': 0,
+     'is_verified': False, 'description': 'warm up row'},
+    {'username': 'Another', 'followers_count': 0, 'following_count': 5000, 'subscriptions_count': 3,
+     'is_verified': True},
+]
+
+
+class LoadedModel:
+    # Everything one scoring call needs. Never mutated, so a reader holding one keeps a
+    # consistent model, pipeline and threshold even if a newer version is swapped in.
+
+    def __init__(self, version, engine, pipeline, threshold, model_path):
+        self.version = version
+        self.engine = engine
+        self.pipeline = pipeline
+        self.threshold = threshold
+        self.model_path = model_path
+
+    def predict(self, records):
+        return self.engine.predict(self.pipeline.transform(records))
+
+    def warm_up(self, rows=WARM_UP_ROWS):
+        started = time.perf_counter()
+        probabilities = self.predict(rows)
+        if len(probabilities) != len(rows) or not all(0.0 <= p <= 1.0 for p in probabilities):
+            raise ValueError(f"Model {self.version} returned invalid probabilities during warm-up")
+        return (time.perf_counter() - started) * 1000
+
+
+def load_model(model_path, pipeline_path, threshold, version):
+    engine = TreeEnsemble.load(model_path)
+    pipeline = FeaturePipeline.load(pipeline_path)
+    pipeline.check_schema(engine.num_features())
+    return LoadedModel(version, engine, pipeline, threshold, model_path)
+
+
+def model_file_name(model_path):
+    # Keeps the format recognisable by extension, which xgboost's own loader relies on
+    return UBJ_MODEL_FILE if model_path.endswith('.ubj') else MODEL_FILE
+
+
+def version_paths(registry_dir, version, manifest):
+    # (model path, pipeline path) of a published version
+    version_dir = os.path.join(registry_dir, version)
+    return (os.path.join(version_dir, manifest.get('model_file', MODEL_FILE)),
+            os.path.join(version_dir, PIPELINE_FILE))
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_current(registry_dir):
+    try:
+        with open(os.path.join(registry_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def activate(registry_dir, version):
+    if not os.path.exists(os.path.join(registry_dir, version, MANIFEST_FILE)):
+        raise ValueError(f"Unknown model version: {version}")
+    path = os.path.join(registry_dir, CURRENT_FILE)
+    with open(path + '.tmp', 'w') as f:
+        f.write(version + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def read_manifest(registry_dir, version):
+    try:
+        with open(os.path.join(registry_dir, version, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def same_artifacts(manifest, model_file, model_hash, pipeline_hash, threshold):
+    return (manifest.get('model_file') == model_file and manifest.get('model_sha256') == model_hash
+            and manifest.get('pipeline_sha256') == pipeline_hash and manifest.get('threshold') == threshold)
+
+
+def publish(registry_dir, model_path, pipeline_path, threshold, metrics=None, make_current=True):
+    # Copies the artifacts into a new version directory (staged, then renamed, so the
+    # watcher never sees a partial one) and points CURRENT at it. Versions are named
+    # <time>-<model hash>; publishing the same artifacts again within the second returns
+    # the existing version, and different ones get a -2, -3, ... suffix.
+    model_hash = file_hash(model_path)
+    pipeline_hash = file_hash(pipeline_path)
+    model_file = model_file_name(model_path)
+    base = time.strftime('%Y%m%d-%H%M%S') + '-' + model_hash[:8]
+    os.makedirs(registry_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.' + base + '.', dir=registry_dir)
+    try:
+        shutil.copyfile(model_path, os.path.join(staging, model_file))
+        shutil.copyfile(pipeline_path, os.path.join(staging, PIPELINE_FILE))
+        # Loading it here catches a broken model before any server tries to
+        load_model(os.path.join(staging, model_file), os.path.join(staging, PIPELINE_FILE), threshold, base).warm_up()
+
+        for attempt in itertools.count(1):
+            version = base if attempt == 1 else f"{base}-{attempt}"
+            existing = read_manifest(registry_dir, version)
+            if existing is not None:
+                if same_artifacts(existing, model_file, model_hash, pipeline_hash, threshold):
+                    break
+                continue
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump({
+                    'version': version,
+                    'threshold': threshold,
+                    'model_file': model_file,
+                    'model_sha256': model_hash,
+                    'pipeline_sha256': pipeline_hash,
+                    'created_at': time.time(),
+                    'metrics': metrics or {},
+                }, f, indent=2)
+            try:
+                os.replace(staging, os.path.join(registry_dir, version))
+                staging = None
+                break
+            except OSError:
+                # Another publisher took the name since it was checked
+                if not os.path.isdir(os.path.join(registry_dir, version)):
+                    raise
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+    if make_current:
+        activate(registry_dir, version)
+    return version
+
+
+def list_versions(registry_dir):
+    versions = []
+    if os.path.isdir(registry_dir):
+        for name in sorted(os.listdir(registry_dir)):
+            manifest = os.path.join(registry_dir, name, MANIFEST_FILE)
+            if not name.startswith('.') and os.path.exists(manifest):
+                with open(manifest) as f:
+                    versions.append(json.load(f))
+    return versions
+
+
+class ModelRegistry:
+    # Serves the active version of a model registry directory:
+    #
+    #   models/CURRENT                 name of the active version
+    #   models/<version>/              xgboost_model.json (or .ubj), feature_pipeline.json, manifest.json
+    #
+    # A watcher thread polls CURRENT, loads and warms the new version off the request
+    # path and swaps it in with one assignment. Without a registry the bundled
+    # xgboost_model.json and feature_pipeline.json are served as version 'bundled'.
+
+    def __init__(self, registry_dir='models', default_threshold=0.68, fallback_model=MODEL_FILE,
+                 fallback_pipeline=PIPELINE_FILE):
+        self.registry_dir = registry_dir
+        self.default_threshold = default_threshold
+        self.fallback_model = fallback_model
+        self.fallback_pipeline = fallback_pipeline
+        self.current = None
+        self.last_error = None
+        self.swaps = 0
+        # A version that failed is not retried until CURRENT names another one
+        self._failed_version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def load_version(self, version):
+        if version is None:
+            return load_model(self.fallback_model, self.fallback_pipeline, self.default_threshold, 'bundled')
+        with open(os.path.join(self.registry_dir, version, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        threshold = manifest.get('threshold')
+        model_path, pipeline_path = version_paths(self.registry_dir, version, manifest)
+        return load_model(model_path, pipeline_path, self.default_threshold if threshold is None else threshold, version)
+
+    def refresh(self):
+        # Loads CURRENT if it names a version other than the one being served. A version
+        # that fails to load or warm up is skipped and the old model keeps serving.
+        version = read_current(self.registry_dir)
+        with self._lock:
+            if self.current is not None and (version or 'bundled') in (self.current.version, self._failed_version):
+                return False
+            try:
+                loaded = self.load_version(version)
+                warm_ms = loaded.warm_up()
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+                self._failed_version = version
+                if self.current is None:
+                    raise
+                print(f"Keeping model {self.current.version}, could not load {version}: {e}")
+                return False
+            previous = self.current
+            self.current = loaded
+            self.swaps += 1
+            self.last_error = None
+            self._failed_version = None
+        print(f"Serving model {loaded.version} (threshold {loaded.threshold}, warm-up {warm_ms:.1f} ms)"
+              + (f", replaced {previous.version}" if previous else ""))
+        return True
+
+    def get(self):
+        if self.current is None:
+            self.refresh()
+        return self.current
+
+    def watch(self, interval=10.0):
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Model registry watcher error: {e}")
+
+        self._watcher = threading.Thread(target=run, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        current = self.current
+        return {
+            'version': current.version if current else None,
+            'threshold': current.threshold if current else None,
+            'registry_dir': self.registry_dir,
+            'swaps': self.swaps,
+            'last_error': self.last_error,
+            'watching': self._watcher is not None and self._watcher.is_alive(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the model registry served by app.py")
+    parser.add_argument('--registry-dir', default=os.environ.get('MODEL_REGISTRY', 'models'))
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish_parser = commands.add_parser('publish', help="Add a model version and make it current")
+    publish_parser.add_argument('--model', default=MODEL_FILE)
+    publish_parser.add_argument('--pipeline', default=PIPELINE_FILE)
+    publish_parser.add_argument('--threshold', type=float, default=0.68)
+    publish_parser.add_argument('--no-activate', action='store_true')
+    activate_parser = commands.add_parser('activate', help="Serve an existing version (e.g. to roll back)")
+    activate_parser.add_argument('version')
+    commands.add_parser('list', help="List the published versions")
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        version = publish(args.registry_dir, args.model, args.pipeline, args.threshold,
+                          make_current=not args.no_activate)
+        print(f"Published {version}")
+    elif args.command == 'activate':
+        activate(args.registry_dir, args.version)
+        print(f"Activated {args.version}")
+    else:
+        current = read_current(args.registry_dir)
+        for manifest in list_versions(args.registry_dir):
+            marker = '*' if manifest['version'] == current else ' '
+            print(f"{marker} {manifest['version']}  threshold {manifest['threshold']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+FINISHED_STATES = ('done', 'cancelled', 'failed')
+
+
+class MonitorJob:
+    def __init__(self, usernames, options=None):
+        self.id = uuid.uuid4().hex
+        self.usernames = usernames
+        self.options = options or {}
+        self.status = 'queued'
+        self.results = []
+        self.failed = []
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def set_status(self, status, error=None):
+        with self._changed:
+            self.status = status
+            self.error = error
+            if status in FINISHED_STATES:
+                self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def add_result(self, username, result):
+        with self._changed:
+            if result is None:
+                self.failed.append(username)
+            else:
+                self.results.append(result)
+            self._changed.notify_all()
+
+    def wait(self, timeout=None):
+        with self._changed:
+            return self._changed.wait_for(lambda: self.finished, timeout)
+
+    def iter_results(self, heartbeat=15):
+        # Yields results in arrival order until the job finishes; None is yielded as a
+        # keep-alive whenever nothing arrived for `heartbeat` seconds
+        sent = 0
+        while True:
+            with self._changed:
+                if sent == len(self.results) and not self.finished:
+                    self._changed.wait(heartbeat)
+                pending = self.results[sent:]
+                finished = self.finished
+            for result in pending:
+                yield result
+            sent += len(pending)
+            if finished and sent == len(self.results):
+                return
+            if not pending:
+                yield None
+
+    def to_dict(self, include_results=True):
+        state = {
+            'job_id': self.id,
+            'status': self.status,
+            'total': len(self.usernames),
+            'completed': len(self.results),
+            'failed': list(self.failed),
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if self.error:
+            state['error'] = self.error
+        if include_results:
+            state['results'] = list(self.results)
+        return state
+
+
+class JobManager:
+    # Runs monitoring jobs on a small thread pool so request handlers return at once.
+    # `scrape` yields (username, result or None) pairs; the manager only tracks them.
+    # Keyword options given to submit() are passed through to `scrape`.
+
+    def __init__(self, scrape, max_workers=4, max_finished_jobs=200):
+        self.scrape = scrape
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='monitor-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, usernames, **options):
+        job = MonitorJob(list(usernames), options)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel_requested.set()
+            if job.status == 'queued':
+                job.set_status('cancelled')
+        return job
+
+    def active_jobs(self):
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.finished]
+
+    def _run(self, job):
+        if job.cancel_requested.is_set():
+            return
+        job.set_status('running')
+        try:
+            results = self.scrape(job.usernames, **job.options)
+            for username, result in results:
+                job.add_result(username, result)
+                if job.cancel_requested.is_set():
+                    results.close()
+                    job.set_status('cancelled')
+                    return
+            job.set_status('done')
+        except Exception as e:
+            print(f"Monitoring job {job.id} failed: {e}")
+            job.set_status('failed', error=str(e))
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True, timeout=None):
+        # Stops taking jobs and lets queued and running ones finish. Jobs still unfinished
+        # after `timeout` seconds are cancelled, which keeps their partial results.
+        self._executor.shutdown(wait=False)
+        if not wait:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in self.active_jobs():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not job.wait(remaining):
+                print(f"Cancelling monitoring job {job.id} at shutdown.")
+                self.cancel(job.id)
+        self._executor.shutdown(wait=True)
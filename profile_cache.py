@@ -0,0 +1,65 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+def normalize_username(username):
+    return username.strip().lstrip('@').lower()
+
+
+class ProfileCache:
+    # Read-through cache for scraped profile verdicts: an in-process LRU in front of the
+    # latest snapshot per user in profiles.db, both expiring entries after `ttl` seconds.
+    # The cache never writes to the store; snapshots are persisted by the scrape job.
+
+    def __init__(self, store, ttl=3600, max_entries=10000):
+        self.store = store
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _remember(self, key, result, cached_at):
+        with self._lock:
+            self._entries[key] = (result, cached_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def get(self, username):
+        key = normalize_username(username)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return entry[0]
+                del self._entries[key]
+                self.counters['expirations'] += 1
+
+        snapshot = self.store.latest_snapshot(key)
+        if snapshot is not None and snapshot['scraped_at'] and now - snapshot['scraped_at'] < self.ttl:
+            self._remember(key, snapshot, snapshot['scraped_at'])
+            self._count('db_hits')
+            return snapshot
+
+        self._count('misses')
+        return None
+
+    def put(self, username, result):
+        self._remember(normalize_username(username), result, result.get('scraped_at') or time.time())
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, size=len(self._entries), max_entries=self.max_entries, ttl=self.ttl)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['db_hits']) / lookups if lookups else 0.0
+        return stats
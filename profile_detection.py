@@ -1,108 +1,44 @@
-import pandas as pd
-import numpy as np
+import sys
+import time
 import xgboost as xgb
-import joblib
-import shap
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-from sklearn.metrics import roc_curve, auc
-from sklearn.feature_extraction.text import TfidfVectorizer
-import gender_guesser.detector as gender
-
-def read_datasets():
-    genuine_users = pd.read_csv("data/gusers.csv")
-    fake_users = pd.read_csv("data/fusers.csv")
-    x = pd.concat([genuine_users, fake_users], ignore_index=True)
-    y = [0] * len(fake_users) + [1] * len(genuine_users)
-    return x, y
-
-def predict_sex(names):
-    detector = gender.Detector()
-    first_names = names.str.split(' ').str.get(0)
-    sex = first_names.apply(lambda x: detector.get_gender(x).split()[0])
-    sex_dict = {'female': -2, 'mostly_female': -1, 'unknown': 0, 'mostly_male': 1, 'male': 2}
-    return sex.map(sex_dict).fillna(0).astype(int)
-
-def extract_features(df):
-    # Convert numeric columns
-    df['followers_count'] = pd.to_numeric(df['followers_count'], errors='coerce')
-    df['following_count'] = pd.to_numeric(df['following_count'], errors='coerce')
-    df['subscription_count'] = pd.to_numeric(df['subscription_count'], errors='coerce')
-    
-    # Fill NaN values with 0
-    df.fillna(0, inplace=True)
-    
-    # Predict gender from username
-    if 'username' in df.columns:
-        df['sex_code'] = predict_sex(df['username'])
-        # Save the sex_code column to the CSV
-        df.to_csv("data/updated_users.csv", index=False)
-    else:
-        df['sex_code'] = 0
-
-    # Extract creation month and year from 'created_at'
-    if 'created_at' in df.columns:
-        df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce', dayfirst=True)  # Added dayfirst=True
-        df['created_month'] = df['created_at'].dt.month.fillna(0).astype(int)
-        df['created_year'] = df['created_at'].dt.year.fillna(0).astype(int)
-    else:
-        df['created_month'] = df['created_year'] = 0
-
-    # Feature extraction from 'description'
-    if 'description' in df.columns:
-        # Fill NaN descriptions with empty strings
-        df['description'] = df['description'].fillna("").astype(str)  # Ensure description is treated as string
-        
-        # Create a feature for the length of the description
-        df['description_length'] = df['description'].apply(len)
-        
-        # Use TF-IDF to vectorize the description text
-        vectorizer = TfidfVectorizer(max_features=100)  # Limit to 100 features
-        tfidf_matrix = vectorizer.fit_transform(df['description'])
-        
-        # Convert the sparse matrix to a DataFrame
-        tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), columns=vectorizer.get_feature_names_out())
-        
-        # Concatenate TF-IDF features back into the original DataFrame
-        df = pd.concat([df, tfidf_df], axis=1)
-        
-    else:
-        df['description_length'] = 0
-
-    feature_columns_to_use = [
-        'followers_count', 'following_count', 'subscription_count',
-        'sex_code', 'created_month', 'created_year', 'is_verified', 'description_length'
-    ]
-    
-    # Add the TF-IDF columns (if description was processed)
-    if 'description' in df.columns:
-        feature_columns_to_use += vectorizer.get_feature_names_out().tolist()
-
-    return df[feature_columns_to_use]
-
-def train_xgboost(X, y):
+from feature_pipeline import FeaturePipeline
+from feature_store import cached_features
+from tuning import Tuner
+from reports import StageTimer, start_report, finish_report
+from explain import tree_contributions
+from model_registry import publish
+from ingest import TRAINING_SOURCES, DATASET_FILES, read_datasets, fit_streaming_pipeline, build_feature_cache, \
+    load_dmatrix, load_labels
+
+def extract_features(df, pipeline):
+    return pipeline.fit_features(df)
+
+def load_features(pipeline):
+    # X/y come from the feature store when the CSVs and feature config are unchanged
+    def build():
+        print("Reading datasets...")
+        x, y = read_datasets()
+        print("Extracting features...")
+        return extract_features(x, pipeline).to_numpy(), y
+
+    return cached_features(DATASET_FILES, pipeline, build)
+
+def train_xgboost(X, y, pipeline):
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.20, random_state=42, stratify=y)
 
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-
-    xgb_model = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss', random_state=42)
-
-    param_grid = {
-        'n_estimators': [50, 100, 200],
-        'max_depth': [3, 5, 7],
-        'learning_rate': [0.01, 0.1, 0.2],
-        'subsample': [0.8, 1.0]
-    }
+    pipeline.fit_scaler(X_train)
+    X_train_scaled = pipeline.scale_features(X_train)
+    X_test_scaled = pipeline.scale_features(X_test)
 
-    grid_search = GridSearchCV(xgb_model, param_grid, cv=3, scoring='accuracy', verbose=1)
-    grid_search.fit(X_train_scaled, y_train)
+    started = time.perf_counter()
+    best_params = Tuner(n_jobs=-1).successive_halving(X_train_scaled, y_train)
+    print(f"Best parameters found in {time.perf_counter() - started:.1f} s: ", best_params)
 
-    print("Best parameters found: ", grid_search.best_params_)
-    clf = grid_search.best_estimator_
+    clf = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss', tree_method='hist',
+                            random_state=42, **best_params)
+    clf.fit(X_train_scaled, y_train)
 
     predictions = clf.predict(X_test_scaled)
     predicted_probabilities = clf.predict_proba(X_test_scaled)[:, 1]
@@ -110,72 +46,76 @@ def train_xgboost(X, y):
     print("Classification Report (XGBoost):\n", classification_report(y_test, predictions))
     print("Confusion Matrix (XGBoost):\n", confusion_matrix(y_test, predictions))
 
-    return y_test, predictions, predicted_probabilities, clf, X_train_scaled, X_test_scaled, scaler
-
-def save_model_and_scaler(model, scaler):
-    model.save_model('xgboost_model.json')
-    joblib.dump(scaler, 'scaler.pkl')
-
-def plot_confusion_matrix(cm):
-    plt.figure()
-    plt.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
-    plt.title('Confusion Matrix (XGBoost)')
-    plt.colorbar()
-    target_names = ['Fake', 'Genuine']
-    tick_marks = np.arange(len(target_names))
-    plt.xticks(tick_marks, target_names, rotation=45)
-    plt.yticks(tick_marks, target_names)
-    fmt = '.2f'
-    thresh = cm.max() / 2.
-    for i in range(cm.shape[0]):
-        for j in range(cm.shape[1]):
-            value = cm[i, j]
-            plt.text(j, i, f'{value:{fmt}}',
-                     horizontalalignment="center",
-                     color="white" if value > thresh else "black")
-    plt.tight_layout()
-    plt.ylabel('True label')
-    plt.xlabel('Predicted label')
-    plt.show()
-
-def plot_roc_curve(y_true, y_scores):
-    fpr, tpr, _ = roc_curve(y_true, y_scores)
-    roc_auc = auc(fpr, tpr)
-    plt.figure()
-    plt.plot(fpr, tpr, label='ROC curve (area = {:.2f})'.format(roc_auc))
-    plt.plot([0, 1], [0, 1], 'k--')
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('False Positive Rate')
-    plt.ylabel('True Positive Rate')
-    plt.title('Receiver Operating Characteristic')
-    plt.legend(loc="lower right")
-    plt.show()
-
-def explain_with_shap(model, X_train_scaled, X_test_scaled):
-    # Explain the model's predictions using SHAP
-    explainer = shap.Explainer(model)
-    shap_values = explainer.shap_values(X_test_scaled)
+    return y_test, predictions, predicted_probabilities, clf, X_train_scaled, X_test_scaled
+
+def train_xgboost_streaming(cache_dir):
+    # Out-of-core path: CSR chunks from the feature cache go straight into xgboost
+    dtrain = load_dmatrix(cache_dir, 'train')
+    dtest = load_dmatrix(cache_dir, 'test', ref=dtrain)
+    params = {
+        'objective': 'binary:logistic',
+        'eval_metric': 'logloss',
+        'tree_method': 'hist',
+        'max_depth': 5,
+        'learning_rate': 0.1,
+        'subsample': 0.8,
+        'seed': 42,
+    }
+    booster = xgb.train(params, dtrain, num_boost_round=200, evals=[(dtest, 'test')], verbose_eval=50)
 
-    # Summary plot
-    shap.summary_plot(shap_values, X_test_scaled)
+    y_test = load_labels(cache_dir, 'test')
+    predicted_probabilities = booster.predict(dtest)
+    predictions = (predicted_probabilities >= 0.5).astype(int)
 
-def main():
-    print("Reading datasets...")
-    x, y = read_datasets()
-    print("Extracting features...")
-    x = extract_features(x)
-    y = np.array(y)
-    y_test, predictions, predicted_probabilities, model, X_train_scaled, X_test_scaled, scaler = train_xgboost(x, y)
+    print("Classification Report (XGBoost):\n", classification_report(y_test, predictions))
+    print("Confusion Matrix (XGBoost):\n", confusion_matrix(y_test, predictions))
 
-    cm = confusion_matrix(y_test, predictions)
-    plot_confusion_matrix(cm)
-    plot_roc_curve(y_test, predicted_probabilities)
+    return y_test, predictions, predicted_probabilities, booster
 
-    save_model_and_scaler(model, scaler)
+def save_model_and_pipeline(model, pipeline, registry_dir='models', threshold=0.68):
+    model.save_model('xgboost_model.json')
+    pipeline.save('feature_pipeline.json')
+    # Running servers pick the new version up from the registry without a restart
+    version = publish(registry_dir, 'xgboost_model.json', 'feature_pipeline.json', threshold)
+    print(f"Published model version {version} to {registry_dir}")
 
-    # Explain the model with SHAP
-    explain_with_shap(model, X_train_scaled, X_test_scaled)
+def explain_with_shap(model, X_train_scaled, X_test_scaled):
+    # Explain the model's predictions with xgboost's native TreeSHAP (bias column dropped)
+    shap_values = tree_contributions(model.get_booster(), X_test_scaled)[:, :-1]
+    return shap_values, X_test_scaled
+
+def main(report_dir='reports/xgboost'):
+    timer = StageTimer()
+    pipeline = FeaturePipeline(max_features=100, sex_code_table='data/sex_codes.json', n_jobs=-1)
+    with timer.stage('features'):
+        x, y = load_features(pipeline)
+    with timer.stage('training'):
+        y_test, predictions, predicted_probabilities, model, X_train_scaled, X_test_scaled = train_xgboost(x, y, pipeline)
+
+    # Plots and the SHAP summary render in a background process while the model is exported
+    report = start_report(report_dir, 'XGBoost', y_test, predictions, predicted_probabilities, timer.timings,
+                          explain=(explain_with_shap, (model, X_train_scaled, X_test_scaled)), columns=pipeline.columns)
+    with timer.stage('export'):
+        save_model_and_pipeline(model, pipeline)
+    finish_report(report, report_dir, timer.timings)
+
+def main_streaming(cache_dir='data/feature_cache', chunksize=100_000, report_dir='reports/xgboost'):
+    timer = StageTimer()
+    with timer.stage('features'):
+        print("Fitting feature pipeline over streamed datasets...")
+        pipeline = fit_streaming_pipeline(TRAINING_SOURCES, chunksize, max_features=100, sex_code_table='data/sex_codes.json')
+        print("Writing feature cache...")
+        build_feature_cache(TRAINING_SOURCES, cache_dir, pipeline, chunksize)
+    with timer.stage('training'):
+        y_test, predictions, predicted_probabilities, model = train_xgboost_streaming(cache_dir)
+
+    report = start_report(report_dir, 'XGBoost', y_test, predictions, predicted_probabilities, timer.timings)
+    with timer.stage('export'):
+        save_model_and_pipeline(model, pipeline)
+    finish_report(report, report_dir, timer.timings)
 
 if __name__ == "__main__":
-    main()
+    if '--streaming' in sys.argv:
+        main_streaming()
+    else:
+        main()
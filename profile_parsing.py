@@ -0,0 +1,107 @@
+import re
+import json
+import html as html_lib
+from count_parsing import parse_count
+
+
+# Page parsers take (html, username) and return the profile fields, or None when the
+# page does not carry them (e.g. it needs JavaScript to render). They are tried in order.
+PROFILE_PARSERS = []
+
+
+def register_parser(parser):
+    PROFILE_PARSERS.append(parser)
+    return parser
+
+
+# A JSON string (escapes included) or a brace, so braces inside strings are skipped
+JSON_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}]')
+
+
+def object_end(text, start):
+    # Index just past the object that opens at text[start], or None if it never closes
+    depth = 0
+    for token in JSON_TOKEN.finditer(text, start):
+        if token.group() == '{':
+            depth += 1
+        elif token.group() == '}':
+            depth -= 1
+            if depth == 0:
+                return token.end()
+    return None
+
+
+def enclosing_object(text, start, end):
+    # The innermost JSON object around text[start:end], parsed. Candidates are tried from
+    # the nearest '{' outwards; one that closes before `end` is a sibling value, and one
+    # that does not parse started inside a string.
+    brace = text.rfind('{', 0, start)
+    while brace != -1:
+        close = object_end(text, brace)
+        if close is not None and close >= end:
+            try:
+                value = json.loads(text[brace:close])
+            except ValueError:
+                value = None
+            if isinstance(value, dict):
+                return value
+        brace = text.rfind('{', 0, brace)
+    return None
+
+
+def count_field(user, key):
+    value = user.get(key)
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+@register_parser
+def parse_embedded_json(html, username):
+    # User objects serialised into the page state, e.g. {"screen_name":"...","followers_count":12,...}.
+    # Fields are read from the object that holds screen_name and nowhere else, so a second
+    # user on the page (a recommended account, a quoted author) cannot leak into the result.
+    anchor = re.search(r'"screen_name"\s*:\s*"%s"' % re.escape(username), html, re.IGNORECASE)
+    if not anchor:
+        return None
+    user = enclosing_object(html, anchor.start(), anchor.end())
+    if user is None:
+        return None
+    followers = count_field(user, 'followers_count')
+    following = count_field(user, 'friends_count')
+    if followers is None or following is None:
+        return None
+    return {
+        'followers_count': followers,
+        'following_count': following,
+        'subscriptions_count': count_field(user, 'subscriptions_count') or 0,
+        'is_verified': bool(user.get('verified') or user.get('is_blue_verified')),
+    }
+
+
+def count_link_text(html, username, path):
+    # Text of the first <span> inside the profile's /followers-style link, as the XPaths read it
+    pattern = r'<a[^>]+href="[^"]*/%s/[^"]*%s"[^>]*>.*?<span[^>]*>([^<]+)<' % (re.escape(username), path)
+    match = re.search(pattern, html, re.IGNORECASE | re.DOTALL)
+    return html_lib.unescape(match.group(1)) if match else None
+
+
+@register_parser
+def parse_count_links(html, username):
+    followers = count_link_text(html, username, 'followers')
+    following = count_link_text(html, username, 'following')
+    if followers is None or following is None:
+        return None
+    subscriptions = count_link_text(html, username, 'subscriptions')
+    return {
+        'followers_count': parse_count(followers),
+        'following_count': parse_count(following),
+        'subscriptions_count': parse_count(subscriptions) if subscriptions else 0,
+        'is_verified': 'aria-label="Verified"' in html,
+    }
+
+
+def parse_profile_html(html, username):
+    for parser in PROFILE_PARSERS:
+        fields = parser(html, username)
+        if fields is not None:
+            return fields
+    return None
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import html
+import multiprocessing
+from contextlib import contextmanager
+import numpy as np
+
+REPORT_FILES = {
+    'confusion_matrix': 'confusion_matrix.png',
+    'roc_curve': 'roc_curve.png',
+    'shap_summary': 'shap_summary.png',
+}
+
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - started, 3)
+
+
+def classification_metrics(y_true, y_pred, y_score):
+    from sklearn.metrics import roc_auc_score, confusion_matrix, accuracy_score
+
+    return {
+        'rows': int(len(y_true)),
+        'auc': float(roc_auc_score(y_true, y_score)),
+        'accuracy': float(accuracy_score(y_true, y_pred)),
+        'confusion_matrix': confusion_matrix(y_true, y_pred).tolist(),
+    }
+
+
+def plot_confusion_matrix(plt, cm, model_name, path):
+    fig = plt.figure()
+    plt.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
+    plt.title(f'Confusion Matrix ({model_name})')
+    plt.colorbar()
+    target_names = ['Fake', 'Genuine']
+    tick_marks = np.arange(len(target_names))
+    plt.xticks(tick_marks, target_names, rotation=45)
+    plt.yticks(tick_marks, target_names)
+    fmt = '.2f'
+    thresh = cm.max() / 2.
+    for i in range(cm.shape[0]):
+        for j in range(cm.shape[1]):
+            value = cm[i, j]
+            plt.text(j, i, f'{value:{fmt}}',
+                     horizontalalignment="center",
+                     color="white" if value > thresh else "black")
+    plt.tight_layout()
+    plt.ylabel('True label')
+    plt.xlabel('Predicted label')
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+
+def plot_roc_curve(plt, y_true, y_scores, path):
+    from sklearn.metrics import roc_curve, auc
+
+    fpr, tpr, _ = roc_curve(y_true, y_scores)
+    roc_auc = auc(fpr, tpr)
+    fig = plt.figure()
+    plt.plot(fpr, tpr, label='ROC curve (area = {:.2f})'.format(roc_auc))
+    plt.plot([0, 1], [0, 1], 'k--')
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('False Positive Rate')
+    plt.ylabel('True Positive Rate')
+    plt.title('Receiver Operating Characteristic')
+    plt.legend(loc="lower right")
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+
+def plot_shap_summary(plt, shap_values, X, columns, path):
+    import shap
+
+    shap.summary_plot(shap_values, X, feature_names=columns, show=False)
+    plt.gcf().savefig(path, dpi=100, bbox_inches='tight')
+    plt.close('all')
+
+
+def write_html(report_dir, model_name, metrics):
+    rows = ''.join(f'<tr><td>{html.escape(name)}</td><td>{seconds:.3f} s</td></tr>'
+                   for name, seconds in metrics['timings'].items())
+    images = ''.join(f'<h2>{html.escape(name.replace("_", " ").title())}</h2><img src="{filename}">'
+                     for name, filename in REPORT_FILES.items()
+                     if os.path.exists(os.path.join(report_dir, filename)))
+    with open(os.path.join(report_dir, 'index.html'), 'w') as f:
+        f.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(model_name)} training report</title></head>
+<body>
+<h1>{html.escape(model_name)} training report</h1>
+<p>AUC {metrics['auc']:.4f}, accuracy {metrics['accuracy']:.4f} on {metrics['rows']} test rows</p>
+<table>{rows}</table>
+{images}
+</body></html>
+""")
+
+
+def write_metrics(report_dir, metrics):
+    path = os.path.join(report_dir, 'metrics.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(metrics, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def render_report(report_dir, model_name, y_true, y_pred, y_score, timings, explain=None, columns=None):
+    # Runs in the report process: the Agg backend never opens a window
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    os.makedirs(report_dir, exist_ok=True)
+    timer = StageTimer()
+    metrics = dict(classification_metrics(y_true, y_pred, y_score), model_name=model_name)
+    with timer.stage('render_plots'):
+        plot_confusion_matrix(plt, np.asarray(metrics['confusion_matrix']), model_name,
+                              os.path.join(report_dir, REPORT_FILES['confusion_matrix']))
+        plot_roc_curve(plt, y_true, y_score, os.path.join(report_dir, REPORT_FILES['roc_curve']))
+    if explain is not None:
+        function, args = explain
+        with timer.stage('explain'):
+            shap_values, X = function(*args)
+            plot_shap_summary(plt, shap_values, X, columns, os.path.join(report_dir, REPORT_FILES['shap_summary']))
+    metrics['timings'] = dict(timings, **timer.timings)
+    write_metrics(report_dir, metrics)
+    write_html(report_dir, model_name, metrics)
+
+
+def start_report(report_dir, model_name, y_true, y_pred, y_score, timings, explain=None, columns=None):
+    # Rendering (and the SHAP pass, given as (function, args)) happens in a separate
+    # process so the trainer can export the model meanwhile. Spawned rather than forked
+    # so the child does not inherit xgboost's or BLAS's thread pools.
+    process = multiprocessing.get_context('spawn').Process(
+        target=render_report,
+        args=(report_dir, model_name, np.asarray(y_true), np.asarray(y_pred), np.asarray(y_score), dict(timings)),
+        kwargs={'explain': explain, 'columns': columns},
+    )
+    process.start()
+    return process
+
+
+def finish_report(process, report_dir, timings):
+    # Waits for the report and adds the stages that ran alongside it
+    process.join()
+    if process.exitcode != 0:
+        print(f"Report rendering failed with exit code {process.exitcode}")
+        return None
+    with open(os.path.join(report_dir, 'metrics.json')) as f:
+        metrics = json.load(f)
+    metrics['timings'] = dict(metrics['timings'], **timings)
+    write_metrics(report_dir, metrics)
+    write_html(report_dir, metrics['model_name'], metrics)
+    print(f"Report written to {os.path.join(report_dir, 'index.html')}")
+    return metrics
@@ -0,0 +1,155 @@
+import time
+import queue
+import bisect
+import threading
+from concurrent.futures import Future
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+QUEUE_DEPTH_BUCKETS = [0, 1, 2, 4, 8, 16, 32, 64, 128, 256]
+WAIT_MS_BUCKETS = [0.5, 1, 2, 5, 10, 20, 50, 100]
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def to_dict(self):
+        # Upper bound of each bucket, the last one open-ended
+        return {
+            'buckets': [{'le': le, 'count': n} for le, n in zip(self.bounds + ['inf'], self.counts)],
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+        }
+
+
+class ScoringRequest:
+    def __init__(self, records):
+        self.records = records
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ScoringScheduler:
+    # Coalesces rows from concurrent callers into one predict call. A batch is cut when
+    # it reaches max_batch_size rows or max_latency_ms after its first request arrived;
+    # each caller's future then gets its own slice of the batch result.
+    #
+    # score_batch(records) must return (probabilities, labels, model_version).
+
+    def __init__(self, score_batch, max_batch_size=256, max_latency_ms=2.0):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_latency_ms = max_latency_ms
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_depths = Histogram(QUEUE_DEPTH_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.batches = 0
+        self.failed_batches = 0
+
+    def _ensure_worker(self):
+        # Started on first use rather than at import, so a forked server worker gets its
+        # own thread instead of inheriting a dead one from the master
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='scoring-scheduler', daemon=True)
+                self._worker.start()
+
+    def submit(self, records):
+        request = ScoringRequest(list(records))
+        if not request.records:
+            request.future.set_result(([], [], None))
+            return request.future
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    def score(self, records, timeout=None):
+        return self.submit(records).result(timeout)
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        rows = len(first.records)
+        deadline = first.enqueued_at + self.max_latency_ms / 1000
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Finish this batch first, then stop
+                self._queue.put(None)
+                break
+            batch.append(request)
+            rows += len(request.records)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            with self._stats_lock:
+                self.queue_depths.observe(self._queue.qsize())
+                self.batch_sizes.observe(sum(len(r.records) for r in batch))
+                for request in batch:
+                    self.wait_ms.observe((started - request.enqueued_at) * 1000)
+                self.batches += 1
+            self._score(batch)
+
+    def _score(self, batch):
+        records = [record for request in batch for record in request.records]
+        try:
+            probabilities, labels, version = self.score_batch(records)
+        except Exception as e:
+            with self._stats_lock:
+                self.failed_batches += 1
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            # Score callers one by one so a bad row only fails its own request
+            for request in batch:
+                self._score([request])
+            return
+
+        start = 0
+        for request in batch:
+            end = start + len(request.records)
+            request.future.set_result((probabilities[start:end], labels[start:end], version))
+            start = end
+
+    def stop(self):
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_latency_ms': self.max_latency_ms,
+                'queue_depth': self._queue.qsize(),
+                'batches': self.batches,
+                'failed_batches': self.failed_batches,
+                'batch_size': self.batch_sizes.to_dict(),
+                'queue_depth_at_dispatch': self.queue_depths.to_dict(),
+                'wait_ms': self.wait_ms.to_dict(),
+            }
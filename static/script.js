@@ -2,8 +2,11 @@ document.getElementById("monitorForm").addEventListener("submit", function (even
     event.preventDefault();
     const profilesInput = document.getElementById("profiles").value;
     const profiles = profilesInput.split(",").map(profile => profile.trim());
-    
-    fetch("/monitor", {
+
+    const resultsDiv = document.getElementById("results");
+    resultsDiv.innerHTML = ""; // Clear previous results
+
+    fetch("/monitor/jobs", {
         method: "POST",
         headers: {
             "Content-Type": "application/json"
@@ -11,21 +14,41 @@ document.getElementById("monitorForm").addEventListener("submit", function (even
         body: JSON.stringify({ profiles: profiles })
     })
     .then(response => response.json())
-    .then(data => {
-        const resultsDiv = document.getElementById("results");
-        resultsDiv.innerHTML = ""; // Clear previous results
-
-        data.forEach(profile => {
-            const profileDiv = document.createElement("div");
-            // Display only the status
-            profileDiv.innerHTML = `
-                <strong>Status:</strong> ${profile.status} <br>
-                <hr>
-            `;
-            resultsDiv.appendChild(profileDiv);
-        });
-    })
+    .then(job => fetch(job.stream_url))
+    .then(response => readLines(response, line => {
+        const profile = JSON.parse(line);
+        if (profile.event === "end") {
+            return;
+        }
+        // Show each verdict as soon as the server streams it. The username is user input
+        // and scraped text, so it only ever goes in as textContent, never as markup.
+        const profileDiv = document.createElement("div");
+        const name = document.createElement("strong");
+        name.textContent = `${profile.username}:`;
+        profileDiv.append(name, ` ${profile.status}`, document.createElement("br"), document.createElement("hr"));
+        resultsDiv.appendChild(profileDiv);
+    }))
     .catch(error => {
         console.error("Error:", error);
     });
 });
+
+// Calls onLine for every non-empty line of a newline-delimited JSON response
+async function readLines(response, onLine) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = "";
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split("\n");
+        buffered = lines.pop();
+        lines.filter(line => line.trim()).forEach(onLine);
+    }
+    if (buffered.trim()) {
+        onLine(buffered);
+    }
+}
@@ -0,0 +1,178 @@
+import time
+import sqlite3
+import threading
+
+PROFILE_FIELDS = ['username', 'followers_count', 'following_count', 'subscriptions_count', 'is_verified', 'status',
+                  'score', 'scraped_at', 'model_version', 'label', 'labeled_at']
+
+# Columns added after the original table was created, applied in place on startup
+PROFILE_MIGRATIONS = {
+    'score': 'ALTER TABLE profiles ADD COLUMN score REAL',
+    'scraped_at': 'ALTER TABLE profiles ADD COLUMN scraped_at REAL',
+    'model_version': 'ALTER TABLE profiles ADD COLUMN model_version TEXT',
+    # Confirmed verdict ('Fake' or 'Genuine') for incremental training, and when it was given
+    'label': 'ALTER TABLE profiles ADD COLUMN label TEXT',
+    'labeled_at': 'ALTER TABLE profiles ADD COLUMN labeled_at REAL',
+}
+
+
+class ProfileStore:
+    # profiles.db access for the server. Each thread gets one long-lived connection in
+    # WAL mode, so readers never block the writer and batches commit in one transaction.
+
+    def __init__(self, db_path='profiles.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._migrated = False
+        self._migrate_lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._migrate_lock:
+                if not self._migrated:
+                    migrate(conn)
+                    self._migrated = True
+        return conn
+
+    def insert_profiles(self, profiles):
+        rows = [
+            (p['username'], p['followers_count'], p['following_count'], p['subscriptions_count'],
+             bool(p['is_verified']), p['status'], p.get('score'), p.get('scraped_at') or time.time(),
+             p.get('model_version'))
+            for p in profiles
+        ]
+        if not rows:
+            return 0
+        conn = self.connection()
+        with conn:
+            conn.executemany('''
+                INSERT INTO profiles (username, followers_count, following_count, subscriptions_count, is_verified,
+                                      status, score, scraped_at, model_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        return len(rows)
+
+    def latest_snapshot(self, username):
+        row = self.connection().execute(
+            'SELECT * FROM profiles WHERE username = ? ORDER BY scraped_at DESC LIMIT 1', (username,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def latest_snapshots(self, usernames=None):
+        # SQLite returns the other columns from the row holding MAX(); the
+        # (username, scraped_at) index turns this into one index walk
+        query = 'SELECT *, MAX(scraped_at) AS latest FROM profiles'
+        params = []
+        if usernames is not None:
+            usernames = list(usernames)
+            query += ' WHERE username IN (%s)' % ','.join('?' * len(usernames))
+            params = usernames
+        query += ' GROUP BY username'
+        rows = self.connection().execute(query, params).fetchall()
+        return {row['username']: {k: row[k] for k in row.keys() if k != 'latest'} for row in rows}
+
+    def history(self, username, limit=100):
+        rows = self.connection().execute(
+            'SELECT * FROM profiles WHERE username = ? ORDER BY scraped_at DESC LIMIT ?', (username, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_labels(self, labels, labeled_at=None):
+        # (username, label) pairs; each label goes on the account's latest snapshot, the
+        # state that was confirmed. Returns how many snapshots were labelled.
+        labeled_at = time.time() if labeled_at is None else labeled_at
+        conn = self.connection()
+        with conn:
+            cursor = conn.executemany('''
+                UPDATE profiles SET label = ?, labeled_at = ?
+                WHERE id = (SELECT id FROM profiles WHERE username = ? ORDER BY scraped_at DESC LIMIT 1)
+            ''', [(label, labeled_at, username) for username, label in labels])
+        return cursor.rowcount
+
+    def labeled_profiles(self, since=None):
+        # Labelled snapshots, oldest label first; `since` skips those a model has already seen
+        query = 'SELECT * FROM profiles WHERE label IS NOT NULL'
+        params = []
+        if since is not None:
+            query += ' AND labeled_at > ?'
+            params = [since]
+        rows = self.connection().execute(query + ' ORDER BY labeled_at', params).fetchall()
+        return [dict(row) for row in rows]
+
+    def add_to_watchlist(self, usernames, interval, next_due=None):
+        # Accounts already on the watchlist keep their schedule
+        now = time.time()
+        rows = [(username, interval, now if next_due is None else next_due, now) for username in usernames]
+        conn = self.connection()
+        with conn:
+            cursor = conn.executemany('''
+                INSERT OR IGNORE INTO watchlist (username, interval, next_due, failures, added_at)
+                VALUES (?, ?, ?, 0, ?)
+            ''', rows)
+        return cursor.rowcount
+
+    def remove_from_watchlist(self, usernames):
+        conn = self.connection()
+        with conn:
+            cursor = conn.executemany('DELETE FROM watchlist WHERE username = ?', [(u,) for u in usernames])
+        return cursor.rowcount
+
+    def watchlist(self, limit=None):
+        query = 'SELECT * FROM watchlist ORDER BY next_due'
+        params = []
+        if limit is not None:
+            query += ' LIMIT ?'
+            params = [limit]
+        return [dict(row) for row in self.connection().execute(query, params).fetchall()]
+
+    def update_watchlist(self, entries):
+        # Schedule changes from one scheduler batch, written in one transaction
+        conn = self.connection()
+        with conn:
+            conn.executemany('''
+                UPDATE watchlist SET interval = ?, next_due = ?, last_checked = ?, failures = ?
+                WHERE username = ?
+            ''', [(e['interval'], e['next_due'], e['last_checked'], e['failures'], e['username']) for e in entries])
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def migrate(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            followers_count INTEGER,
+            following_count INTEGER,
+            subscriptions_count INTEGER,
+            is_verified BOOLEAN,
+            status TEXT
+        )
+    ''')
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(profiles)')}
+    for column, statement in PROFILE_MIGRATIONS.items():
+        if column not in columns:
+            conn.execute(statement)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_profiles_username_scraped_at ON profiles (username, scraped_at)')
+    # Accounts re-checked by watchlist.py and when each is next due
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS watchlist (
+            username TEXT PRIMARY KEY,
+            interval REAL NOT NULL,
+            next_due REAL NOT NULL,
+            last_checked REAL,
+            failures INTEGER NOT NULL DEFAULT 0,
+            added_at REAL
+        )
+    ''')
+    conn.commit()
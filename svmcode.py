@@ -1,83 +1,38 @@
-import pandas as pd
+import sys
 import numpy as np
-from sklearn.svm import SVC
+from scipy import sparse
+from sklearn.svm import SVC, LinearSVC
+from sklearn.linear_model import SGDClassifier
 import joblib
-import shap
-from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-from sklearn.metrics import roc_curve, auc
-from sklearn.feature_extraction.text import TfidfVectorizer
-import gender_guesser.detector as gender
-
-def read_datasets():
-    genuine_users = pd.read_csv("data/gusers.csv")
-    fake_users = pd.read_csv("data/fusers.csv")
-    x = pd.concat([genuine_users, fake_users], ignore_index=True)
-    y = [0] * len(fake_users) + [1] * len(genuine_users)
-    return x, y
-
-def predict_sex(names):
-    detector = gender.Detector()
-    first_names = names.str.split(' ').str.get(0)
-    sex = first_names.apply(lambda x: detector.get_gender(x).split()[0])
-    sex_dict = {'female': -2, 'mostly_female': -1, 'unknown': 0, 'mostly_male': 1, 'male': 2}
-    return sex.map(sex_dict).fillna(0).astype(int)
-
-def extract_features(df):
-    # Convert numeric columns
-    df['followers_count'] = pd.to_numeric(df['followers_count'], errors='coerce')
-    df['following_count'] = pd.to_numeric(df['following_count'], errors='coerce')
-    df['subscription_count'] = pd.to_numeric(df['subscription_count'], errors='coerce')
-    
-    # Fill NaN values with 0
-    df.fillna(0, inplace=True)
-    
-    # Predict gender from username
-    if 'username' in df.columns:
-        df['sex_code'] = predict_sex(df['username'])
-        df.to_csv("data/updated_users.csv", index=False)
-    else:
-        df['sex_code'] = 0
-
-    # Extract creation month and year from 'created_at'
-    if 'created_at' in df.columns:
-        df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce', dayfirst=True)
-        df['created_month'] = df['created_at'].dt.month.fillna(0).astype(int)
-        df['created_year'] = df['created_at'].dt.year.fillna(0).astype(int)
-    else:
-        df['created_month'] = df['created_year'] = 0
-
-    # Feature extraction from 'description'
-    if 'description' in df.columns:
-        df['description'] = df['description'].fillna("").astype(str)
-        df['description_length'] = df['description'].apply(len)
-        
-        vectorizer = TfidfVectorizer(max_features=50)  # Reduce max_features for faster processing
-        tfidf_matrix = vectorizer.fit_transform(df['description'])
-        tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), columns=vectorizer.get_feature_names_out())
-        df = pd.concat([df, tfidf_df], axis=1)
-        
-    else:
-        df['description_length'] = 0
-
-    feature_columns_to_use = [
-        'followers_count', 'following_count', 'subscription_count',
-        'sex_code', 'created_month', 'created_year', 'is_verified', 'description_length'
-    ]
-    
-    if 'description' in df.columns:
-        feature_columns_to_use += vectorizer.get_feature_names_out().tolist()
-
-    return df[feature_columns_to_use]
-
-def train_svm(X, y):
+from feature_pipeline import FeaturePipeline, BASE_COLUMNS
+from feature_store import cached_features
+from reports import StageTimer, start_report, finish_report
+from explain import kernel_explainer
+from calibration import calibrate, calibrate_scores
+from ingest import TRAINING_SOURCES, DATASET_FILES, read_datasets, fit_streaming_pipeline, build_feature_cache, \
+    iter_cached_chunks, cached_chunk_paths, load_cached_chunk
+
+def extract_features(df, pipeline):
+    return pipeline.fit_features(df)
+
+def load_features(pipeline):
+    # X/y come from the feature store when the CSVs and feature config are unchanged
+    def build():
+        print("Reading datasets...")
+        x, y = read_datasets()
+        print("Extracting features...")
+        return extract_features(x, pipeline).to_numpy(), y
+
+    return cached_features(DATASET_FILES, pipeline, build)
+
+def train_svm(X, y, pipeline):
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.20, random_state=42, stratify=y)
 
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    pipeline.fit_scaler(X_train)
+    X_train_scaled = pipeline.scale_features(X_train)
+    X_test_scaled = pipeline.scale_features(X_test)
 
     svm_model = SVC(probability=True, random_state=42)
 
@@ -100,69 +55,170 @@ def train_svm(X, y):
     print("Classification Report (SVM):\n", classification_report(y_test, predictions))
     print("Confusion Matrix (SVM):\n", confusion_matrix(y_test, predictions))
 
-    return y_test, predictions, predicted_probabilities, clf, X_train_scaled, X_test_scaled, scaler
-
-def save_model_and_scaler(model, scaler):
-    joblib.dump(model, 'svm_model.pkl')
-    joblib.dump(scaler, 'scaler.pkl')
-
-def plot_confusion_matrix(cm):
-    plt.figure()
-    plt.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
-    plt.title('Confusion Matrix (SVM)')
-    plt.colorbar()
-    target_names = ['Fake', 'Genuine']
-    tick_marks = np.arange(len(target_names))
-    plt.xticks(tick_marks, target_names, rotation=45)
-    plt.yticks(tick_marks, target_names)
-    fmt = '.2f'
-    thresh = cm.max() / 2.
-    for i in range(cm.shape[0]):
-        for j in range(cm.shape[1]):
-            value = cm[i, j]
-            plt.text(j, i, f'{value:{fmt}}',
-                     horizontalalignment="center",
-                     color="white" if value > thresh else "black")
-    plt.tight_layout()
-    plt.ylabel('True label')
-    plt.xlabel('Predicted label')
-    plt.show()
-
-def plot_roc_curve(y_true, y_scores):
-    fpr, tpr, _ = roc_curve(y_true, y_scores)
-    roc_auc = auc(fpr, tpr)
-    plt.figure()
-    plt.plot(fpr, tpr, label='ROC curve (area = {:.2f})'.format(roc_auc))
-    plt.plot([0, 1], [0, 1], 'k--')
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('False Positive Rate')
-    plt.ylabel('True Positive Rate')
-    plt.title('Receiver Operating Characteristic')
-    plt.legend(loc="lower right")
-    plt.show()
+    return y_test, predictions, predicted_probabilities, clf, X_train_scaled, X_test_scaled
 
-def explain_with_shap(model, X_train_scaled, X_test_scaled):
-    explainer = shap.KernelExplainer(model.predict, X_train_scaled)
-    shap_values = explainer.shap_values(X_test_scaled)
+def linear_svm(solver):
+    if solver == 'sgd':
+        return SGDClassifier(loss='hinge', random_state=42), {'alpha': [1e-5, 1e-4, 1e-3]}
+    if solver == 'liblinear':
+        return LinearSVC(random_state=42), {'C': [0.1, 1, 10]}
+    raise ValueError(f"Unknown linear SVM solver: {solver}")
 
-    shap.summary_plot(shap_values, X_test_scaled)
-
-def main():
+def load_sparse_features(pipeline):
+    # CSR straight from the records for the linear SVMs: the base columns plus only the
+    # TF-IDF terms each description has, never a dense rows x vocabulary matrix. The
+    # split is the one train_svm makes of the feature-store matrix.
     print("Reading datasets...")
     x, y = read_datasets()
     print("Extracting features...")
-    x = extract_features(x)
-    y = np.array(y)
-    y_test, predictions, predicted_probabilities, model, X_train_scaled, X_test_scaled, scaler = train_svm(x, y)
+    pipeline.fit_text(x)
+    train, test = train_test_split(np.arange(len(y)), test_size=0.20, random_state=42, stratify=y)
+    x_train, x_test = x.iloc[train], x.iloc[test]
+    sparse_scaler(pipeline, pipeline.base_features(x_train).to_numpy())
+    return pipeline.transform_sparse(x_train), pipeline.transform_sparse(x_test), y[train], y[test]
+
+def sparse_scaler(pipeline, X_base):
+    # Only the base columns are standardised; TF-IDF columns are already l2-normalised
+    # and left uncentred so the matrices stay sparse
+    n_text = len(pipeline.vocabulary)
+    pipeline.fit_scaler(X_base)
+    pipeline.mean = np.concatenate([pipeline.mean, np.zeros(n_text)])
+    pipeline.scale = np.concatenate([pipeline.scale, np.ones(n_text)])
+
+def train_linear_svm(X_train_scaled, X_test_scaled, y_train, y_test, solver='liblinear'):
+    # Linear-time alternative to train_svm for large datasets, on load_sparse_features' CSR
+    X_fit, X_calibration, y_fit, y_calibration = train_test_split(
+        X_train_scaled, y_train, test_size=0.20, random_state=42, stratify=y_train)
+
+    svm_model, param_grid = linear_svm(solver)
+    grid_search = GridSearchCV(svm_model, param_grid, cv=3, scoring='accuracy', verbose=1, n_jobs=-1)
+    grid_search.fit(X_fit, y_fit)
 
-    cm = confusion_matrix(y_test, predictions)
-    plot_confusion_matrix(cm)
-    plot_roc_curve(y_test, predicted_probabilities)
+    print("Best parameters found: ", grid_search.best_params_)
+    clf = calibrate(grid_search.best_estimator_, X_calibration, y_calibration)
+
+    predictions = clf.predict(X_test_scaled)
+    predicted_probabilities = clf.predict_proba(X_test_scaled)[:, 1]
 
-    save_model_and_scaler(model, scaler)
+    print("Classification Report (Linear SVM):\n", classification_report(y_test, predictions))
+    print("Confusion Matrix (Linear SVM):\n", confusion_matrix(y_test, predictions))
+
+    return y_test, predictions, predicted_probabilities, clf, X_train_scaled, X_test_scaled
+
+def calibration_rows(index, n_rows, fraction, seed):
+    # The same rows of a chunk are held back on every pass, whatever order chunks come in
+    return np.random.default_rng([seed, index]).random(n_rows) < fraction
+
+def shuffled_batches(paths, rng, calibration_fraction, seed, buffer_chunks, batch_size):
+    # The cache holds one CSV after another, so chunks are mostly single-class. Chunks are
+    # visited in random order and pooled `buffer_chunks` at a time, and each pool is
+    # shuffled before being cut into mini-batches.
+    order = rng.permutation(len(paths))
+    for start in range(0, len(order), buffer_chunks):
+        Xs, ys = [], []
+        for index in order[start:start + buffer_chunks]:
+            X, y = load_cached_chunk(paths[index])
+            rows = ~calibration_rows(index, len(y), calibration_fraction, seed)
+            Xs.append(X[rows])
+            ys.append(y[rows])
+        X = sparse.vstack(Xs).tocsr()
+        y = np.concatenate(ys).astype(int)
+        shuffled = rng.permutation(len(y))
+        for batch in range(0, len(y), batch_size):
+            rows = shuffled[batch:batch + batch_size]
+            yield X[rows], y[rows]
+
+def train_svm_streaming(cache_dir, epochs=5, alpha=1e-4, calibration_fraction=0.1, buffer_chunks=4,
+                        batch_size=10_000, seed=42):
+    # Mini-batch path over the CSR chunks from the feature cache: partial_fit on shuffled
+    # batches, then Platt calibration on rows held back from every chunk
+    svm = SGDClassifier(loss='hinge', alpha=alpha, random_state=seed)
+    classes = np.array([0, 1])
+    paths = cached_chunk_paths(cache_dir, 'train')
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        for X, y in shuffled_batches(paths, rng, calibration_fraction, seed, buffer_chunks, batch_size):
+            svm.partial_fit(X, y, classes=classes)
+        print(f"Epoch {epoch + 1}/{epochs} done")
+
+    scores, labels = [], []
+    for index, path in enumerate(paths):
+        X, y = load_cached_chunk(path)
+        rows = calibration_rows(index, len(y), calibration_fraction, seed)
+        scores.append(svm.decision_function(X[rows]))
+        labels.append(y[rows].astype(int))
+    clf = calibrate_scores(svm, np.concatenate(scores), np.concatenate(labels))
+
+    probabilities, y_test = [], []
+    for X, y in iter_cached_chunks(cache_dir, 'test'):
+        probabilities.append(clf.predict_proba(X)[:, 1])
+        y_test.append(y.astype(int))
+    y_test = np.concatenate(y_test)
+    predicted_probabilities = np.concatenate(probabilities)
+    predictions = (predicted_probabilities >= 0.5).astype(int)
+
+    print("Classification Report (Linear SVM):\n", classification_report(y_test, predictions))
+    print("Confusion Matrix (Linear SVM):\n", confusion_matrix(y_test, predictions))
+
+    return y_test, predictions, predicted_probabilities, clf
+
+def save_model_and_pipeline(model, pipeline):
+    joblib.dump(model, 'svm_model.pkl')
+    pipeline.save('svm_feature_pipeline.json')
 
-    explain_with_shap(model, X_train_scaled, X_test_scaled)
+def explain_with_shap(model, X_train_scaled, X_test_scaled):
+    if sparse.issparse(X_train_scaled):
+        X_train_scaled, X_test_scaled = X_train_scaled.toarray(), X_test_scaled.toarray()
+    # k-means background and a sample of test rows keep KernelExplainer to minutes
+    explainer = kernel_explainer(lambda X: model.predict_proba(X)[:, 1], X_train_scaled, n_clusters=50)
+    rows = np.random.default_rng(42).choice(len(X_test_scaled), size=min(200, len(X_test_scaled)), replace=False)
+    X_test_scaled = X_test_scaled[rows]
+    shap_values = explainer.shap_values(X_test_scaled)
+    return shap_values, X_test_scaled
+
+def main(solver=None, report_dir='reports/svm'):
+    timer = StageTimer()
+    pipeline = FeaturePipeline(max_features=50, sex_code_table='data/sex_codes.json', n_jobs=-1)
+    with timer.stage('features'):
+        if solver is None:
+            x, y = load_features(pipeline)
+        else:
+            X_train, X_test, y_train, y_test = load_sparse_features(pipeline)
+    with timer.stage('training'):
+        if solver is None:
+            y_test, predictions, predicted_probabilities, model, X_train_scaled, X_test_scaled = train_svm(x, y, pipeline)
+        else:
+            y_test, predictions, predicted_probabilities, model, X_train_scaled, X_test_scaled = train_linear_svm(
+                X_train, X_test, y_train, y_test, solver)
+
+    # Plots and the SHAP summary render in a background process while the model is exported
+    report = start_report(report_dir, 'SVM', y_test, predictions, predicted_probabilities, timer.timings,
+                          explain=(explain_with_shap, (model, X_train_scaled, X_test_scaled)), columns=pipeline.columns)
+    with timer.stage('export'):
+        save_model_and_pipeline(model, pipeline)
+    finish_report(report, report_dir, timer.timings)
+
+def main_streaming(cache_dir='data/feature_cache/svm', chunksize=100_000, report_dir='reports/svm'):
+    timer = StageTimer()
+    with timer.stage('features'):
+        print("Fitting feature pipeline over streamed datasets...")
+        pipeline = fit_streaming_pipeline(TRAINING_SOURCES, chunksize, max_features=50, sex_code_table='data/sex_codes.json')
+        print("Writing feature cache...")
+        build_feature_cache(TRAINING_SOURCES, cache_dir, pipeline, chunksize)
+    with timer.stage('training'):
+        y_test, predictions, predicted_probabilities, model = train_svm_streaming(cache_dir)
+
+    report = start_report(report_dir, 'SVM', y_test, predictions, predicted_probabilities, timer.timings)
+    with timer.stage('export'):
+        save_model_and_pipeline(model, pipeline)
+    finish_report(report, report_dir, timer.timings)
 
 if __name__ == "__main__":
-    main()
+    if '--streaming' in sys.argv:
+        main_streaming()
+    elif '--sgd' in sys.argv:
+        main('sgd')
+    elif '--linear' in sys.argv:
+        main('liblinear')
+    else:
+        main()
@@ -0,0 +1,59 @@
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+# /slow/<username>/ answers after this long
+SLOW_SECONDS = 0.3
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class ProfileHandler(BaseHTTPRequestHandler):
+    # Serves tests/fixtures/<username>.html at /<username>/, like a profile page
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        name = self.path.strip('/')
+        if name.startswith('slow/'):
+            time.sleep(SLOW_SECONDS)
+            name = name[len('slow/'):]
+        path = os.path.join(FIXTURES_DIR, name + '.html')
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def profile_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ProfileHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def repo_dir(monkeypatch):
+    # The trainers and the bundled model use paths relative to the repository root
+    monkeypatch.chdir(REPO_DIR)
+    return REPO_DIR
@@ -0,0 +1,128 @@
+import urllib.request
+import pytest
+from selenium.common.exceptions import WebDriverException
+from browser_pool import BrowserPool
+from profile_parsing import parse_profile_html
+
+
+class StubDriver:
+    # Stands in for webdriver.Chrome: loads pages from the stub server over plain HTTP
+    # and, once crashed, fails every command like a browser whose session is gone
+
+    def __init__(self, crash_after=None):
+        self.crash_after = crash_after
+        self.url = 'about:blank'
+        self.page_source = ''
+        self.pages = 0
+        self.crashed = False
+        self.closed = False
+
+    def check(self):
+        if self.crashed or self.closed:
+            raise WebDriverException("invalid session id")
+
+    @property
+    def current_url(self):
+        self.check()
+        return self.url
+
+    def get(self, url):
+        self.check()
+        if self.crash_after is not None and self.pages >= self.crash_after:
+            self.crashed = True
+            raise WebDriverException("chrome not reachable")
+        with urllib.request.urlopen(url) as response:
+            self.page_source = response.read().decode()
+        self.url = url
+        self.pages += 1
+
+    def quit(self):
+        self.closed = True
+
+
+def stub_factory(*crash_after):
+    # One StubDriver per call; the n-th crashes after crash_after[n] pages (None: never)
+    drivers = []
+
+    def factory():
+        driver = StubDriver(crash_after[len(drivers)] if len(drivers) < len(crash_after) else None)
+        drivers.append(driver)
+        return driver
+
+    return factory, drivers
+
+
+def page_extractor(base_url):
+    # Like app.extract_profile_data: load the profile and swallow any error as None
+    def extract(driver, username):
+        try:
+            driver.get(f"{base_url}/{username}/")
+            return parse_profile_html(driver.page_source, username)
+        except Exception:
+            return None
+
+    return extract
+
+
+def make_pool(factory, size=1):
+    return BrowserPool(size=size, driver_factory=factory, min_interval=0, jitter=0)
+
+
+def test_pool_scrapes_through_leased_sessions(profile_server):
+    factory, drivers = stub_factory()
+    pool = make_pool(factory, size=2)
+    results = dict(pool.scrape(['alice', 'bob', 'nobody'], page_extractor(profile_server.url)))
+
+    assert results['alice']['followers_count'] == 1520
+    assert results['bob']['followers_count'] == 2_500_000
+    assert results['nobody'] is None
+    assert len(drivers) <= 2
+    pool.close()
+    assert all(driver.closed for driver in drivers)
+
+
+def test_crashed_browser_is_replaced_mid_batch(profile_server):
+    factory, drivers = stub_factory(1)
+    pool = make_pool(factory)
+    results = list(pool.scrape(['alice', 'bob', 'alice'], page_extractor(profile_server.url)))
+
+    assert [username for username, _ in results] == ['alice', 'bob', 'alice']
+    assert results[0][1] is not None
+    # The profile being loaded when the browser died fails, the rest of the batch does not
+    assert results[1][1] is None
+    assert results[2][1]['followers_count'] == 1520
+    assert len(drivers) == 2
+    assert drivers[0].closed and not drivers[1].closed
+    pool.close()
+
+
+def test_broken_session_is_not_returned_to_the_pool(profile_server):
+    factory, drivers = stub_factory()
+    pool = make_pool(factory)
+    with pool.lease() as session:
+        session.driver.crashed = True
+
+    with pool.lease() as session:
+        assert session.driver is drivers[1]
+        session.driver.get(f"{profile_server.url}/alice/")
+    assert drivers[0].closed
+    pool.close()
+
+
+def test_session_is_dropped_when_no_replacement_starts():
+    created = []
+
+    def factory():
+        if created:
+            raise WebDriverException("cannot start chrome")
+        created.append(StubDriver())
+        return created[0]
+
+    pool = make_pool(factory)
+    with pool.lease() as session:
+        session.driver.crashed = True
+    assert pool._sessions == []
+    # The freed slot is retried on the next lease instead of waiting for the lost session
+    with pytest.raises(WebDriverException):
+        with pool.lease():
+            pass
@@ -0,0 +1,21 @@
+import pytest
+from count_parsing import parse_counts, parse_count
+from count_cases import COUNT_CASES
+
+
+PARSERS = {
+    'parse_counts': lambda text: int(parse_counts([text])[0]),
+    'parse_count': parse_count,
+}
+
+
+@pytest.mark.parametrize('parse', PARSERS.values(), ids=PARSERS.keys())
+@pytest.mark.parametrize('text, expected', COUNT_CASES, ids=[repr(text) for text, _ in COUNT_CASES])
+def test_count_cases(parse, text, expected):
+    assert parse(text) == expected
+
+
+def test_whole_column_at_once():
+    # One call over mixed strings, numbers and missing values, as feature assembly makes it
+    got = parse_counts([text for text, _ in COUNT_CASES])
+    assert got.tolist() == [expected for _, expected in COUNT_CASES]
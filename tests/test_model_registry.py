@@ -0,0 +1,44 @@
+import os
+import time
+import shutil
+import pytest
+import model_registry
+from model_registry import MODEL_FILE, PIPELINE_FILE, list_versions, publish, read_current
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    # Every publish lands in the same second
+    monkeypatch.setattr(model_registry.time, 'strftime', lambda fmt: '20260101-120000')
+
+
+def test_republishing_the_same_artifacts_returns_the_existing_version(repo_dir, tmp_path, frozen_clock):
+    registry = tmp_path / 'models'
+    first = publish(str(registry), MODEL_FILE, PIPELINE_FILE, 0.68)
+    second = publish(str(registry), MODEL_FILE, PIPELINE_FILE, 0.68)
+
+    assert first == second
+    assert [m['version'] for m in list_versions(str(registry))] == [first]
+    assert sorted(os.listdir(registry)) == sorted(['CURRENT', first])
+
+
+def test_different_artifacts_in_the_same_second_get_their_own_version(repo_dir, tmp_path, frozen_clock):
+    registry = tmp_path / 'models'
+    first = publish(str(registry), MODEL_FILE, PIPELINE_FILE, 0.68)
+    second = publish(str(registry), MODEL_FILE, PIPELINE_FILE, 0.7)
+    pipeline = tmp_path / PIPELINE_FILE
+    shutil.copyfile(PIPELINE_FILE, pipeline)
+    with open(pipeline, 'a') as f:
+        f.write('\n')
+    third = publish(str(registry), MODEL_FILE, str(pipeline), 0.68)
+
+    assert second == first + '-2' and third == first + '-3'
+    assert read_current(str(registry)) == third
+    assert {m['threshold'] for m in list_versions(str(registry))} == {0.68, 0.7}
+
+
+def test_versions_are_named_by_time_and_model_hash(repo_dir, tmp_path):
+    version = publish(str(tmp_path), MODEL_FILE, PIPELINE_FILE, 0.68, make_current=False)
+    assert version.startswith(time.strftime('%Y%m%d-'))
+    assert version.endswith(model_registry.file_hash(MODEL_FILE)[:8])
+    assert read_current(str(tmp_path)) is None
@@ -0,0 +1,71 @@
+import time
+import pytest
+from http_extractor import HttpExtractor
+from profile_parsing import parse_embedded_json, parse_profile_html
+from tests.conftest import SLOW_SECONDS, read_fixture
+
+SAVED_PAGES = [
+    # Page state JSON, with braces and an escaped quote inside the description
+    ('alice', 'alice.html', {'followers_count': 1520, 'following_count': 310, 'subscriptions_count': 2,
+                             'is_verified': False}),
+    # Rendered count links only
+    ('bob', 'bob.html', {'followers_count': 2_500_000, 'following_count': 1204, 'subscriptions_count': 0,
+                         'is_verified': True}),
+    # Two user objects: carol's counts sit before a nested object, dave follows her
+    ('carol', 'carol.html', {'followers_count': 42, 'following_count': 17, 'subscriptions_count': 0,
+                             'is_verified': False}),
+    ('dave', 'carol.html', {'followers_count': 98000, 'following_count': 12, 'subscriptions_count': 5,
+                            'is_verified': True}),
+    ('CAROL', 'carol.html', {'followers_count': 42, 'following_count': 17, 'subscriptions_count': 0,
+                             'is_verified': False}),
+    # Needs JavaScript to render: left to the browser
+    ('someone', 'js_only.html', None),
+]
+
+
+@pytest.mark.parametrize('username, page, expected', SAVED_PAGES)
+def test_saved_pages(username, page, expected):
+    assert parse_profile_html(read_fixture(page), username) == expected
+
+
+def test_fields_never_come_from_another_user():
+    # Without its own counts carol is unreadable, not given dave's
+    html = ('{"users":[{"screen_name":"carol","entities":{"url":{}}},'
+            '{"screen_name":"dave","followers_count":98000,"friends_count":12}]}')
+    assert parse_embedded_json(html, 'carol') is None
+    assert parse_embedded_json(html, 'dave')['followers_count'] == 98000
+
+
+def test_unbalanced_state_is_not_guessed():
+    html = '<script>state={"screen_name":"carol","followers_count":42,"friends_count":17</script>'
+    assert parse_embedded_json(html, 'carol') is None
+
+
+def test_http_extractor_against_stub_server(profile_server):
+    extractor = HttpExtractor(url_template=profile_server.url + '/{username}/', concurrency=4)
+    results = dict(extractor.scrape(['alice', 'bob', 'carol', 'js_only', 'nobody']))
+
+    assert results['alice']['followers_count'] == 1520
+    assert results['alice']['username'] == 'alice'
+    assert 'load_ms' in results['alice']['timings']
+    assert results['bob']['following_count'] == 1204
+    assert results['carol']['followers_count'] == 42
+    # Unparseable pages and HTTP errors come back as None for the browser fallback
+    assert results['js_only'] is None
+    assert results['nobody'] is None
+
+
+def test_http_extractor_stops_fetching_when_the_caller_stops(profile_server):
+    extractor = HttpExtractor(url_template=profile_server.url + '/slow/{username}/', concurrency=2)
+    usernames = ['alice', 'bob'] * 10
+    results = extractor.scrape(usernames)
+    first = next(results)
+    assert first[1] is not None
+
+    started = time.perf_counter()
+    results.close()
+    assert time.perf_counter() - started < SLOW_SECONDS * 3
+    requested = len(profile_server.requests)
+    time.sleep(SLOW_SECONDS * 3)
+    assert len(profile_server.requests) == requested
+    assert requested < len(usernames)
@@ -0,0 +1,103 @@
+import time
+import threading
+import pytest
+from scoring_scheduler import ScoringScheduler
+
+
+class RecordingModel:
+    # score_batch stand-in: each record is a number, scored as number / 100 and labelled
+    # with itself, so every caller can tell its own rows; 'bad' fails the whole call
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, records):
+        with self.lock:
+            self.calls.append(list(records))
+        if 'bad' in records:
+            raise ValueError("cannot score 'bad'")
+        return [record / 100 for record in records], [f"row {record}" for record in records], 'v1'
+
+
+@pytest.fixture
+def model():
+    return RecordingModel()
+
+
+def submit_together(scheduler, requests):
+    # Every thread submits at the same moment; futures come back in request order
+    futures = [None] * len(requests)
+    barrier = threading.Barrier(len(requests))
+
+    def submit(i):
+        barrier.wait()
+        futures[i] = scheduler.submit(requests[i])
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return futures
+
+
+def test_concurrent_callers_share_one_predict_call(model):
+    requests = [[i * 10 + j for j in range(i % 3 + 1)] for i in range(8)]
+    # Full at exactly the rows submitted, so the batch is cut without waiting out the latency
+    scheduler = ScoringScheduler(model, max_batch_size=sum(map(len, requests)), max_latency_ms=5000)
+    futures = submit_together(scheduler, requests)
+
+    results = [future.result(timeout=5) for future in futures]
+    assert len(model.calls) == 1
+    assert sorted(model.calls[0]) == sorted(record for request in requests for record in request)
+    for request, (probabilities, labels, version) in zip(requests, results):
+        assert list(probabilities) == [record / 100 for record in request]
+        assert list(labels) == [f"row {record}" for record in request]
+        assert version == 'v1'
+    assert scheduler.stats()['batches'] == 1
+    scheduler.stop()
+
+
+def test_batch_is_cut_at_max_batch_size(model):
+    scheduler = ScoringScheduler(model, max_batch_size=4, max_latency_ms=5000)
+    futures = submit_together(scheduler, [[i] for i in range(8)])
+
+    results = [future.result(timeout=5) for future in futures]
+    assert [len(call) for call in model.calls] == [4, 4]
+    assert [list(labels) for _, labels, _ in results] == [[f"row {i}"] for i in range(8)]
+    scheduler.stop()
+
+
+def test_lone_request_is_flushed_after_max_latency(model):
+    scheduler = ScoringScheduler(model, max_batch_size=256, max_latency_ms=50)
+    started = time.perf_counter()
+    probabilities, _, _ = scheduler.score([7], timeout=5)
+    waited = time.perf_counter() - started
+
+    assert list(probabilities) == [0.07]
+    assert 0.04 < waited < 1
+    assert model.calls == [[7]]
+    scheduler.stop()
+
+
+def test_failure_only_reaches_the_request_that_caused_it(model):
+    requests = [[1, 2], [3, 'bad'], [4]]
+    scheduler = ScoringScheduler(model, max_batch_size=5, max_latency_ms=5000)
+    futures = submit_together(scheduler, requests)
+
+    with pytest.raises(ValueError, match='bad'):
+        futures[1].result(timeout=5)
+    assert list(futures[0].result(timeout=5)[0]) == [0.01, 0.02]
+    assert list(futures[2].result(timeout=5)[0]) == [0.04]
+    # The coalesced call failed, then each request was scored on its own
+    assert len(model.calls) == 4 and len(model.calls[0]) == 5
+    assert sorted(map(len, model.calls[1:])) == [1, 2, 2]
+    assert scheduler.stats()['failed_batches'] == 2
+    scheduler.stop()
+
+
+def test_empty_request_is_answered_without_the_model(model):
+    scheduler = ScoringScheduler(model)
+    assert scheduler.score([]) == ([], [], None)
+    assert model.calls == []
+    assert scheduler._worker is None
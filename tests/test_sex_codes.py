@@ -0,0 +1,51 @@
+import json
+import pandas as pd
+import pytest
+import feature_pipeline
+from feature_pipeline import predict_sex, save_sex_code_table
+
+
+@pytest.fixture(autouse=True)
+def empty_memo(monkeypatch):
+    monkeypatch.setattr(feature_pipeline, 'SEX_CODE_MEMO', {})
+    monkeypatch.setattr(feature_pipeline, 'LOADED_SEX_CODE_TABLES', set())
+
+
+def test_saving_keeps_names_only_on_disk(tmp_path):
+    table = tmp_path / 'sex_codes.json'
+    table.write_text(json.dumps({'Zelda': -2}))
+    # Another process's names are already in the memo, so the table is never read here
+    feature_pipeline.SEX_CODE_MEMO['John'] = 2
+    feature_pipeline.LOADED_SEX_CODE_TABLES.add(str(table))
+
+    predict_sex(pd.Series(['Mary Smith']), table_path=str(table))
+
+    assert json.loads(table.read_text()) == {'Zelda': -2, 'John': 2, 'Mary': -1}
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_table_is_loaded_even_when_the_memo_is_warm(tmp_path):
+    table = tmp_path / 'sex_codes.json'
+    table.write_text(json.dumps({'Qwxyz': 1}))
+    feature_pipeline.SEX_CODE_MEMO['John'] = 2
+
+    codes = predict_sex(pd.Series(['Qwxyz', 'John']), table_path=str(table))
+    # The detector does not know the name; the table does
+    assert codes.tolist() == [1, 2]
+
+
+def test_memo_is_bounded(monkeypatch, tmp_path):
+    monkeypatch.setattr(feature_pipeline, 'SEX_CODE_MEMO_LIMIT', 10)
+    names = pd.Series([f"Name{i}" for i in range(25)] + ['Mary'])
+    codes = predict_sex(names)
+
+    assert len(feature_pipeline.SEX_CODE_MEMO) <= 10
+    assert 'Mary' in feature_pipeline.SEX_CODE_MEMO
+    assert codes.iloc[-1] == -1
+
+    table = tmp_path / 'sex_codes.json'
+    save_sex_code_table(str(table))
+    table_names = json.loads(table.read_text())
+    predict_sex(pd.Series(['John']), table_path=str(table))
+    # Names trimmed from the memo stay in the table
+    assert set(table_names) <= set(json.loads(table.read_text()))
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from feature_pipeline import FeaturePipeline, load_sex_code_table
+from ingest import TRAINING_SOURCES, iter_chunks, read_datasets
+from model_registry import MODEL_FILE, PIPELINE_FILE
+from tree_engine import TreeEnsemble
+
+
+def test_rows_are_labelled_by_their_source(tmp_path):
+    genuine, fake = tmp_path / 'genuine.csv', tmp_path / 'fake.csv'
+    genuine.write_text('username,followers_count\na,1\nb,2\nc,3\n')
+    fake.write_text('username,followers_count\nd,4\ne,5\n')
+
+    x, y = read_datasets([(str(genuine), 1), (str(fake), 0)])
+    assert x['username'].tolist() == ['a', 'b', 'c', 'd', 'e']
+    assert y.tolist() == [1, 1, 1, 0, 0]
+
+
+def test_genuine_accounts_are_label_one():
+    assert dict(TRAINING_SOURCES) == {'data/gusers.csv': 1, 'data/fusers.csv': 0}
+
+
+def test_bundled_model_scores_genuine_accounts_higher(repo_dir):
+    # Model output is P(genuine): the server calls p >= threshold Genuine
+    load_sex_code_table('data/sex_codes.json')
+    x, y = read_datasets()
+    sample = np.random.default_rng(0).choice(len(y), 2000, replace=False)
+    pipeline = FeaturePipeline.load(PIPELINE_FILE)
+    probabilities = TreeEnsemble.load(MODEL_FILE).predict(pipeline.transform(x.iloc[sample]))
+
+    assert roc_auc_score(y[sample], probabilities) > 0.9
+    assert probabilities[y[sample] == 1].mean() > 0.5 > probabilities[y[sample] == 0].mean()
+
+
+def test_non_numeric_counts_are_read_as_missing(tmp_path):
+    path = tmp_path / 'users.csv'
+    path.write_text('username,followers_count,following_count\na,12,n/a\nb,#REF!,3\nc,,7\n')
+
+    chunks = list(iter_chunks([(str(path), 1)], chunksize=2))
+    x, _ = read_datasets([(str(path), 1)])
+    for frame in (pd.concat([chunk for chunk, _ in chunks], ignore_index=True), x):
+        assert frame['followers_count'].iloc[0] == 12
+        assert frame['followers_count'].isna().tolist() == [False, True, True]
+        assert frame['following_count'].isna().tolist() == [True, False, False]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+from model_registry import MODEL_FILE, UBJ_MODEL_FILE
+from tree_engine import TreeEnsemble
+
+
+@pytest.fixture
+def booster(repo_dir):
+    return xgb.Booster(model_file=MODEL_FILE)
+
+
+def random_inputs(n_features, rows=5000, missing=0.2, seed=0):
+    # Scaled-feature-like values, with a share of cells missing as the server passes them
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 2, size=(rows, n_features)).astype(np.float32)
+    X[rng.random(X.shape) < missing] = np.nan
+    return X
+
+
+def xgboost_predict(booster, X):
+    return booster.predict(xgb.DMatrix(X, missing=np.nan))
+
+
+@pytest.mark.parametrize('missing', [0, 0.2, 1])
+def test_matches_xgboost_on_the_bundled_model(booster, missing):
+    engine = TreeEnsemble.load(MODEL_FILE)
+    X = random_inputs(engine.num_features(), missing=missing)
+
+    assert np.allclose(engine.predict(X), xgboost_predict(booster, X), atol=1e-6)
+
+
+def test_matches_xgboost_after_a_ubjson_round_trip(booster, tmp_path):
+    path = str(tmp_path / UBJ_MODEL_FILE)
+    booster.save_model(path)
+    engine = TreeEnsemble.load(path)
+    X = random_inputs(engine.num_features(), seed=1)
+
+    assert np.allclose(engine.predict(X), xgboost_predict(xgb.Booster(model_file=path), X), atol=1e-6)
+    assert np.array_equal(engine.predict(X), TreeEnsemble.load(MODEL_FILE).predict(X))
+
+
+def test_matches_xgboost_on_split_thresholds(booster):
+    # Values exactly on a split go right in xgboost (x < threshold goes left)
+    engine = TreeEnsemble.load(MODEL_FILE)
+    # Leaves point at themselves
+    splits = engine.left != np.arange(len(engine.left))
+    features, thresholds = engine.split_index[splits], engine.threshold[splits]
+    rng = np.random.default_rng(2)
+    X = random_inputs(engine.num_features(), rows=2000, missing=0, seed=2)
+    for row in X:
+        picked = rng.choice(len(features), size=20, replace=False)
+        row[features[picked]] = thresholds[picked]
+
+    assert np.allclose(engine.predict(X), xgboost_predict(booster, X), atol=1e-6)
@@ -0,0 +1,96 @@
+import pytest
+from watchlist import AdaptivePolicy, RequestBudget, MINUTE, HOUR, DAY
+
+THRESHOLD = 0.68
+# Snapshot times are seconds after this
+T0 = 1_700_000_000
+
+
+def snapshot(scraped_at, followers=1000, following=200, score=0.95, status='Genuine'):
+    return {'scraped_at': T0 + scraped_at, 'followers_count': followers, 'following_count': following,
+            'score': score, 'status': status}
+
+
+@pytest.fixture
+def policy():
+    return AdaptivePolicy(min_interval=15 * MINUTE, max_interval=7 * DAY, initial_interval=6 * HOUR, growth=2.0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_first_check_starts_at_the_initial_interval(policy):
+    assert policy.next_interval(None, None, snapshot(0), THRESHOLD) == 6 * HOUR
+    # Uncertain accounts start sooner
+    assert policy.next_interval(None, None, snapshot(0, score=0.7), THRESHOLD) == 3 * HOUR
+
+
+def test_unchanged_verdict_backs_off(policy):
+    previous, current = snapshot(0), snapshot(6 * HOUR)
+    assert policy.next_interval(6 * HOUR, previous, current, THRESHOLD) == 12 * HOUR
+
+
+def test_back_off_stops_at_max_interval(policy):
+    previous, current = snapshot(0), snapshot(5 * DAY)
+    assert policy.next_interval(5 * DAY, previous, current, THRESHOLD) == 7 * DAY
+    assert policy.next_interval(7 * DAY, previous, current, THRESHOLD) == 7 * DAY
+
+
+def test_changed_verdict_goes_to_min_interval(policy):
+    previous = snapshot(0)
+    current = snapshot(DAY, score=0.4, status='Fake')
+    assert policy.next_interval(4 * DAY, previous, current, THRESHOLD) == 15 * MINUTE
+
+
+def test_fast_moving_or_uncertain_accounts_are_checked_sooner(policy):
+    previous = snapshot(0)
+    fast = snapshot(DAY, followers=2000)
+    near = snapshot(DAY, score=0.72)
+    assert policy.next_interval(DAY, previous, fast, THRESHOLD) == 12 * HOUR
+    assert policy.next_interval(DAY, previous, near, THRESHOLD) == 12 * HOUR
+    assert policy.next_interval(DAY, previous, snapshot(DAY, followers=2000, score=0.72), THRESHOLD) == 15 * MINUTE
+
+
+def test_shrinking_stops_at_min_interval(policy):
+    previous, near = snapshot(0), snapshot(20 * MINUTE, score=0.72)
+    assert policy.next_interval(20 * MINUTE, previous, near, THRESHOLD) == 15 * MINUTE
+
+
+def test_small_accounts_are_not_fast_for_a_few_followers(policy):
+    previous, current = snapshot(0, followers=3), snapshot(DAY, followers=6)
+    assert policy.next_interval(HOUR, previous, current, THRESHOLD) == 2 * HOUR
+
+
+def test_failures_back_off_from_min_interval(policy):
+    assert [policy.after_failure(n) for n in (1, 2, 3)] == [15 * MINUTE, 30 * MINUTE, HOUR]
+    assert policy.after_failure(40) == 7 * DAY
+
+
+def test_budget_starts_full_and_denies_when_spent():
+    clock = FakeClock()
+    budget = RequestBudget(per_hour=3600, burst=5, clock=clock)
+    assert budget.available() == 5
+    assert budget.take(3) == 3
+    # Only what is left is granted
+    assert budget.take(10) == 2
+    assert budget.take(1) == 0
+    assert budget.spent == 5
+    assert budget.wait_time() == pytest.approx(1.0)
+
+
+def test_budget_refills_with_time_up_to_burst():
+    clock = FakeClock()
+    budget = RequestBudget(per_hour=3600, burst=5, clock=clock)
+    budget.take(5)
+    clock.now += 2.5
+    assert budget.available() == 2
+    assert budget.wait_time() == 0.0
+    assert budget.take(5) == 2
+    assert budget.wait_time() == pytest.approx(0.5)
+    clock.now += HOUR
+    assert budget.available() == 5
@@ -0,0 +1,187 @@
+import json
+import numpy as np
+
+LOGISTIC_OBJECTIVES = ('binary:logistic', 'reg:logistic')
+
+
+class TreeEnsemble:
+    # Scores an xgboost gbtree JSON dump with NumPy only. All trees are flattened into
+    # one set of node arrays and every row walks every tree one level per step.
+
+    def __init__(self, split_index, threshold, left, right, default_left, value, roots, depth,
+                 base_margin, n_features):
+        self.split_index = split_index
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.base_margin = base_margin
+        self.n_features = n_features
+
+    @classmethod
+    def load(cls, path):
+        # JSON or UBJSON (xgboost's binary JSON, as written by save_model('*.ubj'))
+        with open(path, 'rb') as f:
+            data = f.read()
+        return cls.from_dict(read_ubjson(data) if is_ubjson(data) else json.loads(data))
+
+    @classmethod
+    def from_dict(cls, model):
+        learner = model['learner']
+        objective = learner['objective']['name']
+        if objective not in LOGISTIC_OBJECTIVES:
+            raise ValueError(f"Unsupported objective: {objective}")
+        params = learner['learner_model_param']
+        if int(params.get('num_class', 0)) > 1:
+            raise ValueError("Multi-class models are not supported")
+
+        trees = learner['gradient_booster']['model']['trees']
+        split_index, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            if any(tree['split_type']):
+                raise ValueError("Categorical splits are not supported")
+            lefts = np.asarray(tree['left_children'], dtype=np.int32)
+            rights = np.asarray(tree['right_children'], dtype=np.int32)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            is_leaf = lefts == -1
+            nodes = np.arange(len(lefts), dtype=np.int32) + offset
+
+            # Leaves point at themselves so extra levels of the walk leave them in place
+            split_index.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+            threshold.append(conditions)
+            left.append(np.where(is_leaf, nodes, lefts + offset))
+            right.append(np.where(is_leaf, nodes, rights + offset))
+            default_left.append(np.asarray(tree['default_left'], dtype=bool))
+            value.append(np.where(is_leaf, conditions, 0).astype(np.float32))
+            roots.append(offset)
+            offset += len(lefts)
+
+        left = np.concatenate(left)
+        right = np.concatenate(right)
+        depth = tree_depth(left, right, np.asarray(roots, dtype=np.int32))
+
+        # Newer xgboost releases write base_score as a one-element vector, e.g. '[5E-1]'
+        base_score = float(params['base_score'].strip('[]'))
+        return cls(
+            split_index=np.concatenate(split_index),
+            threshold=np.concatenate(threshold),
+            left=left,
+            right=right,
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value),
+            roots=np.asarray(roots, dtype=np.int32),
+            depth=depth,
+            base_margin=np.log(base_score / (1.0 - base_score)),
+            n_features=int(params['num_feature']),
+        )
+
+    def num_features(self):
+        return self.n_features
+
+    def num_trees(self):
+        return len(self.roots)
+
+    def predict_margin(self, X, batch_size=4096):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Feature shape mismatch, expected: {self.n_features}, got {X.shape[-1]}")
+
+        margin = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), batch_size):
+            batch = X[start:start + batch_size]
+            rows = np.arange(len(batch))[:, None]
+            node = np.broadcast_to(self.roots, (len(batch), len(self.roots))).copy()
+            for _ in range(self.depth):
+                fvalue = batch[rows, self.split_index[node]]
+                go_left = np.where(np.isnan(fvalue), self.default_left[node], fvalue < self.threshold[node])
+                node = np.where(go_left, self.left[node], self.right[node])
+            margin[start:start + len(batch)] = self.value[node].sum(axis=1, dtype=np.float64)
+        return margin + self.base_margin
+
+    def predict(self, X, batch_size=4096):
+        return (1.0 / (1.0 + np.exp(-self.predict_margin(X, batch_size)))).astype(np.float32)
+
+
+def tree_depth(left, right, roots):
+    depth = 0
+    frontier = roots
+    while True:
+        children = np.concatenate([left[frontier], right[frontier]])
+        children = np.unique(children[~np.isin(children, frontier)])
+        if len(children) == 0:
+            return depth
+        frontier = children
+        depth += 1
+
+
+# UBJSON type markers for fixed-size values, as big-endian NumPy dtypes
+UBJSON_TYPES = {
+    b'i': np.dtype('i1'), b'U': np.dtype('u1'), b'I': np.dtype('>i2'), b'l': np.dtype('>i4'),
+    b'L': np.dtype('>i8'), b'd': np.dtype('>f4'), b'D': np.dtype('>f8'),
+}
+
+
+def is_ubjson(data):
+    # Both formats open an object with '{'; UBJSON follows it with a key length's type
+    return data[:1] == b'{' and data[1:2] in UBJSON_TYPES
+
+
+def read_ubjson(data):
+    # The subset of UBJSON xgboost writes. Typed arrays ('[$d#...') become NumPy arrays
+    # read straight from the buffer, which is what makes a binary model quick to load.
+    value, _ = ubjson_value(memoryview(data), 0)
+    return value
+
+
+def ubjson_number(data, pos, marker):
+    dtype = UBJSON_TYPES[marker]
+    return np.frombuffer(data, dtype, 1, pos)[0].item(), pos + dtype.itemsize
+
+
+def ubjson_length(data, pos):
+    return ubjson_number(data, pos + 1, bytes(data[pos:pos + 1]))
+
+
+def ubjson_value(data, pos):
+    marker = bytes(data[pos:pos + 1])
+    pos += 1
+    if marker in UBJSON_TYPES:
+        return ubjson_number(data, pos, marker)
+    if marker == b'S':
+        length, pos = ubjson_length(data, pos)
+        return str(data[pos:pos + length], 'utf-8'), pos + length
+    if marker in (b'T', b'F', b'Z'):
+        return {b'T': True, b'F': False, b'Z': None}[marker], pos
+    if marker == b'{':
+        obj = {}
+        while data[pos:pos + 1] != b'}':
+            length, pos = ubjson_length(data, pos)
+            key = str(data[pos:pos + length], 'utf-8')
+            obj[key], pos = ubjson_value(data, pos + length)
+        return obj, pos + 1
+    if marker == b'[':
+        item_type = None
+        if data[pos:pos + 1] == b'$':
+            item_type = bytes(data[pos + 1:pos + 2])
+            pos += 2
+        if data[pos:pos + 1] == b'#':
+            count, pos = ubjson_length(data, pos + 1)
+            if item_type in UBJSON_TYPES:
+                dtype = UBJSON_TYPES[item_type]
+                values = np.frombuffer(data, dtype, count, pos).astype(dtype.newbyteorder('='))
+                return values, pos + count * dtype.itemsize
+            items = []
+            for _ in range(count):
+                item, pos = ubjson_value(data, pos)
+                items.append(item)
+            return items, pos
+        items = []
+        while data[pos:pos + 1] != b']':
+            item, pos = ubjson_value(data, pos)
+            items.append(item)
+        return items, pos + 1
+    raise ValueError(f"Unsupported UBJSON marker {marker!r} at byte {pos - 1}")
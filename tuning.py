@@ -0,0 +1,139 @@
+import os
+import math
+import time
+import itertools
+import numpy as np
+import xgboost as xgb
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import train_test_split
+
+# The old GridSearchCV grid without n_estimators: the tree count is now picked by
+# early stopping on the validation fold, up to MAX_ROUNDS
+SEARCH_SPACE = {
+    'max_depth': [3, 5, 7],
+    'learning_rate': [0.01, 0.1, 0.2],
+    'subsample': [0.8, 1.0],
+}
+
+MAX_ROUNDS = 200
+EARLY_STOPPING_ROUNDS = 20
+
+# Per-process training data, set once by the pool initializer instead of pickled per trial
+_DATA = {}
+
+
+def worker_plan(n_jobs=-1, threads_per_trial=None):
+    # Workers x xgboost threads never exceeds the core count
+    cores = os.cpu_count() or 1
+    if n_jobs < 0:
+        n_jobs = cores
+    n_jobs = max(1, min(n_jobs, cores))
+    if threads_per_trial is None:
+        threads_per_trial = cores // n_jobs
+    threads_per_trial = max(1, min(threads_per_trial, cores))
+    workers = max(1, min(n_jobs, cores // threads_per_trial))
+    return workers, threads_per_trial
+
+
+def sample_configs(space, n_configs=None, seed=42):
+    configs = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    if n_configs is None or n_configs >= len(configs):
+        return configs
+    rng = np.random.default_rng(seed)
+    return [configs[i] for i in rng.choice(len(configs), size=n_configs, replace=False)]
+
+
+def load_data(X_train, y_train, X_valid, y_valid, nthread):
+    _DATA['train'] = xgb.QuantileDMatrix(X_train, label=y_train, nthread=nthread)
+    _DATA['valid'] = xgb.QuantileDMatrix(X_valid, label=y_valid, ref=_DATA['train'], nthread=nthread)
+    _DATA['nthread'] = nthread
+
+
+def run_trial(config, num_rounds, seed=42):
+    params = {
+        'objective': 'binary:logistic',
+        'eval_metric': 'logloss',
+        'tree_method': 'hist',
+        'nthread': _DATA['nthread'],
+        'seed': seed,
+        **config,
+    }
+    started = time.perf_counter()
+    booster = xgb.train(params, _DATA['train'], num_boost_round=num_rounds, evals=[(_DATA['valid'], 'valid')],
+                        early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False)
+    return {
+        'config': config,
+        'rounds': num_rounds,
+        'best_iteration': booster.best_iteration,
+        'score': booster.best_score,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def rung_budgets(max_rounds, eta, min_rounds):
+    # Boosting rounds per rung, e.g. [22, 67, 200] for 200 rounds and eta 3
+    n_rungs = max(1, int(math.log(max_rounds / min_rounds, eta)) + 1)
+    return [int(round(max_rounds / eta ** (n_rungs - 1 - rung))) for rung in range(n_rungs)]
+
+
+class Tuner:
+    # Searches SEARCH_SPACE with a held-out validation fold and early stopping. Trials
+    # run across a process pool; each worker builds its DMatrix once at startup.
+
+    def __init__(self, space=SEARCH_SPACE, max_rounds=MAX_ROUNDS, n_jobs=-1, threads_per_trial=None,
+                 valid_size=0.2, seed=42):
+        self.space = space
+        self.max_rounds = max_rounds
+        self.workers, self.threads_per_trial = worker_plan(n_jobs, threads_per_trial)
+        self.valid_size = valid_size
+        self.seed = seed
+        self.trials = []
+
+    def prepare(self, X, y):
+        X_train, X_valid, y_train, y_valid = train_test_split(
+            X, y, test_size=self.valid_size, random_state=self.seed, stratify=y)
+        split = (X_train, y_train, X_valid, y_valid)
+        if self.workers == 1:
+            load_data(*split, self.threads_per_trial)
+            return None
+        # One pool for the whole search so workers build their DMatrix only once
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=load_data,
+                                   initargs=(*split, self.threads_per_trial))
+
+    def run(self, executor, configs, num_rounds):
+        if executor is None:
+            return [run_trial(config, num_rounds, self.seed) for config in configs]
+        return list(executor.map(run_trial, configs, [num_rounds] * len(configs), [self.seed] * len(configs)))
+
+    def random_search(self, X, y, n_configs=10):
+        executor = self.prepare(X, y)
+        try:
+            self.trials = self.run(executor, sample_configs(self.space, n_configs, self.seed), self.max_rounds)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.best()
+
+    def successive_halving(self, X, y, n_configs=None, eta=3, min_rounds=20):
+        # Every config gets a small round budget; the best 1/eta move on to eta times the
+        # rounds until the survivors train with the full budget
+        executor = self.prepare(X, y)
+        configs = sample_configs(self.space, n_configs, self.seed)
+        self.trials = []
+        try:
+            for num_rounds in rung_budgets(self.max_rounds, eta, min_rounds):
+                results = self.run(executor, configs, num_rounds)
+                self.trials.extend(results)
+                results.sort(key=lambda r: r['score'])
+                print(f"{len(configs)} configs at {num_rounds} rounds, best logloss {results[0]['score']:.4f}")
+                configs = [r['config'] for r in results[:max(1, len(results) // eta)]]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.best()
+
+    def best(self):
+        # Only trials from the largest budget compete for the final choice
+        top_rounds = max(trial['rounds'] for trial in self.trials)
+        best = min((t for t in self.trials if t['rounds'] == top_rounds), key=lambda t: t['score'])
+        return dict(best['config'], n_estimators=best['best_iteration'] + 1)
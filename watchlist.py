@@ -0,0 +1,321 @@
+import os
+import time
+import heapq
+import signal
+import argparse
+import threading
+from profile_cache import normalize_username
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+
+class AdaptivePolicy:
+    # Decides when an account is next checked. Accounts whose counts move fast or whose
+    # score sits near the threshold are re-checked sooner (down to min_interval); stable
+    # ones back off by `growth` per check up to max_interval. A verdict flip goes straight
+    # to min_interval.
+
+    def __init__(self, min_interval=15 * MINUTE, max_interval=7 * DAY, initial_interval=6 * HOUR, growth=2.0,
+                 change_rate=0.05, score_margin=0.1, count_floor=100):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.growth = growth
+        # Relative change per day in followers or following that counts as fast
+        self.change_rate = change_rate
+        # Distance from the threshold that counts as uncertain
+        self.score_margin = score_margin
+        # Counts are compared against at least this, so a 3 -> 6 follower account is not "fast"
+        self.count_floor = count_floor
+
+    def clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def changing_fast(self, previous, current):
+        elapsed_days = max(current['scraped_at'] - previous['scraped_at'], HOUR) / DAY
+        for field in ('followers_count', 'following_count'):
+            before = previous.get(field) or 0
+            change = abs((current.get(field) or 0) - before) / max(before, self.count_floor)
+            if change / elapsed_days >= self.change_rate:
+                return True
+        return False
+
+    def near_threshold(self, current, threshold):
+        return current.get('score') is not None and abs(current['score'] - threshold) < self.score_margin
+
+    def next_interval(self, interval, previous, current, threshold):
+        # previous and current are profiles.db snapshots; previous is None on the first check
+        near = self.near_threshold(current, threshold)
+        if previous is None or not previous.get('scraped_at'):
+            return self.clamp(self.initial_interval / self.growth if near else self.initial_interval)
+        if previous.get('status') != current.get('status'):
+            return self.min_interval
+        fast = self.changing_fast(previous, current)
+        if fast and near:
+            return self.min_interval
+        if fast or near:
+            return self.clamp(interval / self.growth)
+        return self.clamp(interval * self.growth)
+
+    def after_failure(self, failures):
+        # Retries back off from min_interval; a failure says nothing about the account
+        return self.clamp(self.min_interval * 2 ** min(failures - 1, 16))
+
+
+class RequestBudget:
+    # Token bucket shared by every check: `per_hour` profile fetches on average, with up
+    # to `burst` spent at once after an idle spell
+
+    def __init__(self, per_hour, burst=None, clock=time.monotonic):
+        self.rate = per_hour / HOUR
+        self.burst = burst if burst is not None else max(1, int(per_hour / 60))
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+        self.spent = 0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self):
+        self._refill()
+        return int(self.tokens)
+
+    def take(self, n):
+        self._refill()
+        n = min(n, int(self.tokens))
+        self.tokens -= n
+        self.spent += n
+        return n
+
+    def wait_time(self):
+        # Seconds until at least one request may be made
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class WatchlistScheduler:
+    # Keeps the profiles.db watchlist checked. Accounts sit in a heap keyed by next due
+    # time; each round pops the due ones the request budget allows (most overdue first),
+    # checks them as one batch and pushes them back with an interval from the policy.
+    # When demand exceeds the budget every account is simply checked later than planned,
+    # in due order, so scraping never exceeds the budget.
+    #
+    # check(usernames) must scrape, score and store the accounts, yielding
+    # (username, result or None); the stored snapshots are read back to adapt.
+
+    def __init__(self, store, check, threshold, policy=None, budget=None, batch_size=50, sync_interval=60):
+        self.store = store
+        self.check = check
+        # Callable returning the served model's threshold
+        self.threshold = threshold
+        self.policy = policy or AdaptivePolicy()
+        self.budget = budget or RequestBudget(per_hour=1000)
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self._heap = []
+        # username -> watchlist row; a heap item is stale unless its due time matches here
+        self._entries = {}
+        self._synced_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = {'checks': 0, 'failures': 0, 'rounds': 0, 'shortened': 0, 'lengthened': 0}
+
+    def sync(self):
+        # Picks up accounts added or removed through the API or CLI since the last sync
+        rows = {row['username']: row for row in self.store.watchlist()}
+        for username in list(self._entries):
+            if username not in rows:
+                del self._entries[username]
+        for username, row in rows.items():
+            if username not in self._entries:
+                self._entries[username] = row
+                heapq.heappush(self._heap, (row['next_due'], username))
+        if len(self._heap) > 2 * len(self._entries) + 1000:
+            self._heap = [(row['next_due'], u) for u, row in self._entries.items()]
+            heapq.heapify(self._heap)
+        self._synced_at = time.monotonic()
+
+    def _peek_due(self):
+        # Drops stale heap items and returns the earliest real due time (or None)
+        while self._heap:
+            due, username = self._heap[0]
+            entry = self._entries.get(username)
+            if entry is not None and entry['next_due'] == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def due_count(self, now=None):
+        now = time.time() if now is None else now
+        return sum(1 for entry in self._entries.values() if entry['next_due'] <= now)
+
+    def demand_per_hour(self):
+        # Fetches per hour the current intervals ask for, to compare with the budget
+        return sum(HOUR / entry['interval'] for entry in self._entries.values())
+
+    def _pop_due(self, now):
+        batch = []
+        limit = min(self.batch_size, self.budget.available())
+        while len(batch) < limit:
+            due = self._peek_due()
+            if due is None or due > now:
+                break
+            batch.append(heapq.heappop(self._heap)[1])
+        self.budget.take(len(batch))
+        return batch
+
+    def run_once(self, now=None):
+        # One round; returns how many accounts were checked
+        now = time.time() if now is None else now
+        batch = self._pop_due(now)
+        if not batch:
+            return 0
+        previous = self.store.latest_snapshots(batch)
+        succeeded = set()
+        try:
+            for username, result in self.check(batch):
+                if result is not None:
+                    succeeded.add(normalize_username(username))
+        except Exception as e:
+            print(f"Watchlist check of {len(batch)} profiles failed: {e}")
+        current = self.store.latest_snapshots(batch)
+        threshold = self.threshold()
+
+        checked_at = time.time()
+        updates = []
+        for username in batch:
+            entry = self._entries.get(username)
+            if entry is None:
+                continue
+            interval = entry['interval']
+            if username in succeeded and username in current:
+                new_interval = self.policy.next_interval(interval, previous.get(username), current[username], threshold)
+                entry['failures'] = 0
+                if new_interval < interval:
+                    self.counters['shortened'] += 1
+                elif new_interval > interval:
+                    self.counters['lengthened'] += 1
+                entry['interval'] = new_interval
+                next_due = checked_at + new_interval
+            else:
+                entry['failures'] = (entry['failures'] or 0) + 1
+                self.counters['failures'] += 1
+                next_due = checked_at + self.policy.after_failure(entry['failures'])
+            entry['last_checked'] = checked_at
+            entry['next_due'] = next_due
+            heapq.heappush(self._heap, (next_due, username))
+            updates.append(entry)
+        self.store.update_watchlist(updates)
+        self.counters['checks'] += len(batch)
+        self.counters['rounds'] += 1
+        return len(batch)
+
+    def run(self, idle_wait=30.0):
+        self.sync()
+        print(f"Watching {len(self._entries)} profiles with a budget of {self.budget.rate * HOUR:.0f} requests/hour.")
+        while not self._stop.is_set():
+            if time.monotonic() - self._synced_at >= self.sync_interval:
+                self.sync()
+            checked = self.run_once()
+            if checked:
+                print(f"Checked {checked} watched profiles, {self.due_count()} still due.")
+                continue
+            # Sleep until the next account is due or the budget refills, whichever is later
+            due = self._peek_due()
+            wait = idle_wait if due is None else max(due - time.time(), self.budget.wait_time())
+            self._stop.wait(min(max(wait, 0.05), idle_wait, self.sync_interval))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='watchlist-scheduler', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        now = time.time()
+        due = self._peek_due()
+        return dict(
+            self.counters,
+            watched=len(self._entries),
+            due_now=self.due_count(now),
+            next_due_in=None if due is None else round(max(0.0, due - now), 1),
+            demand_per_hour=round(self.demand_per_hour(), 1),
+            budget_per_hour=round(self.budget.rate * HOUR, 1),
+            requests_spent=self.budget.spent,
+        )
+
+
+def scheduler_from_env(store, check, threshold, environ=os.environ):
+    policy = AdaptivePolicy(
+        min_interval=float(environ.get('WATCH_MIN_INTERVAL', 15 * MINUTE)),
+        max_interval=float(environ.get('WATCH_MAX_INTERVAL', 7 * DAY)),
+        initial_interval=float(environ.get('WATCH_INITIAL_INTERVAL', 6 * HOUR)),
+    )
+    budget = RequestBudget(per_hour=float(environ.get('WATCH_REQUESTS_PER_HOUR', 1000)))
+    return WatchlistScheduler(store, check, threshold, policy=policy, budget=budget,
+                              batch_size=int(environ.get('WATCH_BATCH_SIZE', 50)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage and run the profile watchlist")
+    parser.add_argument('--db', default='profiles.db')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add_parser = commands.add_parser('add', help="Watch accounts (one per argument, or a file with --file)")
+    add_parser.add_argument('usernames', nargs='*')
+    add_parser.add_argument('--file', help="Text file with one username per line")
+    remove_parser = commands.add_parser('remove', help="Stop watching accounts")
+    remove_parser.add_argument('usernames', nargs='+')
+    list_parser = commands.add_parser('list', help="Show the accounts due soonest")
+    list_parser.add_argument('--limit', type=int, default=20)
+    commands.add_parser('run', help="Run the scheduler until interrupted")
+    args = parser.parse_args()
+
+    from storage import ProfileStore
+
+    store = ProfileStore(args.db)
+    if args.command == 'add':
+        usernames = list(args.usernames)
+        if args.file:
+            with open(args.file) as f:
+                usernames += [line for line in f if line.strip()]
+        added = store.add_to_watchlist([normalize_username(u) for u in usernames],
+                                       float(os.environ.get('WATCH_INITIAL_INTERVAL', 6 * HOUR)))
+        print(f"Added {added} profiles to the watchlist.")
+    elif args.command == 'remove':
+        removed = store.remove_from_watchlist([normalize_username(u) for u in args.usernames])
+        print(f"Removed {removed} profiles from the watchlist.")
+    elif args.command == 'list':
+        now = time.time()
+        for row in store.watchlist(limit=args.limit):
+            print(f"{row['username']:<20} due in {max(0, row['next_due'] - now) / MINUTE:8.1f} min  "
+                  f"interval {row['interval'] / HOUR:6.2f} h  failures {row['failures']}")
+    else:
+        # The server module brings the scrapers, the model registry and its watcher
+        import app
+
+        app.watch_models()
+        scheduler = scheduler_from_env(
+            app.profile_store, lambda usernames: app.monitor_results(usernames, force_refresh=True),
+            lambda: app.model_registry.get().threshold)
+        signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
+        print(f"Watchlist scheduler stopped: {scheduler.stats()}")
+        app.shutdown()
+
+
+if __name__ == '__main__':
+    main()